@@ -10,6 +10,8 @@ https://docs.djangoproject.com/en/1.10/ref/settings/
 """
 
 import os
+import sys
+from datetime import timedelta
 import dj_database_url
 
 ###### Quick-start development settings - unsuitable for production ######
@@ -32,6 +34,9 @@ if production_env:
 else:
     DEBUG = True
 
+# Whether we are running the test suite
+TESTING = len(sys.argv) > 1 and sys.argv[1] == 'test'
+
 # CELERY STUFF
 REDIS_URL_VAL = os.environ['REDIS_URL']
 BROKER_URL = REDIS_URL_VAL
@@ -40,6 +45,40 @@ CELERY_ACCEPT_CONTENT = ['application/json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC'
+# Refresh the games most overdue a refresh in each library every 10 minutes (see psnvalue.psn_refresh_scheduler).
+# The game count per library is sized to the PSN store budget: 10 minutes of 2 second requests, shared by the libraries.
+PSN_REFRESH_GAME_COUNT = int(os.environ.get('PSN_REFRESH_GAME_COUNT', 100))
+CELERYBEAT_SCHEDULE = {
+    'refresh-overdue-psn-games': {
+        'task': 'task_refresh_all_overdue_psn_games',
+        'schedule': timedelta(minutes=10),
+        'args': (PSN_REFRESH_GAME_COUNT,),
+    },
+}
+
+# Request games from the PSN store concurrently with the asyncio client (see psnvalue.psn_store_async_api).
+PSN_STORE_ASYNC = os.environ.get('PSN_STORE_ASYNC') == 'TRUE'
+# Bound the memory of a library sync: the games fetched ahead of those written, and the games written per transaction.
+PSN_SYNC_QUEUE_SIZE = int(os.environ.get('PSN_SYNC_QUEUE_SIZE', 100))
+PSN_SYNC_WRITE_BATCH_SIZE = int(os.environ.get('PSN_SYNC_WRITE_BATCH_SIZE', 25))
+# Games requested concurrently by the asyncio client, at most the queue size so the queue stays bounded.
+PSN_SYNC_ASYNC_CHUNK_SIZE = int(os.environ.get('PSN_SYNC_ASYNC_CHUNK_SIZE', PSN_SYNC_QUEUE_SIZE))
+# Seconds between requests to the PSN store, shared by every library sync (see psnvalue.psn_store_budget).
+PSN_STORE_BUDGET_INTERVAL = float(os.environ.get('PSN_STORE_BUDGET_INTERVAL', 2.0))
+# Page cache of the index and game list pages, primed after each sync, refresh and rescore (see psnvalue.psn_cache_priming).
+# It is shared by the web and worker dynos through the DB, so needs `manage.py createcachetable`.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'psnvalue_page_cache',
+    }
+}
+# Primed pages are kept until they are primed again, other pages for this timeout (seconds).
+PSN_PAGE_CACHE_TIMEOUT = int(os.environ.get('PSN_PAGE_CACHE_TIMEOUT', 15 * 60))
+PSN_CACHE_PRIME_PAGES = int(os.environ.get('PSN_CACHE_PRIME_PAGES', 3))
+PSN_CACHE_PRIME_WORKERS = int(os.environ.get('PSN_CACHE_PRIME_WORKERS', 4))
+# Token for scraping the metrics view (psnvalue:metrics) without an admin session. Unset to only allow admins.
+PSN_METRICS_TOKEN = os.environ.get('PSN_METRICS_TOKEN')
 
 # Application definition
 
@@ -59,6 +98,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so the timings cover every other middleware
+    'psnvalue.middleware.ViewTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -68,6 +109,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.SessionAuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'psnvalue.middleware.ReadReplicaMiddleware',
 ]
 
 ROOT_URLCONF = 'DjangoHerokuSite.urls'
@@ -130,6 +172,21 @@ USE_TZ = True
 db_from_env = dj_database_url.config(conn_max_age=500)
 DATABASES['default'].update(db_from_env)
 
+# Optional read replica with $DATABASE_REPLICA_URL, which the game list and search views read from.
+# Tests always have a replica, mirroring the default database, so the views are tested through the router.
+db_replica_from_env = dj_database_url.config(env='DATABASE_REPLICA_URL', conn_max_age=500)
+if db_replica_from_env:
+    DATABASES['replica'] = db_replica_from_env
+elif TESTING:
+    DATABASES['replica'] = dict(DATABASES['default'])
+if 'replica' in DATABASES:
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+
+DATABASE_ROUTERS = ['psnvalue.db_router.ReplicaRouter']
+
+# Runs the tests with the replica on the default database's connection, so the views see each test's data.
+TEST_RUNNER = 'psnvalue.tests.runner.MirrorTestRunner'
+
 # Honor the 'X-Forwarded-Proto' header for request.is_secure()
 SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
 
@@ -1,6 +1,60 @@
+import io
+import zipfile
 from django.contrib import admin
+from django.http import HttpResponse
 
-from .models import Library, GameList
+from .models import Library, GameList, StoreEntryFailure, TaskProfile
+from .psn_library_dao import PSNLibraryDAO
+
+class StoreEntryFailureAdmin(admin.ModelAdmin):
+    list_display = ('game_id', 'library_fk', 'error_class', 'reason', 'attempt_count', 'last_failed_at', 'next_attempt_at', 'quarantined')
+    list_filter = ('quarantined', 'error_class', 'library_fk')
+    search_fields = ('game_id', 'url')
+    actions = ['release']
+
+    def release(self, request, queryset):
+        """
+        Release the selected failures from quarantine, so the games are requested by the next sync.
+        """
+        released_count = PSNLibraryDAO().release_store_entry_failures(queryset)
+        self.message_user(request, "Released %d store entries." % released_count)
+    release.short_description = "Release selected store entries"
+
+class TaskProfileAdmin(admin.ModelAdmin):
+    list_display = ('task_name', 'library_fk', 'sync_run_fk', 'started_at', 'duration_seconds')
+    list_filter = ('task_name', 'library_fk')
+    readonly_fields = ('task_name', 'library_fk', 'sync_run_fk', 'started_at', 'duration_seconds', 'summary')
+    exclude = ('profile_data',)
+    actions = ['download']
+
+    def download(self, request, queryset):
+        """
+        Download the selected profiles as .prof files, which can be loaded by pstats, snakeviz etc.
+
+        A single profile is downloaded as is, and several profiles are downloaded together in a .zip file.
+        """
+        task_profiles = list(queryset.order_by('pk'))
+        if len(task_profiles) == 1:
+            response = HttpResponse(bytes(task_profiles[0].profile_data), content_type='application/octet-stream')
+            response['Content-Disposition'] = 'attachment; filename="%s"' % get_profile_filename(task_profiles[0])
+            return response
+
+        zip_data = io.BytesIO()
+        with zipfile.ZipFile(zip_data, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+            for task_profile in task_profiles:
+                zip_file.writestr(get_profile_filename(task_profile), bytes(task_profile.profile_data))
+        response = HttpResponse(zip_data.getvalue(), content_type='application/zip')
+        response['Content-Disposition'] = 'attachment; filename="task_profiles.zip"'
+        return response
+    download.short_description = "Download selected profiles"
+
+def get_profile_filename(task_profile):
+    """
+    Get the filename of a downloaded task profile.
+    """
+    return '%s_%d.prof' % (task_profile.task_name, task_profile.pk)
 
 admin.site.register(Library)
 admin.site.register(GameList)
+admin.site.register(StoreEntryFailure, StoreEntryFailureAdmin)
+admin.site.register(TaskProfile, TaskProfileAdmin)
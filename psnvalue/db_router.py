@@ -0,0 +1,61 @@
+import threading
+from contextlib import contextmanager
+from django.conf import settings
+
+# The alias of the optional read replica database (see $DATABASE_REPLICA_URL).
+REPLICA_DATABASE = 'replica'
+# The alias of the primary database, which every write goes to.
+PRIMARY_DATABASE = 'default'
+# Apps whose reads always go to the primary, as a session or login written by one request must be read by the
+# next, before it could have been replicated.
+PRIMARY_READ_APP_LABELS = ('sessions', 'auth')
+
+_replica_state = threading.local()
+
+def replica_reads_enabled():
+    """
+    Check if reads in the current thread go to the read replica.
+    """
+    return getattr(_replica_state, 'enabled', False) and REPLICA_DATABASE in settings.DATABASES
+
+def set_replica_reads(enabled):
+    """
+    Enable or disable reads from the read replica in the current thread.
+    """
+    _replica_state.enabled = enabled
+
+@contextmanager
+def read_from_replica():
+    """
+    Context manager sending the reads made within it to the read replica, if one is configured.
+    """
+    previously_enabled = getattr(_replica_state, 'enabled', False)
+    set_replica_reads(True)
+    try:
+        yield
+    finally:
+        set_replica_reads(previously_enabled)
+
+class ReplicaRouter:
+    """
+    Database router sending reads to the read replica, where enabled, and everything else to the primary.
+
+    Reads only go to the replica where explicitly enabled (see ReadReplicaMiddleware), so the sync tasks
+    always read their own writes from the primary. Sessions and users are always read from the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in PRIMARY_READ_APP_LABELS:
+            return PRIMARY_DATABASE
+        return REPLICA_DATABASE if replica_reads_enabled() else PRIMARY_DATABASE
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY_DATABASE
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same data as the primary, so objects from either can be related.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica is migrated by replication from the primary.
+        return db == PRIMARY_DATABASE
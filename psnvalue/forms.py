@@ -0,0 +1,58 @@
+from collections import OrderedDict
+from django import forms
+
+from .models import ContentDescriptors
+from .psn_scoring import SCORING_MODELS
+
+# Sort options for the game list, mapping the sort parameter value to its label and ordering.
+# Every ordering has a matching (library_fk, field) index on GameList.
+GAMELIST_SORT_OPTIONS = OrderedDict([
+    ('plus_value', ('PS+ Value', '-plus_value_score')),
+    ('base_value', ('Value', '-base_value_score')),
+    ('rating', ('Rating', '-weighted_rating')),
+    ('price', ('Price', 'plus_price')),
+    ('discount', ('Discount', '-plus_discount')),
+])
+# The default sort option for the game list.
+GAMELIST_DEFAULT_SORT = 'plus_value'
+
+def get_scoring_choices():
+    """
+    Get the versions of the registered scoring models, as choices.
+    """
+    return [(version, version) for version in SCORING_MODELS]
+
+class GameListFilterForm(forms.Form):
+    """
+    Query string sort and filter options for the game list.
+    """
+    q = forms.CharField(max_length=100, required=False, widget=forms.HiddenInput)
+    sort = forms.ChoiceField(choices=[(key, option[0]) for key, option in GAMELIST_SORT_OPTIONS.items()], required=False)
+    max_age = forms.IntegerField(min_value=0, required=False, label='Max age rating')
+    # Prices are in cents, as stored from the store.
+    min_price = forms.IntegerField(min_value=0, required=False, label='Min PS Plus price (cents)')
+    max_price = forms.IntegerField(min_value=0, required=False, label='Max PS Plus price (cents)')
+    scoring = forms.ChoiceField(choices=get_scoring_choices, required=False, label='Scoring model')
+    min_ratings = forms.IntegerField(min_value=0, required=False, label='Min number of ratings')
+    with_content = forms.MultipleChoiceField(required=False, widget=forms.CheckboxSelectMultiple, label='Include content')
+    without_content = forms.MultipleChoiceField(required=False, widget=forms.CheckboxSelectMultiple, label='Exclude content')
+
+    def __init__(self, *args, **kwargs):
+        """
+        Load the content descriptors once, for both of the content filters.
+
+        A ModelMultipleChoiceField queries its choices every time it is rendered or cleaned, so the content
+        filters share one list of descriptors instead.
+        """
+        super().__init__(*args, **kwargs)
+        self.content_descriptors = OrderedDict((content_descriptor.content_name, content_descriptor) for content_descriptor in ContentDescriptors.objects.all())
+        content_choices = [(content_name, content_name) for content_name in self.content_descriptors]
+        self.fields['with_content'].choices = content_choices
+        self.fields['without_content'].choices = content_choices
+
+    def clean_with_content(self):
+        return [self.content_descriptors[content_name] for content_name in self.cleaned_data['with_content']]
+
+    def clean_without_content(self):
+        return [self.content_descriptors[content_name] for content_name in self.cleaned_data['without_content']]
+
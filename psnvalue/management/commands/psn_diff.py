@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from psnvalue.psn_library import PSNLibrary
+
+# The number of changes shown in each section of the report, by default.
+PSN_DIFF_DEFAULT_LIMIT = 20
+
+class Command(BaseCommand):
+    help = 'Dry run a sync (or a rescore) of a PSN library, and report what would change without writing anything.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('library_id', type=int)
+        parser.add_argument('--rescore', action='store_true', help='Dry run a rescore of the library, instead of a sync with the PSN store.')
+        parser.add_argument('--limit', type=int, default=PSN_DIFF_DEFAULT_LIMIT, help='The number of changes shown in each section.')
+
+    def handle(self, *args, **options):
+        psn_library = PSNLibrary()
+        if options['rescore']:
+            library_diff = psn_library.diff_update_weighted_ratings(options['library_id'])
+        else:
+            library_diff = psn_library.diff_sync_library_with_store(options['library_id'])
+        if library_diff == None:
+            raise CommandError("Library %s does not exist." % options['library_id'])
+
+        limit = options['limit']
+        self.write_section("New games", library_diff.new_games, limit, "{0}: {1}")
+        self.write_section("Removed games", library_diff.removed_games, limit, "{0}: {1}")
+        self.write_section("Price changes", library_diff.price_changes, limit, "{0}: {1} {2} -> {3}")
+        self.write_section("Rank movements", library_diff.rank_movements, limit, "{0}: {1} {2} -> {3}")
+        self.stdout.write("Compute time: %.3fs" % library_diff.compute_seconds)
+
+    def write_section(self, title, changes, limit, line_format):
+        """
+        Write a section of the report, with the count of changes and the first changes.
+        """
+        self.stdout.write("%s (%d)" % (title, len(changes)))
+        for change in changes[:limit]:
+            self.stdout.write("  " + line_format.format(*change))
@@ -0,0 +1,60 @@
+import os
+import sys
+import json
+import subprocess
+from statistics import median
+from django.core.management.base import BaseCommand
+
+# The number of times each path is imported, by default. Each import is in a fresh interpreter.
+IMPORT_BENCHMARK_DEFAULT_REPEAT = 5
+# The directory of manage.py, which the fresh interpreters import the project from.
+IMPORT_BENCHMARK_PROJECT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+# The modules imported to boot each path: a gunicorn web worker (its WSGI application and URLs) and a Celery worker (its tasks).
+IMPORT_BENCHMARK_PATHS = {
+    'web': ['psnvalue.urls', 'psnvalue.admin'],
+    'worker': ['psnvalue.tasks'],
+}
+# Modules only needed to sync libraries, which the web workers should not import.
+IMPORT_BENCHMARK_SYNC_ONLY_MODULES = ['psnvalue.tasks', 'psnvalue.psn_library', 'cloudinary', 'requests', 'aiohttp']
+# Imports the modules of a path in a fresh interpreter, printing the time taken, the peak RSS and the sync-only modules loaded.
+IMPORT_BENCHMARK_SCRIPT = """
+import sys, json, time, importlib
+start = time.perf_counter()
+import django
+django.setup()
+from django.core.wsgi import get_wsgi_application
+get_wsgi_application()
+for module_path in %(module_paths)r:
+    importlib.import_module(module_path)
+seconds = time.perf_counter() - start
+from psnvalue.psn_memory import get_peak_rss_kb
+print(json.dumps({'seconds': seconds, 'peak_rss_kb': get_peak_rss_kb(), 'sync_only_modules': [module_path for module_path in %(sync_only_modules)r if module_path in sys.modules]}))
+"""
+
+def measure_imports(module_paths):
+    """
+    Measure the boot of Django and the import of some modules, in a fresh interpreter.
+
+    Args:
+        module_paths: The dotted paths of the modules to import.
+    Returns:
+        dict: The seconds taken, the peak RSS in kilobytes (or None if it can't be measured) and the sync-only
+              modules that were imported.
+    """
+    script = IMPORT_BENCHMARK_SCRIPT % {'module_paths': module_paths, 'sync_only_modules': IMPORT_BENCHMARK_SYNC_ONLY_MODULES}
+    output = subprocess.check_output([sys.executable, '-c', script], cwd=IMPORT_BENCHMARK_PROJECT_DIR)
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+class Command(BaseCommand):
+    help = 'Benchmark the boot of a web worker and a Celery worker, reporting their import time, peak memory and sync-only modules.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=IMPORT_BENCHMARK_DEFAULT_REPEAT, help='The number of times each path is imported.')
+
+    def handle(self, *args, **options):
+        for path_name, module_paths in sorted(IMPORT_BENCHMARK_PATHS.items()):
+            measurements = [measure_imports(module_paths) for _ in range(options['repeat'])]
+            self.stdout.write("%s: %.3fs median import time" % (path_name, median(measurement['seconds'] for measurement in measurements)))
+            if measurements[0]['peak_rss_kb'] != None:
+                self.stdout.write("    Peak RSS: %d KB" % max(measurement['peak_rss_kb'] for measurement in measurements))
+            self.stdout.write("    Sync-only modules imported: %s" % (", ".join(measurements[0]['sync_only_modules']) or "none"))
@@ -0,0 +1,93 @@
+import os
+import json
+import time
+from django.db import connection
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from psnvalue.models import Library
+from psnvalue.psn_library import PSNLibrary
+from psnvalue.psn_game_snapshot import GameSnapshot, PSN_JSON_ELEM_GAME_CONCEPT_ID
+from psnvalue.psn_memory import get_peak_rss_kb
+from psnvalue.psn_store_json import PSN_JSON_ELEM_EACH_GAME, PSN_JSON_ELEM_GAME_ID, PSN_JSON_ELEM_GAME_NAME, PSN_JSON_ELEM_GAME_URL, PSN_JSON_ELEM_RELEASE_DATE, PSN_JSON_ELEM_GAME_PRICE_BLOCK, PSN_JSON_ELEM_GAME_PRICE
+
+# The number of games in the synthetic PSN store, by default.
+PSN_BENCHMARK_DEFAULT_GAME_COUNT = 1000
+# The detailed game JSON that every game in the synthetic PSN store is copied from, by default.
+PSN_BENCHMARK_DEFAULT_GAME_JSON = os.path.join(os.path.dirname(__file__), '..', '..', 'tests', 'test_data', 'DarkSoulsIII_FullGame.json')
+# The name of the library the benchmark syncs.
+PSN_BENCHMARK_LIBRARY_NAME = 'benchmark'
+# Prefix of the ids of the games in the synthetic PSN store.
+PSN_BENCHMARK_GAME_ID_PREFIX = 'benchmark-'
+
+class SyntheticStoreAPI:
+    """
+    Stands in for the PSN store API, serving copies of one game's detailed JSON as distinct games.
+
+    The detailed JSON of each game is decoded afresh for every request, as it would be from the PSN store.
+    """
+
+    def __init__(self, game_json_text, game_count):
+        self.game_json_text = game_json_text
+        self.game_count = game_count
+
+    def request_psn_lib_json(self, library_url):
+        return {PSN_JSON_ELEM_EACH_GAME: [
+            {
+                PSN_JSON_ELEM_GAME_ID: PSN_BENCHMARK_GAME_ID_PREFIX + str(game_index),
+                PSN_JSON_ELEM_GAME_NAME: "Game " + str(game_index),
+                PSN_JSON_ELEM_GAME_URL: PSN_BENCHMARK_GAME_ID_PREFIX + str(game_index),
+                PSN_JSON_ELEM_RELEASE_DATE: '2016-01-01T00:00:00Z',
+                PSN_JSON_ELEM_GAME_PRICE_BLOCK: {PSN_JSON_ELEM_GAME_PRICE: 0},
+            }
+            for game_index in range(self.game_count)
+        ]}
+
+    def request_psn_game_json(self, detailed_game_json_url, library_id):
+        detailed_game_json = json.loads(self.game_json_text)
+        detailed_game_json[PSN_JSON_ELEM_GAME_ID] = detailed_game_json_url
+        detailed_game_json.pop(PSN_JSON_ELEM_GAME_CONCEPT_ID, None)
+        return GameSnapshot.from_json(detailed_game_json)
+
+class Command(BaseCommand):
+    help = ('Benchmark a PSN library sync against a synthetic PSN store, reporting its time and peak memory. '
+            'The sync writes to a test database, created and destroyed as by the test runner, never the configured database.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--games', type=int, default=PSN_BENCHMARK_DEFAULT_GAME_COUNT, help='The number of games in the synthetic PSN store.')
+        parser.add_argument('--game-json', default=PSN_BENCHMARK_DEFAULT_GAME_JSON, help='The detailed game JSON each game is copied from.')
+        parser.add_argument('--queue-size', type=int, help='Override settings.PSN_SYNC_QUEUE_SIZE.')
+        parser.add_argument('--write-batch-size', type=int, help='Override settings.PSN_SYNC_WRITE_BATCH_SIZE.')
+        parser.add_argument('--noinput', '--no-input', action='store_false', dest='interactive', help='Destroy a test database left by an earlier run without asking.')
+
+    def handle(self, *args, **options):
+        with open(options['game_json']) as game_json_file:
+            game_json_text = game_json_file.read()
+        overrides = {'PSN_STORE_ASYNC': False}
+        if options['queue_size'] != None:
+            overrides['PSN_SYNC_QUEUE_SIZE'] = options['queue_size']
+        if options['write_batch_size'] != None:
+            overrides['PSN_SYNC_WRITE_BATCH_SIZE'] = options['write_batch_size']
+
+        psn_library = PSNLibrary()
+        psn_library.psn_store_api = SyntheticStoreAPI(game_json_text, options['games'])
+        # Don't upload a thumbnail to Cloudinary for every synthetic title
+        psn_library.upload_thumb_to_cloudinary = lambda thumbnail_url: thumbnail_url
+        old_database_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=not options['interactive'], serialize=False)
+        try:
+            library = Library.objects.create(library_name=PSN_BENCHMARK_LIBRARY_NAME, library_url='')
+            start_rss_kb = get_peak_rss_kb()
+            start = time.perf_counter()
+            with override_settings(**overrides):
+                psn_library.sync_library_with_store(library.pk)
+            elapsed = time.perf_counter() - start
+            peak_rss_kb = get_peak_rss_kb()
+            synced_game_count = library.gamelist_set.count()
+        finally:
+            connection.creation.destroy_test_db(old_database_name, verbosity=0)
+
+        self.stdout.write("Games: %d (%d synced)" % (options['games'], synced_game_count))
+        self.stdout.write("Sync time: %.3fs (%.1f games/s)" % (elapsed, options['games'] / elapsed))
+        if peak_rss_kb != None:
+            self.stdout.write("Peak RSS: %d KB (grew %d KB during the sync)" % (peak_rss_kb, peak_rss_kb - start_rss_kb))
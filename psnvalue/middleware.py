@@ -0,0 +1,162 @@
+import time
+from django.conf import settings
+from django.db import connections
+from .db_router import set_replica_reads
+from .psn_metrics import PSNMetrics
+
+# Request methods that never write, so can be served from the read replica.
+READ_REPLICA_SAFE_METHODS = ('GET', 'HEAD')
+# Attribute of the request holding the seconds taken to render its template response.
+VIEW_TIMING_TEMPLATE_SECONDS_ATTR = 'view_timing_template_seconds'
+
+class ReadReplicaMiddleware:
+    """
+    Serve safe requests to views marked with read_from_replica = True from the read replica.
+
+    Reads are routed to the replica until the response is complete, including template rendering.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            return self.get_response(request)
+        finally:
+            set_replica_reads(False)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'view_class', view_func)
+        if request.method in READ_REPLICA_SAFE_METHODS and getattr(view_class, 'read_from_replica', False):
+            set_replica_reads(True)
+        return None
+
+class ViewTimingMiddleware:
+    """
+    Record the latency, DB time, query count and template render time of each request to a view.
+
+    The timings are aggregated by URL name into the daily histograms of PSNMetrics, shown on the metrics view.
+    Queries are timed by wrapping the cursors of each DB connection for the request (see QueryTimingCursor),
+    so the overhead is a timer per query and one Redis round trip per request, with no query logging.
+    In debug, the timings are also sent in a Server-Timing header, for the browser's developer tools.
+    """
+
+    psn_metrics = PSNMetrics()
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        query_timing = QueryTiming()
+        timed_connections = self.start_query_timing(query_timing)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            self.stop_query_timing(timed_connections)
+        latency_seconds = time.perf_counter() - start
+        template_seconds = getattr(request, VIEW_TIMING_TEMPLATE_SECONDS_ATTR, None)
+
+        # Requests that didn't resolve to a view (e.g. 404s) aren't recorded, to bound the number of histograms
+        if request.resolver_match != None:
+            self.psn_metrics.record_view_request(request.resolver_match.view_name, latency_seconds, query_timing.db_seconds, query_timing.query_count, template_seconds)
+        if settings.DEBUG:
+            response['Server-Timing'] = get_server_timing(latency_seconds, query_timing.db_seconds, query_timing.query_count, template_seconds)
+        return response
+
+    def process_template_response(self, request, response):
+        # The template is rendered once every middleware has processed the template response
+        start = time.perf_counter()
+
+        def record_template_seconds(rendered_response):
+            setattr(request, VIEW_TIMING_TEMPLATE_SECONDS_ATTR, time.perf_counter() - start)
+
+        response.add_post_render_callback(record_template_seconds)
+        return response
+
+    def start_query_timing(self, query_timing):
+        """
+        Start timing the queries made on every DB connection, by wrapping the cursors it creates.
+
+        Args:
+            query_timing: The QueryTiming to add the queries to.
+        Returns:
+            list: The connections whose queries are timed.
+        """
+        # Aliases may share a connection (e.g. the test replica), which is only wrapped once
+        timed_connections = list(set(connections.all()))
+        for connection in timed_connections:
+            connection.cursor = get_timed_cursor_factory(connection.cursor, query_timing)
+        return timed_connections
+
+    def stop_query_timing(self, timed_connections):
+        """
+        Stop timing the queries made on the connections, restoring their own cursors.
+        """
+        for connection in timed_connections:
+            del connection.cursor
+
+class QueryTiming:
+    """
+    The count of queries made by a request, and the seconds taken by them.
+    """
+
+    def __init__(self):
+        self.query_count = 0
+        self.db_seconds = 0.0
+
+    def time_query(self, execute, *args):
+        """
+        Execute a query, adding it to the count and timing it.
+        """
+        start = time.perf_counter()
+        try:
+            return execute(*args)
+        finally:
+            self.query_count += 1
+            self.db_seconds += time.perf_counter() - start
+
+class QueryTimingCursor:
+    """
+    Cursor timing the queries executed through it, in the manner of the connection.execute_wrapper of later
+    versions of Django. Unlike the debug cursor, the SQL of the queries is not formatted or logged.
+    """
+
+    def __init__(self, cursor, query_timing):
+        self.cursor = cursor
+        self.query_timing = query_timing
+
+    def __getattr__(self, attr):
+        return getattr(self.cursor, attr)
+
+    def __iter__(self):
+        return iter(self.cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return self.cursor.__exit__(exc_type, exc_value, traceback)
+
+    def execute(self, sql, params=None):
+        return self.query_timing.time_query(self.cursor.execute, sql, params)
+
+    def executemany(self, sql, param_list):
+        return self.query_timing.time_query(self.cursor.executemany, sql, param_list)
+
+def get_timed_cursor_factory(cursor_factory, query_timing):
+    """
+    Get a replacement for a connection's cursor method, returning its cursors wrapped in a QueryTimingCursor.
+    """
+    def timed_cursor():
+        return QueryTimingCursor(cursor_factory(), query_timing)
+    return timed_cursor
+
+def get_server_timing(latency_seconds, db_seconds, query_count, template_seconds):
+    """
+    Get the Server-Timing header of a request, with its timings in milliseconds.
+    """
+    server_timing = 'total;dur=%.1f, db;dur=%.1f;desc="%d queries"' % (latency_seconds * 1000, db_seconds * 1000, query_count)
+    if template_seconds != None:
+        server_timing += ', template;dur=%.1f' % (template_seconds * 1000)
+    return server_timing
@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.4 on 2026-10-19 10:42
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('psnvalue', '0018_remove_gamelist_image_data'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gamelist',
+            name='next_refresh',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+    ]
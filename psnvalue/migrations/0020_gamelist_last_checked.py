@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.4 on 2026-10-19 10:45
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('psnvalue', '0019_gamelist_next_refresh'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gamelist',
+            name='last_checked',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
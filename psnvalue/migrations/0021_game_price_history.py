@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.4 on 2026-10-19 10:46
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+BACKFILL_BATCH_SIZE = 500
+
+
+def backfill_price_history(apps, schema_editor):
+    """
+    Seed the price lows, and the first history record, of each game from its current price and rating.
+    """
+    GameList = apps.get_model('psnvalue', 'GameList')
+    GamePriceHistory = apps.get_model('psnvalue', 'GamePriceHistory')
+
+    GameList.objects.update(lowest_base_price=models.F('base_price'), lowest_plus_price=models.F('plus_price'), at_lowest_price=True)
+
+    history = []
+    for game in GameList.objects.all().iterator():
+        history.append(GamePriceHistory(
+            game_id_fk=game,
+            recorded_at=game.last_updated,
+            price=round(game.price),
+            base_price=round(game.base_price),
+            plus_price=round(game.plus_price),
+            base_discount=game.base_discount,
+            plus_discount=game.plus_discount,
+            rating=round(game.rating * 100),
+            rating_count=game.rating_count,
+        ))
+        if len(history) >= BACKFILL_BATCH_SIZE:
+            GamePriceHistory.objects.bulk_create(history)
+            history = []
+    GamePriceHistory.objects.bulk_create(history)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('psnvalue', '0020_gamelist_last_checked'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gamelist',
+            name='at_lowest_price',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='gamelist',
+            name='lowest_base_price',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddField(
+            model_name='gamelist',
+            name='lowest_plus_price',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.CreateModel(
+            name='GamePriceMonthly',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('min_base_price', models.IntegerField(default=0)),
+                ('max_base_price', models.IntegerField(default=0)),
+                ('min_plus_price', models.IntegerField(default=0)),
+                ('max_plus_price', models.IntegerField(default=0)),
+                ('change_count', models.IntegerField(default=0)),
+                ('game_id_fk', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='psnvalue.GameList')),
+            ],
+            options={
+                'unique_together': {('game_id_fk', 'month')},
+            },
+        ),
+        migrations.CreateModel(
+            name='GamePriceHistory',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recorded_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('price', models.IntegerField(default=0)),
+                ('base_price', models.IntegerField(default=0)),
+                ('plus_price', models.IntegerField(default=0)),
+                ('base_discount', models.PositiveSmallIntegerField(default=0)),
+                ('plus_discount', models.PositiveSmallIntegerField(default=0)),
+                ('rating', models.PositiveSmallIntegerField(default=0)),
+                ('rating_count', models.IntegerField(default=0)),
+                ('game_id_fk', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='psnvalue.GameList')),
+            ],
+            options={
+                'index_together': {('game_id_fk', 'recorded_at')},
+            },
+        ),
+        migrations.RunPython(backfill_price_history, migrations.RunPython.noop),
+    ]
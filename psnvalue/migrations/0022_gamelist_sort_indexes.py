@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.4 on 2026-10-19 10:47
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('psnvalue', '0021_game_price_history'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='gamelist',
+            index_together={('library_fk', 'plus_discount'), ('library_fk', 'plus_value_score'), ('library_fk', 'weighted_rating'), ('library_fk', 'base_value_score'), ('library_fk', 'plus_price')},
+        ),
+    ]
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.4 on 2026-10-19 10:48
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+# The highest bit of GameList.content_mask that can be assigned to a content descriptor.
+CONTENT_DESCRIPTOR_MAX_BIT = 62
+
+
+def backfill_content_mask(apps, schema_editor):
+    """
+    Assign a bit to each existing content descriptor, and set the content mask of each game from its game content.
+    """
+    ContentDescriptors = apps.get_model('psnvalue', 'ContentDescriptors')
+    GameContent = apps.get_model('psnvalue', 'GameContent')
+    GameList = apps.get_model('psnvalue', 'GameList')
+
+    content_masks = {}
+    for content_bit, content_descriptor in enumerate(ContentDescriptors.objects.order_by('pk')):
+        if content_bit <= CONTENT_DESCRIPTOR_MAX_BIT:
+            content_descriptor.content_bit = content_bit
+            content_descriptor.save(update_fields=['content_bit'])
+            content_masks[content_descriptor.pk] = 1 << content_bit
+
+    game_masks = {}
+    for game_id, content_descriptor_id in GameContent.objects.values_list('game_id_fk', 'content_descriptor_fk').iterator():
+        game_masks[game_id] = game_masks.get(game_id, 0) | content_masks.get(content_descriptor_id, 0)
+
+    # Games sharing a content mask are updated together.
+    games_by_mask = {}
+    for game_id, content_mask in game_masks.items():
+        games_by_mask.setdefault(content_mask, []).append(game_id)
+    for content_mask, game_ids in games_by_mask.items():
+        GameList.objects.filter(pk__in=game_ids).update(content_mask=content_mask)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('psnvalue', '0022_gamelist_sort_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contentdescriptors',
+            name='content_bit',
+            field=models.PositiveSmallIntegerField(null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='gamelist',
+            name='content_mask',
+            field=models.BigIntegerField(db_index=True, default=0),
+        ),
+        migrations.RunPython(backfill_content_mask, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.4 on 2026-10-19 10:48
+from __future__ import unicode_literals
+
+import re
+
+from django.db import migrations, models
+from django.db.models import Case, When, Value
+
+GAME_NAME_SYMBOLS = re.compile('[™®©]')
+GAME_NAME_WHITESPACE = re.compile(r'\s+')
+# The number of distinct game names whose games are updated by each UPDATE of the backfill.
+BACKFILL_BATCH_SIZE = 100
+
+
+def backfill_game_name_normalized(apps, schema_editor):
+    """
+    Set the normalized name of each existing game (see search.normalize_game_name).
+
+    Games sharing a name (e.g. in each library) are updated together, and the games of a batch of names
+    are updated by a single UPDATE, setting each name's normalized name with a CASE.
+    """
+    GameList = apps.get_model('psnvalue', 'GameList')
+    game_names = list(GameList.objects.order_by('game_name').values_list('game_name', flat=True).distinct())
+    for batch_start in range(0, len(game_names), BACKFILL_BATCH_SIZE):
+        batch_names = game_names[batch_start:batch_start + BACKFILL_BATCH_SIZE]
+        normalized_names = [When(game_name=game_name, then=Value(GAME_NAME_WHITESPACE.sub(' ', GAME_NAME_SYMBOLS.sub('', game_name)).strip().casefold())) for game_name in batch_names]
+        GameList.objects.filter(game_name__in=batch_names).update(game_name_normalized=Case(*normalized_names, output_field=models.TextField()))
+
+
+def create_trigram_index(apps, schema_editor):
+    """
+    Create a trigram index on the normalized game name, on PostgreSQL only.
+    """
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        schema_editor.execute('CREATE INDEX psnvalue_gamelist_game_name_normalized_trgm ON psnvalue_gamelist USING gin (game_name_normalized gin_trgm_ops)')
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS psnvalue_gamelist_game_name_normalized_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('psnvalue', '0023_content_mask'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gamelist',
+            name='game_name_normalized',
+            field=models.TextField(db_index=True, default=''),
+        ),
+        migrations.RunPython(backfill_game_name_normalized, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
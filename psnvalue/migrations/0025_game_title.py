@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.4 on 2026-10-19 10:49
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def get_title_key(game_id):
+    """
+    Get the title key of a game from its product id (see psn_game_snapshot.get_title_key).
+    """
+    product_id_parts = game_id.split('-')
+    if len(product_id_parts) != 3:
+        return game_id
+    return product_id_parts[0][2:] + '-' + product_id_parts[2]
+
+
+def backfill_game_titles(apps, schema_editor):
+    """
+    Create a title for each existing game, sharing titles between regions, and move game content to the titles.
+    """
+    GameList = apps.get_model('psnvalue', 'GameList')
+    GameTitle = apps.get_model('psnvalue', 'GameTitle')
+    GameContent = apps.get_model('psnvalue', 'GameContent')
+    TitleContent = apps.get_model('psnvalue', 'TitleContent')
+
+    for game in GameList.objects.order_by('pk').iterator():
+        title, created = GameTitle.objects.get_or_create(title_key=get_title_key(game.game_id), defaults={
+            'title_name': game.game_name,
+            'age_rating': game.age_rating,
+            'image_url': game.image_url,
+            'image_datastore_url': game.image_datastore_url,
+            'content_mask': game.content_mask,
+        })
+        game.title_fk = title
+        game.save(update_fields=['title_fk'])
+
+        for game_content in GameContent.objects.filter(game_id_fk=game):
+            TitleContent.objects.get_or_create(title_fk=title, content_descriptor_fk_id=game_content.content_descriptor_fk_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('psnvalue', '0024_gamelist_game_name_normalized'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GameTitle',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title_key', models.TextField(unique=True)),
+                ('title_name', models.TextField()),
+                ('age_rating', models.IntegerField(default=0)),
+                ('image_url', models.TextField()),
+                ('image_datastore_url', models.TextField(blank=True)),
+                ('content_mask', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='gamelist',
+            name='title_fk',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='psnvalue.GameTitle'),
+        ),
+        migrations.CreateModel(
+            name='TitleContent',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_descriptor_fk', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='psnvalue.ContentDescriptors')),
+                ('title_fk', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='psnvalue.GameTitle')),
+            ],
+            options={
+                'unique_together': {('title_fk', 'content_descriptor_fk')},
+            },
+        ),
+        migrations.RunPython(backfill_game_titles, migrations.RunPython.noop),
+    ]
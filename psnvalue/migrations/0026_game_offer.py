@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.4 on 2026-10-19 10:51
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('psnvalue', '0025_game_title'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='gamelist',
+            name='game_id',
+            field=models.TextField(),
+        ),
+        migrations.AlterUniqueTogether(
+            name='gamelist',
+            unique_together={('game_id', 'library_fk')},
+        ),
+        migrations.DeleteModel(
+            name='GameContent',
+        ),
+        migrations.RemoveField(
+            model_name='gamelist',
+            name='image_datastore_url',
+        ),
+        migrations.RemoveField(
+            model_name='gamelist',
+            name='image_url',
+        ),
+    ]
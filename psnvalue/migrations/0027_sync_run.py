@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.4 on 2026-10-19 10:54
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('psnvalue', '0026_game_offer'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncRun',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('finished', 'Finished'), ('failed', 'Failed')], default='running', max_length=10)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SyncRunLibrary',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('finished', 'Finished'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('games_total', models.IntegerField(default=0)),
+                ('games_processed', models.IntegerField(default=0)),
+                ('library_fk', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='psnvalue.Library')),
+                ('sync_run_fk', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='psnvalue.SyncRun')),
+            ],
+            options={
+                'unique_together': {('sync_run_fk', 'library_fk')},
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.4 on 2026-10-19 10:57
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('psnvalue', '0027_sync_run'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GameScore',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_version', models.CharField(max_length=20)),
+                ('weighted_rating', models.FloatField(default=0.0)),
+                ('base_value_score', models.IntegerField(default=0)),
+                ('plus_value_score', models.IntegerField(default=0)),
+                ('game_id_fk', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='psnvalue.GameList')),
+            ],
+            options={
+                'unique_together': {('game_id_fk', 'model_version')},
+                'index_together': {('model_version', 'plus_value_score')},
+            },
+        ),
+    ]
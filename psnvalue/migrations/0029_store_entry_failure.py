@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.4 on 2026-10-19 11:04
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('psnvalue', '0028_game_score'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoreEntryFailure',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('game_id', models.TextField()),
+                ('reason', models.CharField(max_length=100)),
+                ('expires_at', models.DateTimeField()),
+                ('library_fk', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='psnvalue.Library')),
+            ],
+            options={
+                'unique_together': {('game_id', 'library_fk')},
+                'index_together': {('library_fk', 'expires_at')},
+            },
+        ),
+    ]
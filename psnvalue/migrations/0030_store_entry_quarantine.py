@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.4 on 2026-10-19 11:30
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('psnvalue', '0029_store_entry_failure'),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='storeentryfailure',
+            old_name='expires_at',
+            new_name='next_attempt_at',
+        ),
+        migrations.AlterIndexTogether(
+            name='storeentryfailure',
+            index_together=set([('library_fk', 'next_attempt_at')]),
+        ),
+        migrations.AddField(
+            model_name='storeentryfailure',
+            name='url',
+            field=models.TextField(default=''),
+        ),
+        migrations.AddField(
+            model_name='storeentryfailure',
+            name='error_class',
+            field=models.CharField(default='', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='storeentryfailure',
+            name='attempt_count',
+            field=models.IntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='storeentryfailure',
+            name='last_failed_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='storeentryfailure',
+            name='quarantined',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='storeentryfailure',
+            name='listing_fingerprint',
+            field=models.CharField(default='', max_length=40),
+        ),
+    ]
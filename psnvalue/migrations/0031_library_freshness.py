@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.4 on 2026-10-19 11:09
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('psnvalue', '0030_store_entry_quarantine'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='library',
+            name='freshness_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='library',
+            name='game_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='library',
+            name='stale_game_count',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.4 on 2026-10-19 11:13
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('psnvalue', '0031_library_freshness'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskProfile',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task_name', models.CharField(max_length=100)),
+                ('started_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('duration_seconds', models.FloatField(default=0.0)),
+                ('summary', models.TextField()),
+                ('profile_data', models.BinaryField()),
+                ('library_fk', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='psnvalue.Library')),
+                ('sync_run_fk', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='psnvalue.SyncRun')),
+            ],
+        ),
+    ]
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.4 on 2026-10-19 11:33
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('psnvalue', '0032_task_profile'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='gamelist',
+            name='lowest_base_price',
+            field=models.FloatField(default=None, null=True),
+        ),
+        migrations.AlterField(
+            model_name='gamelist',
+            name='lowest_plus_price',
+            field=models.FloatField(default=None, null=True),
+        ),
+    ]
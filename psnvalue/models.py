@@ -12,23 +12,62 @@ class Library(models.Model):
     library_url = models.TextField()
     library_rating_stdev = models.FloatField(default=0.0)
     library_rating_mean = models.FloatField(default=0.0)
+    # Freshness of the library's games, aggregated after each sync or refresh (see psn_metrics)
+    game_count = models.IntegerField(default=0)
+    stale_game_count = models.IntegerField(default=0)
+    freshness_updated_at = models.DateTimeField(null=True, blank=True)
 
     def __str__(self):
         return self.library_name
 
+    def get_stale_game_percent(self):
+        """
+        Get the percentage of the library's games that are stale, as of the last freshness update.
+        """
+        if self.game_count == 0:
+            return 0
+        return round(100.0 * self.stale_game_count / self.game_count)
+
     def was_updated_within_last_day(self):
         return self.last_updated >= last_day_timedate()
 
+class GameTitle(models.Model):
+    """
+    Metadata of a game that is shared by its offers in every regional library.
+
+    Titles are matched across regions on their title key (see GameSnapshot.title_key), so that thumbnails
+    and content descriptors are only ingested once for all regions.
+    """
+    title_key = models.TextField(unique=True)
+    title_name = models.TextField()
+    age_rating = models.IntegerField(default=0)
+    # Thumbnail fields
+    image_url = models.TextField()
+    image_datastore_url = models.TextField(blank=True)
+    # Bitmask of the title's content descriptors (see ContentDescriptors.content_bit)
+    content_mask = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return self.title_key + ": " + self.title_name
+
 class GameList(models.Model):
-    game_id = models.TextField(unique=True)
+    """
+    Offer of a game in a regional library, with its regional price, ratings and scores.
+
+    The game's age rating and content mask are copied from its title, so that the game list can be
+    filtered on them without a join.
+    """
+    game_id = models.TextField()
     game_name = models.TextField()
+    # Game name with trademark symbols stripped and case folded (see search.normalize_game_name)
+    game_name_normalized = models.TextField(default='', db_index=True)
     json_url = models.TextField()
     age_rating = models.IntegerField(default=0)
     library_fk = models.ForeignKey(Library, on_delete=models.CASCADE)
+    title_fk = models.ForeignKey(GameTitle, on_delete=models.CASCADE, null=True)
     last_updated = models.DateTimeField(default=timezone.now)
-    # Thumbnail fields
-    image_url = models.TextField()
-    image_datastore_url = models.TextField(blank=True)
+    last_checked = models.DateTimeField(default=timezone.now)
+    next_refresh = models.DateTimeField(default=timezone.now, db_index=True)
     # Price fields
     price = models.FloatField(default=0.0)
     base_price = models.FloatField(default=0.0)
@@ -42,6 +81,24 @@ class GameList(models.Model):
     # Value fields
     base_value_score = models.IntegerField(default=0)
     plus_value_score = models.IntegerField(default=0)
+    # Price history fields
+    # Lowest prices ever recorded, or null until the game's price is first recorded
+    lowest_base_price = models.FloatField(null=True, default=None)
+    lowest_plus_price = models.FloatField(null=True, default=None)
+    at_lowest_price = models.BooleanField(default=False)
+    # Bitmask of the game's content descriptors (see ContentDescriptors.content_bit)
+    content_mask = models.BigIntegerField(default=0, db_index=True)
+
+    class Meta:
+        unique_together = ('game_id', 'library_fk',)
+        # One index for each sort option of the game list, so that every sort is index-served.
+        index_together = [
+            ('library_fk', 'plus_value_score'),
+            ('library_fk', 'base_value_score'),
+            ('library_fk', 'weighted_rating'),
+            ('library_fk', 'plus_price'),
+            ('library_fk', 'plus_discount'),
+        ]
 
     def __str__(self):
         return self.game_id + ": " + self.game_name
@@ -49,16 +106,184 @@ class GameList(models.Model):
     def was_updated_within_last_day(self):
         return self.last_updated >= last_day_timedate()
 
+# The minimum number of ratings needed by a game to be displayed in the game list.
+GAMELIST_MIN_RATING_COUNT = 50
+# The minimum price of a game to be displayed in the game list (used to exclude free to play).
+GAMELIST_MIN_PRICE = 1
+
+# The highest bit of GameList.content_mask that can be assigned to a content descriptor.
+CONTENT_DESCRIPTOR_MAX_BIT = 62
+
 class ContentDescriptors(models.Model):
     content_name = models.TextField(unique=True)
     content_description = models.TextField()
+    # The bit representing this content descriptor in GameList.content_mask
+    content_bit = models.PositiveSmallIntegerField(unique=True, null=True)
 
     def __str__(self):
         return self.content_name
 
-class GameContent(models.Model):
+    def get_content_mask(self):
+        """
+        Get the mask of this content descriptor's bit in GameList.content_mask, or 0 if it has no bit.
+        """
+        return 0 if self.content_bit == None else 1 << self.content_bit
+
+class GamePriceHistory(models.Model):
+    """
+    Append-only record of a game's price and rating, written only when either changes.
+
+    Prices are stored as integer cents (as returned by the PSN store) and ratings as integer hundredths.
+    """
+    game_id_fk = models.ForeignKey(GameList, on_delete=models.CASCADE)
+    recorded_at = models.DateTimeField(default=timezone.now)
+    price = models.IntegerField(default=0)
+    base_price = models.IntegerField(default=0)
+    plus_price = models.IntegerField(default=0)
+    base_discount = models.PositiveSmallIntegerField(default=0)
+    plus_discount = models.PositiveSmallIntegerField(default=0)
+    rating = models.PositiveSmallIntegerField(default=0)
+    rating_count = models.IntegerField(default=0)
+
+    class Meta:
+        index_together = ('game_id_fk', 'recorded_at',)
+
+class GamePriceMonthly(models.Model):
+    """
+    Monthly rollup of a game's price history.
+
+    Rollups are kept after the raw history older than the retention period has been pruned.
+    """
     game_id_fk = models.ForeignKey(GameList, on_delete=models.CASCADE)
+    month = models.DateField()
+    min_base_price = models.IntegerField(default=0)
+    max_base_price = models.IntegerField(default=0)
+    min_plus_price = models.IntegerField(default=0)
+    max_plus_price = models.IntegerField(default=0)
+    change_count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('game_id_fk', 'month',)
+
+class GameScore(models.Model):
+    """
+    Scores of a game from a shadow version of the scoring model (see psn_scoring).
+
+    The production version's scores are kept on GameList itself.
+    """
+    game_id_fk = models.ForeignKey(GameList, on_delete=models.CASCADE)
+    model_version = models.CharField(max_length=20)
+    weighted_rating = models.FloatField(default=0.0)
+    base_value_score = models.IntegerField(default=0)
+    plus_value_score = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('game_id_fk', 'model_version',)
+        index_together = ('model_version', 'plus_value_score',)
+
+class TitleContent(models.Model):
+    title_fk = models.ForeignKey(GameTitle, on_delete=models.CASCADE)
     content_descriptor_fk = models.ForeignKey(ContentDescriptors, on_delete=models.CASCADE)
 
     class Meta:
-        unique_together = ('game_id_fk', 'content_descriptor_fk',)
+        unique_together = ('title_fk', 'content_descriptor_fk',)
+
+# Status of a sync run, or of one library within a sync run.
+SYNC_STATUS_PENDING = 'pending'
+SYNC_STATUS_RUNNING = 'running'
+SYNC_STATUS_FINISHED = 'finished'
+SYNC_STATUS_FAILED = 'failed'
+SYNC_STATUS_CHOICES = (
+    (SYNC_STATUS_PENDING, 'Pending'),
+    (SYNC_STATUS_RUNNING, 'Running'),
+    (SYNC_STATUS_FINISHED, 'Finished'),
+    (SYNC_STATUS_FAILED, 'Failed'),
+)
+
+class SyncRun(models.Model):
+    """
+    A sync of every PSN library with the PSN store, whose libraries are synced concurrently.
+    """
+    started_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    status = models.CharField(max_length=10, choices=SYNC_STATUS_CHOICES, default=SYNC_STATUS_RUNNING)
+
+    def __str__(self):
+        return "Sync run " + str(self.pk) + ": " + self.status
+
+class SyncRunLibrary(models.Model):
+    """
+    Progress of the sync of one library within a sync run.
+    """
+    sync_run_fk = models.ForeignKey(SyncRun, on_delete=models.CASCADE)
+    library_fk = models.ForeignKey(Library, on_delete=models.CASCADE)
+    status = models.CharField(max_length=10, choices=SYNC_STATUS_CHOICES, default=SYNC_STATUS_PENDING)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    games_total = models.IntegerField(default=0)
+    games_processed = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('sync_run_fk', 'library_fk',)
+
+    def get_progress_percent(self):
+        """
+        Get the percentage of the library's games processed so far.
+        """
+        if self.games_total == 0:
+            return 0
+        return round(100.0 * self.games_processed / self.games_total)
+
+    def get_games_per_second(self):
+        """
+        Get the throughput of the library's sync so far, or until it finished.
+        """
+        if self.started_at == None:
+            return 0.0
+        elapsed = ((self.finished_at or timezone.now()) - self.started_at).total_seconds()
+        return self.games_processed / elapsed if elapsed > 0 else 0.0
+
+class StoreEntryFailure(models.Model):
+    """
+    A game listed in the PSN store whose details failed to sync.
+
+    Syncs skip the game until its next attempt, backing off after each failure. A game that keeps failing is
+    quarantined, and is not requested again until its listing changes or it is released in the admin.
+    """
+    game_id = models.TextField()
+    library_fk = models.ForeignKey(Library, on_delete=models.CASCADE)
+    url = models.TextField(default='')
+    error_class = models.CharField(max_length=100, default='')
+    reason = models.CharField(max_length=100)
+    attempt_count = models.IntegerField(default=1)
+    last_failed_at = models.DateTimeField(default=timezone.now)
+    next_attempt_at = models.DateTimeField()
+    quarantined = models.BooleanField(default=False)
+    # Fingerprint of the game's entry in the PSN store listing when it last failed
+    listing_fingerprint = models.CharField(max_length=40, default='')
+
+    class Meta:
+        unique_together = ('game_id', 'library_fk',)
+        index_together = ('library_fk', 'next_attempt_at',)
+
+    def __str__(self):
+        return self.game_id + ": " + self.error_class + " x" + str(self.attempt_count)
+
+class TaskProfile(models.Model):
+    """
+    A cProfile capture of a Celery task, for diagnosing slow tasks after the fact (see psn_profiling).
+
+    Profiles of a library sync within a sync run are kept with the sync run.
+    """
+    task_name = models.CharField(max_length=100)
+    library_fk = models.ForeignKey(Library, on_delete=models.SET_NULL, null=True, blank=True)
+    sync_run_fk = models.ForeignKey(SyncRun, on_delete=models.CASCADE, null=True, blank=True)
+    started_at = models.DateTimeField(default=timezone.now)
+    duration_seconds = models.FloatField(default=0.0)
+    # The top functions of the profile, as printed by pstats
+    summary = models.TextField()
+    # The full profile, in the format written by pstats.Stats.dump_stats
+    profile_data = models.BinaryField()
+
+    def __str__(self):
+        return self.task_name + " at " + str(self.started_at)
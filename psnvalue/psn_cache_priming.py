@@ -0,0 +1,157 @@
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import connections
+from django.http import Http404
+from django.urls import reverse, resolve
+from .psn_library_dao import PSNLibraryDAO
+
+# Cache key of a rendered page, by URL name, library ID and page number.
+PAGE_CACHE_KEY = 'psnvalue:page:%s:%s:%s'
+# Attribute set on the requests of the cache primer, so the page is rendered into the cache rather than served from it.
+PAGE_CACHE_PRIME_ATTR = 'prime_page_cache'
+# Seconds a page cached by a visitor's request is kept, by default. Primed pages are kept until they are replaced
+# by the next priming, so they never expire between syncs.
+PAGE_CACHE_DEFAULT_TIMEOUT = 15 * 60
+# Number of pages of each library's game list primed, by default.
+CACHE_PRIME_DEFAULT_PAGE_COUNT = 3
+# Number of pages primed concurrently, by default.
+CACHE_PRIME_DEFAULT_WORKERS = 4
+# The query string parameter for the page number of the game list.
+CACHE_PRIME_PAGE_PARAM = 'page'
+
+def get_page_cache_key(url_name, library_id, page_number):
+    """
+    Get the cache key of a rendered page.
+
+    Args:
+        url_name: The URL name of the page's view.
+        library_id: The ID of the library the page is for, or None.
+        page_number: The page number, as in the query string.
+    Returns:
+        str: The cache key.
+    """
+    return PAGE_CACHE_KEY % (url_name, library_id, page_number)
+
+def get_page_cache_timeout(request):
+    """
+    Get the seconds a page rendered for a request is kept in the cache.
+
+    Pages rendered by the cache primer are kept until they are primed again. Pages rendered for a visitor
+    (e.g. pages past those primed) are kept for settings.PSN_PAGE_CACHE_TIMEOUT, as nothing replaces them.
+
+    Args:
+        request: The request the page was rendered for.
+    Returns:
+        number: The timeout in seconds, or None to keep the page until it is replaced.
+    """
+    if getattr(request, PAGE_CACHE_PRIME_ATTR, False):
+        return None
+    return getattr(settings, 'PSN_PAGE_CACHE_TIMEOUT', PAGE_CACHE_DEFAULT_TIMEOUT)
+
+def cache_rendered_page(cache_key, timeout):
+    """
+    Get a post-render callback of a template response, caching its rendered content under the cache key.
+    """
+    def set_cached_page(response):
+        if response.status_code == 200:
+            cache.set(cache_key, response.content, timeout)
+    return set_cached_page
+
+class PSNCachePrimer:
+    """
+    Warm the page cache after a sync, refresh or rescore, and on worker boot, so visitors don't pay for a cold cache.
+
+    The index page and the first pages of each library's game list, in the default sort, are rendered into
+    the cache concurrently, replacing any pages cached before the sync. Primed pages don't expire, so they
+    stay warm until they are replaced by the next priming. Pages are rendered by calling the
+    views directly, so they read from the primary DB, which always has the latest sync.
+    """
+
+    psn_library_dao = PSNLibraryDAO()
+
+    def get_prime_paths(self, library_ids=None):
+        """
+        Get the paths of the pages to prime.
+
+        Args:
+            library_ids: The IDs of the libraries whose game lists to prime, or None for every library.
+        Returns:
+            list: The (path, page number) of each page, the index page first.
+        """
+        if library_ids == None:
+            library_ids = [library.pk for library in self.psn_library_dao.get_all_libraries()]
+        page_count = getattr(settings, 'PSN_CACHE_PRIME_PAGES', CACHE_PRIME_DEFAULT_PAGE_COUNT)
+        prime_paths = [(reverse('psnvalue:index'), None)]
+        for library_id in library_ids:
+            gamelist_path = reverse('psnvalue:gamelist', args=[library_id])
+            prime_paths.extend((gamelist_path, page_number) for page_number in range(1, page_count + 1))
+        return prime_paths
+
+    def prime(self, library_ids=None):
+        """
+        Prime the page cache, rendering the pages concurrently.
+
+        Args:
+            library_ids: The IDs of the libraries whose game lists to prime, or None for every library.
+        Returns:
+            int: The number of pages primed.
+        """
+        prime_paths = self.get_prime_paths(library_ids)
+        with ThreadPoolExecutor(max_workers=getattr(settings, 'PSN_CACHE_PRIME_WORKERS', CACHE_PRIME_DEFAULT_WORKERS)) as executor:
+            return sum(executor.map(lambda prime_path: self.prime_page_in_thread(*prime_path), prime_paths))
+
+    def prime_page_in_thread(self, path, page_number):
+        """
+        Prime a page from a worker thread, closing the thread's DB connections afterwards.
+        """
+        try:
+            return self.prime_page(path, page_number)
+        finally:
+            connections.close_all()
+
+    def prime_page(self, path, page_number):
+        """
+        Render a page into the page cache, as an anonymous user would request it.
+
+        Args:
+            path: The path of the page.
+            page_number: The page number, or None for a page that isn't paginated.
+        Returns:
+            bool: True if the page was cached, False if it doesn't exist e.g. a library with fewer pages, in which
+                  case any page cached before is deleted.
+        """
+        # Imported here, as the web workers import this module for the page cache keys
+        from django.test import RequestFactory
+        request = RequestFactory().get(path, {CACHE_PRIME_PAGE_PARAM: page_number} if page_number != None else {})
+        request.user = AnonymousUser()
+        setattr(request, PAGE_CACHE_PRIME_ATTR, True)
+        match = resolve(path)
+        request.resolver_match = match
+        try:
+            response = match.func(request, *match.args, **match.kwargs)
+        except Http404:
+            # A page past the end of the game list, whose page primed before the library shrank is dropped
+            self.delete_cached_page(match, request)
+            return False
+        if hasattr(response, 'render'):
+            response.render()
+        if response.status_code != 200:
+            self.delete_cached_page(match, request)
+            return False
+        return True
+
+    def delete_cached_page(self, match, request):
+        """
+        Delete a page from the page cache, as primed pages are kept until they are primed again.
+
+        Args:
+            match: The resolved URL of the page.
+            request: The request the page was primed with.
+        """
+        view = match.func.view_class(**match.func.view_initkwargs)
+        view.request, view.args, view.kwargs = request, match.args, match.kwargs
+        cache_key = view.get_page_cache_key()
+        if cache_key != None:
+            cache.delete(cache_key)
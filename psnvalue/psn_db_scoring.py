@@ -0,0 +1,105 @@
+from django.db.models import F, Value, Case, When, Func, FloatField, IntegerField
+from django.db.models.functions import Cast, Coalesce
+from .psn_scoring import ScoringModelV1
+
+# The expressions match the version 1 scoring model exactly, so use its constants.
+DB_SCORING_DEFAULT_GAME_PRICE = float(ScoringModelV1.DEFAULT_GAME_PRICE)
+DB_SCORING_DEFAULT_GAME_WEIGHTED_RATING = float(ScoringModelV1.DEFAULT_GAME_WEIGHTED_RATING)
+DB_SCORING_RATING_COUNT_WEIGHTING = float(ScoringModelV1.RATING_COUNT_WEIGHTING)
+
+class Round(Func):
+    """
+    ROUND(expression, places) as a float.
+
+    PostgreSQL only rounds numerics to a number of places, so the expression is cast to numeric and back.
+    SQL rounds halves away from zero, as does ScoringModelV1 (see round_half_up).
+    """
+    function = 'ROUND'
+
+    def __init__(self, expression, places=0, **extra):
+        super().__init__(expression, Value(places), output_field=FloatField(), **extra)
+
+    def as_postgresql(self, compiler, connection):
+        return self.as_sql(compiler, connection, arg_joiner='::numeric, ', template='%(function)s(%(expressions)s)::double precision')
+
+class NullIf(Func):
+    """
+    NULLIF(expression, value), which is NULL when the expression equals the value.
+    """
+    function = 'NULLIF'
+
+    def __init__(self, expression, value, **extra):
+        super().__init__(expression, Value(value), output_field=FloatField(), **extra)
+
+def as_float(field_name):
+    """
+    Get a column as a float, so that it is not truncated by integer division.
+    """
+    return Cast(F(field_name), FloatField())
+
+def get_weighted_rating_expression(library):
+    """
+    Get the DB expression for the weighted rating of a game (see ScoringModelV1.determine_weighted_game_rating).
+
+    Args:
+        library: The PSN library object from the DB.
+    Returns:
+        Expression: The weighted rating of a game in the library.
+    """
+    rating_count_val = as_float('rating_count') / Value(DB_SCORING_RATING_COUNT_WEIGHTING)
+    # A library whose ratings are all the same has no deviation, rather than dividing by zero.
+    if library.library_rating_stdev == 0:
+        rating_deviation = Value(0.0)
+    else:
+        rating_deviation = (F('rating') - Value(library.library_rating_mean)) / Value(library.library_rating_stdev)
+    final_val = Case(
+        When(rating__gt=library.library_rating_mean, then=Round(F('rating') * (Value(1.0) + rating_deviation), 2) + rating_count_val),
+        default=Round(F('rating') * (Value(-1.0) + rating_deviation), 2) - rating_count_val,
+        output_field=FloatField())
+    # Account for a weighted rating of zero
+    return Coalesce(NullIf(final_val, 0.0), Value(DB_SCORING_DEFAULT_GAME_WEIGHTED_RATING), output_field=FloatField())
+
+def get_game_value_expression(library, weighted_rating, is_plus):
+    """
+    Get the DB expression for the value of a game (see ScoringModelV1.calculate_game_value).
+
+    Args:
+        library: The PSN library object from the DB.
+        weighted_rating: The expression for the weighted rating of the game.
+        is_plus: True for the PS+ value, else false for non-PS+.
+    Returns:
+        Expression: The value of a game in the library.
+    """
+    price_field_name = 'plus_price' if is_plus else 'base_price'
+    discount_field_name = 'plus_discount' if is_plus else 'base_discount'
+
+    # Use DEFAULT_GAME_PRICE for anything less than 1 (stops division by zero errors).
+    game_price = Case(
+        When(**{price_field_name + '__gt': 0.0, 'then': Round(F(price_field_name))}),
+        default=Value(DB_SCORING_DEFAULT_GAME_PRICE),
+        output_field=FloatField())
+    discount_weight = Value(1.0) + (as_float(discount_field_name) / Value(100.0))
+    game_rating = Case(
+        When(rating__gt=library.library_rating_mean, then=(weighted_rating * discount_weight) * Value(100.0)),
+        default=(weighted_rating / discount_weight) * Value(100.0),
+        output_field=FloatField())
+    return Cast(Round(Value(1.0) / (game_price / game_rating) * Value(100.0)), IntegerField())
+
+def get_game_score_expressions(library):
+    """
+    Get the DB expressions for all of the scores of a game, for a single UPDATE of a library.
+
+    Every expression in an UPDATE reads the stored column values, so the value scores use the weighted
+    rating expression itself rather than the weighted_rating column.
+
+    Args:
+        library: The PSN library object from the DB.
+    Returns:
+        dict: The expression for each score field.
+    """
+    weighted_rating = get_weighted_rating_expression(library)
+    return {
+        'weighted_rating': weighted_rating,
+        'base_value_score': get_game_value_expression(library, weighted_rating, False),
+        'plus_value_score': get_game_value_expression(library, weighted_rating, True),
+    }
@@ -0,0 +1,162 @@
+import collections
+from .psn_store_json import (
+    PSN_JSON_ELEM_GAME_ID,
+    PSN_JSON_ELEM_GAME_NAME,
+    PSN_JSON_ELEM_GAME_URL,
+    PSN_JSON_ELEM_GAME_IMAGES,
+    PSN_JSON_ELEM_GAME_IMGTYPE,
+    PSN_JSON_ELEM_GAME_IMGTYPE_THUMB_SML,
+    PSN_JSON_ELEM_GAME_PRICE_BLOCK,
+    PSN_JSON_ELEM_GAME_PRICE,
+    PSN_JSON_ELEM_GAME_REWARDS,
+    PSN_JSON_ELEM_GAME_BASE_DISCOUNT,
+    PSN_JSON_ELEM_GAME_BASE_PRICE,
+    PSN_JSON_ELEM_GAME_BONUS_DISCOUNT,
+    PSN_JSON_ELEM_GAME_BONUS_PRICE,
+    PSN_JSON_ELEM_GAME_RATING_BLOCK,
+    PSN_JSON_ELEM_GAME_RATING_VALUE,
+    PSN_JSON_ELEM_GAME_RATING_COUNT,
+    PSN_JSON_ELEM_GAME_AGERATING,
+    PSN_JSON_ELEM_EACH_GAME_CONTENT,
+    PSN_JSON_ELEM_GAME_CONTENT_NAME,
+    PSN_JSON_ELEM_GAME_CONTENT_DESCR,
+)
+
+#PSN Default Rating Value
+PSN_MODEL_RATING_DEFAULT_VALUE = 1
+#PSN Default Rating Count
+PSN_MODEL_RATING_DEFAULT_COUNT = 0
+
+# Element - The concept id shared by a game's products in every region (not present for all games)
+PSN_JSON_ELEM_GAME_CONCEPT_ID = 'concept_id'
+
+GAME_SNAPSHOT_FIELDS = [
+    'game_id',
+    # Key shared by the game's products in every region (see get_title_key)
+    'title_key',
+    'game_name',
+    'age_rating',
+    'thumbnail_url',
+    # Price fields
+    'price',
+    'base_price',
+    'plus_price',
+    'base_discount',
+    'plus_discount',
+    # Rating fields
+    'rating',
+    'rating_count',
+    # Tuple of (name, description) tuples
+    'content_descriptors',
+]
+
+class GameSnapshot(collections.namedtuple('GameSnapshot', GAME_SNAPSHOT_FIELDS)):
+    """
+    Immutable snapshot of a game's details in the PSN store.
+
+    Built once per game from the detailed game JSON, so that the nested JSON is only traversed once
+    and can be released straight away. Snapshots are small and picklable, so can be passed between
+    processes as a unit of work.
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def from_json(cls, detailed_game_json):
+        """
+        Build a snapshot of a game from the detailed game JSON.
+
+        Raises a KeyError if the game has no PSN_JSON_ELEM_GAME_PRICE_BLOCK element e.g. games still listed
+        for pre-order after release.
+
+        Args:
+            detailed_game_json: The full detailed game info JSON.
+        Returns:
+            GameSnapshot: The snapshot of the game.
+        """
+        game_price_block_json = detailed_game_json[PSN_JSON_ELEM_GAME_PRICE_BLOCK]
+        game_rating_block_json = detailed_game_json[PSN_JSON_ELEM_GAME_RATING_BLOCK]
+
+        # Use the standard game price as default, and only overwrite if there are discounts.
+        price = game_price_block_json[PSN_JSON_ELEM_GAME_PRICE]
+        base_price = price
+        plus_price = price
+        base_discount = 0
+        plus_discount = 0
+
+        # Check if there is a discount json block
+        if (PSN_JSON_ELEM_GAME_REWARDS in game_price_block_json) and (game_price_block_json[PSN_JSON_ELEM_GAME_REWARDS]):
+            reward_json = game_price_block_json[PSN_JSON_ELEM_GAME_REWARDS][0]
+
+            # Check for discounts that apply to PS+ and non-PS+ members
+            if PSN_JSON_ELEM_GAME_BASE_DISCOUNT in reward_json:
+                base_discount = reward_json[PSN_JSON_ELEM_GAME_BASE_DISCOUNT]
+                base_price = reward_json[PSN_JSON_ELEM_GAME_BASE_PRICE]
+                plus_discount = base_discount
+                plus_price = base_price
+
+            # Now check for discounts that apply only to PS Plus members
+            if PSN_JSON_ELEM_GAME_BONUS_DISCOUNT in reward_json:
+                plus_discount = reward_json[PSN_JSON_ELEM_GAME_BONUS_DISCOUNT]
+                plus_price = reward_json[PSN_JSON_ELEM_GAME_BONUS_PRICE]
+
+        rating = game_rating_block_json[PSN_JSON_ELEM_GAME_RATING_VALUE]
+        rating_count = game_rating_block_json[PSN_JSON_ELEM_GAME_RATING_COUNT]
+
+        content_descriptors = tuple(
+            (content_json[PSN_JSON_ELEM_GAME_CONTENT_NAME], content_json[PSN_JSON_ELEM_GAME_CONTENT_DESCR])
+            for content_json in (detailed_game_json.get(PSN_JSON_ELEM_EACH_GAME_CONTENT) or [])
+        )
+
+        return cls(
+            game_id=detailed_game_json[PSN_JSON_ELEM_GAME_ID],
+            title_key=get_title_key(detailed_game_json[PSN_JSON_ELEM_GAME_ID], detailed_game_json.get(PSN_JSON_ELEM_GAME_CONCEPT_ID)),
+            game_name=detailed_game_json[PSN_JSON_ELEM_GAME_NAME],
+            age_rating=detailed_game_json[PSN_JSON_ELEM_GAME_AGERATING],
+            thumbnail_url=get_game_thumbnail(detailed_game_json[PSN_JSON_ELEM_GAME_IMAGES]),
+            price=price,
+            base_price=base_price,
+            plus_price=plus_price,
+            base_discount=base_discount,
+            plus_discount=plus_discount,
+            rating=float(rating) if rating else PSN_MODEL_RATING_DEFAULT_VALUE,
+            rating_count=int(rating_count) if rating_count else PSN_MODEL_RATING_DEFAULT_COUNT,
+            content_descriptors=content_descriptors,
+        )
+
+def get_game_thumbnail(image_list):
+    """
+    Get a thumbnail to use for the game in the PSN library.
+
+    Args:
+        image_list: The list of available thumbnails from the PSN store.
+    Returns:
+        string: Return a string containing the url to the small thumbnail in the PSN Store.
+    """
+    game_thumb = None
+    for eachGameImg in image_list:
+        if eachGameImg[PSN_JSON_ELEM_GAME_IMGTYPE] == PSN_JSON_ELEM_GAME_IMGTYPE_THUMB_SML:
+            game_thumb = eachGameImg[PSN_JSON_ELEM_GAME_URL]
+            break
+    return game_thumb
+
+def get_title_key(game_id, concept_id):
+    """
+    Get the key used to match a game's products across regional libraries.
+
+    The concept id is used when the store provides one. Otherwise the key is built from the product id
+    e.g. 'EP0700-CUSA03365_00-DARKSOULS3000000'. The region prefix of the publisher code (EP, UP, JP etc.)
+    and the region specific title code (CUSA03365_00) are dropped, leaving '0700-DARKSOULS3000000'.
+
+    Args:
+        game_id: The product id of the game in the PSN store.
+        concept_id: The concept id of the game in the PSN store, or None.
+    Returns:
+        string: The title key of the game.
+    """
+    if concept_id:
+        return 'concept-' + str(concept_id)
+    product_id_parts = game_id.split('-')
+    if len(product_id_parts) != 3:
+        return game_id
+    return product_id_parts[0][2:] + '-' + product_id_parts[2]
@@ -0,0 +1,24 @@
+from importlib import import_module
+
+class LazyClient:
+    """
+    Class attribute holding a client shared by every instance of the class, built on first use.
+
+    The client's module is only imported, and the client only built, when the attribute is first read, so
+    importing the class doesn't pay for the dependencies of a client it may never use (e.g. requests,
+    aiohttp). Like a plain class attribute, it can be replaced on an instance or patched on the class.
+    """
+
+    def __init__(self, client_path):
+        """
+        Args:
+            client_path: The dotted path of the client's class e.g. 'psnvalue.psn_store_api.PSNStoreAPI'.
+        """
+        self.client_path = client_path
+        self.client = None
+
+    def __get__(self, instance, owner):
+        if self.client == None:
+            module_path, class_name = self.client_path.rsplit('.', 1)
+            self.client = getattr(import_module(module_path), class_name)()
+        return self.client
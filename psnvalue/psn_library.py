@@ -1,94 +1,83 @@
-import json
-import collections
+import time
 import traceback
-import base64
-import cloudinary
-import cloudinary.uploader
-import cloudinary.api
+from django.conf import settings
 from django.db import transaction
 from django.utils import timezone
-from datetime import datetime
-from celery.utils.log import get_task_logger
-from .psn_library_dao import PSNLibraryDAO
-from .psn_store_api import PSNStoreAPI
+from datetime import timedelta
+from types import SimpleNamespace
+from .psn_lazy import LazyClient
+from .psn_db_scoring import get_game_score_expressions
+from .psn_scoring import get_scoring_model, get_shadow_scoring_versions
+from .psn_running_stats import RunningStats
+from .psn_sync_pipeline import bounded_stage, batched
+from .psn_metrics import METRICS_STALE_GAME_AGE
+from .psn_library_diff import DIFF_GAME_FIELDS, get_game_records, copy_game_records, diff_library
+from .psn_listing_filter import get_listing_now, filter_listing
+from .psn_store_failures import FAILURE_RETENTION_DAYS, STORE_ENTRY_ERRORS, is_store_entry_error, get_listing_fingerprint, get_retry_delay, is_quarantined, get_failure_reason, get_skipped_game_ids
+from .models import SYNC_STATUS_FINISHED, SYNC_STATUS_FAILED
+from .psn_store_json import (
+    PSN_JSON_ELEM_EACH_GAME,
+    PSN_JSON_ELEM_GAME_NAME,
+    PSN_JSON_ELEM_GAME_ID,
+    PSN_JSON_ELEM_GAME_URL,
+    PSN_JSON_ELEM_GAME_PRICE_BLOCK,
+)
 
 #PSN Library Name
 PSN_MODEL_LIBRARY_NAME = 'PS4'
-#PSN Default Rating Value
-PSN_MODEL_RATING_DEFAULT_VALUE = 1
-#PSN Default Rating Count
-PSN_MODEL_RATING_DEFAULT_COUNT = 0
 #PSN Default Age Rating
 PSN_DEFAULT_AGE_RATING = 0
-
-###############################################################
-#   These elements below are part of the PSN library's JSON   #
-###############################################################
-#PSN Each Game JSON element
-PSN_JSON_ELEM_EACH_GAME = 'links'
-#PSN Sub-Base Game JSON element i.e. bundles etc.
-PSN_JSON_ELEM_SUB_GAME = 'parent_name'
-#PSN Game release date
-PSN_JSON_ELEM_RELEASE_DATE = 'release_date'
-#PSN Game ID JSON element
-PSN_JSON_ELEM_GAME_ID = 'id'
-#PSN Game Name JSON element
-PSN_JSON_ELEM_GAME_NAME = 'name'
-#PSN Game Full Detials URL JSON element
-PSN_JSON_ELEM_GAME_URL = 'url'
-#PSN Game Image list JSON element
-PSN_JSON_ELEM_GAME_IMAGES = 'images'
-#PSN Game Image type JSON element
-PSN_JSON_ELEM_GAME_IMGTYPE = 'type'
-#PSN Game Image large thumb
-PSN_JSON_ELEM_GAME_IMGTYPE_THUMB_LRG = 1
-#PSN Game Image small thumb
-PSN_JSON_ELEM_GAME_IMGTYPE_THUMB_SML = 2
-#PSN Main Game details block - This element is part of both the library and game JSON!
-PSN_JSON_ELEM_GAME_PRICE_BLOCK = 'default_sku'
-
-####################################################################
-#   These elements below are part of each individual game's JSON   #
-####################################################################
-# Element - The price of the game before discounts are applied
-PSN_JSON_ELEM_GAME_PRICE = 'price'
-# Parent Element - Block that contains the details of any discounts
-PSN_JSON_ELEM_GAME_REWARDS = 'rewards'
-# Element - The discount on the game for non-PSPlus members
-PSN_JSON_ELEM_GAME_BASE_DISCOUNT = 'discount'
-# Element - The price of the game after applying discount for non-PSPlus members
-PSN_JSON_ELEM_GAME_BASE_PRICE = 'price'
-# Element - The discount on the game for PSPlus members
-PSN_JSON_ELEM_GAME_BONUS_DISCOUNT = 'bonus_discount'
-# Element - The price of the game after applying discount for PSPlus members
-PSN_JSON_ELEM_GAME_BONUS_PRICE = 'bonus_price'
-
-# Parent Element - Block that contains all rating info
-PSN_JSON_ELEM_GAME_RATING_BLOCK = 'star_rating'
-# Element - The rating for this game
-PSN_JSON_ELEM_GAME_RATING_VALUE = 'score'
-# Element - The number of rating votes this game has recieved
-PSN_JSON_ELEM_GAME_RATING_COUNT = 'total'
-
-# Element - The age limit of this game
-PSN_JSON_ELEM_GAME_AGERATING = 'age_limit'
-
-# Parent Element - Block that contains list of content descriptors
-PSN_JSON_ELEM_EACH_GAME_CONTENT = 'content_descriptors'
-# Element - Name of content e.g. Language
-PSN_JSON_ELEM_GAME_CONTENT_NAME = 'name'
-# Element - Description of content e.g. Language
-PSN_JSON_ELEM_GAME_CONTENT_DESCR = 'description'
+#Game fields that are set from the PSN store, or derived from it, and are compared to detect changes
+PSN_GAME_CHANGE_TRACKED_FIELDS = ['price', 'base_price', 'plus_price', 'base_discount', 'plus_discount', 'rating', 'rating_count', 'weighted_rating', 'base_value_score', 'plus_value_score', 'lowest_base_price', 'lowest_plus_price', 'at_lowest_price']
+#Game fields whose changes are recorded in the price history
+PSN_GAME_HISTORY_FIELDS = ['price', 'base_price', 'plus_price', 'base_discount', 'plus_discount', 'rating']
+#Number of days of raw price history kept (older history is only kept as monthly rollups)
+PSN_PRICE_HISTORY_RETENTION_DAYS = 730
+#Game fields that are derived from the library statistics
+PSN_GAME_SCORE_FIELDS = ['weighted_rating', 'base_value_score', 'plus_value_score']
+#Default number of games fetched from the PSN store ahead of those written to the DB, by a library sync
+PSN_SYNC_DEFAULT_QUEUE_SIZE = 100
+#Default number of games written to the DB in each transaction (and progress update) of a library sync
+PSN_SYNC_DEFAULT_WRITE_BATCH_SIZE = 25
 
 class PSNLibrary:
 
-    psn_library_dao = PSNLibraryDAO()
-    psn_store_api = PSNStoreAPI()
+    # Built on first use, so only the clients a task uses are imported (see LazyClient)
+    psn_library_dao = LazyClient('psnvalue.psn_library_dao.PSNLibraryDAO')
+    psn_store_api = LazyClient('psnvalue.psn_store_api.PSNStoreAPI')
+    psn_store_async_api = LazyClient('psnvalue.psn_store_async_api.PSNStoreAsyncAPI')
+    psn_refresh_scheduler = LazyClient('psnvalue.psn_refresh_scheduler.PSNRefreshScheduler')
+
+    """
+    Celery Task - Sync all PSN libraries with PSN Store.
+    """
+    def start_sync_run(self):
+        """
+        Start a sync of every PSN library with the PSN store.
+
+        The libraries are synced concurrently by separate tasks, which share the PSN store budget
+        (see PSNStoreBudget) and report their progress against the returned sync run.
+
+        Returns:
+            SyncRun: The sync run, with a pending sync for each library.
+        """
+        return self.psn_library_dao.add_sync_run(self.psn_library_dao.get_all_libraries())
+
+    def finish_sync_run(self, sync_run_id):
+        """
+        Finish a sync run, once the sync of each of its libraries has finished.
+
+        Args:
+            sync_run_id: The ID of the sync run.
+        """
+        sync_run = self.psn_library_dao.get_sync_run(sync_run_id)
+        if sync_run != None:
+            self.psn_library_dao.finish_sync_run(sync_run)
 
     """
     Celery Task - Sync PSN library with PSN Store.
     """
-    def sync_library_with_store(self, library_id):
+    def sync_library_with_store(self, library_id, sync_run_id=None):
         """
         Syncs the local PSN library with the PSN store.
 
@@ -97,22 +86,32 @@ class PSNLibrary:
 
         Args:
             library_id: The ID of the local library to update.
+            sync_run_id: The ID of the sync run this sync is part of, or None.
         """
         # Get the PSN Library from the DB
         psn_library = self.psn_library_dao.get_library(library_id)
 
         if psn_library != None:
+            sync_run_library = None
+            if sync_run_id != None:
+                sync_run_library = self.psn_library_dao.get_sync_run_library(sync_run_id, psn_library)
+
             try:
                 # Get the PSN Store JSON
                 psn_lib_json = self.psn_store_api.request_psn_lib_json(psn_library.library_url)
 
                 # Update the PSN library with the PSN Store JSON
-                self.update_psn_library(psn_library, psn_lib_json)
+                self.update_psn_library(psn_library, psn_lib_json, sync_run_library)
+
+                if sync_run_library != None:
+                    self.psn_library_dao.finish_sync_run_library(sync_run_library, SYNC_STATUS_FINISHED)
 
             except Exception as e:
                 traceback.print_exc()
+                if sync_run_library != None:
+                    self.psn_library_dao.finish_sync_run_library(sync_run_library, SYNC_STATUS_FAILED)
 
-    def update_psn_library(self, library, library_json):
+    def update_psn_library(self, library, library_json, sync_run_library=None):
         """
         Update the PSN Library using the PSN Store JSON.
 
@@ -120,129 +119,341 @@ class PSNLibrary:
         to the full details for that game. The details at this url are used to add new
         games to the PSN library, or update games already contained within it.
 
+        The sync is a pipeline of stages: the listing is filtered, then the games are fetched from the PSN store
+        (and parsed into snapshots) in a thread, then written to the DB in batches. At most the configured number
+        of games are queued between the fetch and write stages (settings.PSN_SYNC_QUEUE_SIZE), with fetching
+        blocked while the queue is full, so the memory used by a sync does not grow with the size of the store.
+
+        The weighted ratings and values are only scored once all games are processed: the library statistics
+        are then updated from the ratings of every game in the library, and all of its games are scored with
+        them in a single UPDATE. So one sync leaves the whole library consistently scored, without a second pass.
+
         Args:
             library: The PSN library object from the DB.
             library_json: The full library JSON returned by the PSN Store API.
-        """
-        for simple_game_json in library_json[PSN_JSON_ELEM_EACH_GAME]:
-            try:
-                if self.game_is_valid(simple_game_json):
+            sync_run_library: The library's sync within a sync run, to report progress to, or None.
+        """
+        self.psn_library_dao.prune_store_entry_failures(library, timezone.now() - timedelta(days=FAILURE_RETENTION_DAYS))
+        store_entry_failures = self.psn_library_dao.get_store_entry_failures(library)
+        skipped_game_ids = get_skipped_game_ids(library_json[PSN_JSON_ELEM_EACH_GAME], store_entry_failures, timezone.now())
+        valid_games_json = self.get_valid_games_json(library_json, skipped_game_ids)
+        synced_game_count = 0
+        if sync_run_library != None:
+            self.psn_library_dao.start_sync_run_library(sync_run_library, len(valid_games_json))
+
+        sync_start = timezone.now()
+        queue_size = getattr(settings, 'PSN_SYNC_QUEUE_SIZE', PSN_SYNC_DEFAULT_QUEUE_SIZE)
+        write_batch_size = getattr(settings, 'PSN_SYNC_WRITE_BATCH_SIZE', PSN_SYNC_DEFAULT_WRITE_BATCH_SIZE)
+        recovered_game_ids = []
+        # The async client requests a chunk of games at once, so a chunk is no bigger than the queue, to keep to its bound.
+        async_chunk_size = min(getattr(settings, 'PSN_SYNC_ASYNC_CHUNK_SIZE', queue_size), queue_size)
+        game_snapshots = bounded_stage(self.request_game_snapshots(library, valid_games_json, async_chunk_size), queue_size)
+        for game_batch in batched(game_snapshots, write_batch_size):
+            for simple_game_json, game_snapshot in self.write_game_batch(library, game_batch, store_entry_failures):
+                synced_game_count += 1
+                if simple_game_json.get(PSN_JSON_ELEM_GAME_ID) in store_entry_failures:
+                    recovered_game_ids.append(simple_game_json[PSN_JSON_ELEM_GAME_ID])
+
+            # Report progress in batches, to keep the progress writes off the per game path.
+            if sync_run_library != None:
+                self.psn_library_dao.add_sync_run_library_progress(sync_run_library, len(game_batch))
+
+        # Games that synced after failing start afresh
+        if recovered_game_ids:
+            self.psn_library_dao.delete_store_entry_failures(library, recovered_game_ids)
+
+        # Update Library statistics, such as std dev, for rating weighting, then score every game with them.
+        # The statistics cover every game in the library, as every game is scored with them, not just those synced.
+        if synced_game_count > 0:
+            self.psn_library_dao.update_library_statistics(library)
+            self.psn_library_dao.update_library_scores(library, get_game_score_expressions(library))
+            # Schedule the next refresh of the synced games, now that their values are known
+            self.psn_refresh_scheduler.schedule_checked_games(library, sync_start)
+
+        # Roll up the price history of this sync
+        self.update_price_history_rollups(library, sync_start)
+        self.psn_library_dao.update_library_freshness(library, timezone.now() - METRICS_STALE_GAME_AGE)
 
-                    print(simple_game_json[PSN_JSON_ELEM_GAME_NAME])
-                    detailed_game_json_url = simple_game_json[PSN_JSON_ELEM_GAME_URL]
-                    detailed_game_json = self.psn_store_api.request_psn_game_json(detailed_game_json_url)
-                    game = self.psn_library_dao.get_game(library, detailed_game_json[PSN_JSON_ELEM_GAME_ID])
+    @transaction.atomic
+    def write_game_batch(self, library, game_batch, store_entry_failures):
+        """
+        Add or update a batch of games in the PSN library, in one transaction.
 
-                    if game == None:
-                        self.add_game(library, detailed_game_json, detailed_game_json_url)
-                    else:
-                        self.update_game(library, detailed_game_json, game)
+        The batch's games are loaded from the DB with a single query. A game whose store entry failed to sync
+        is recorded as a store entry failure, and does not stop the rest of the batch. Any other error (e.g. the
+        DB or Redis being unavailable) is not the store entry's fault, so is raised, failing the sync.
 
-            except Exception as e:
+        Args:
+            library: The PSN library object from the DB.
+            game_batch: The simple JSON of each game, and its snapshot or the exception raised requesting it.
+            store_entry_failures: The library's failures before this sync, keyed by game id.
+        Returns:
+            list: The simple JSON and snapshot of each game written.
+        """
+        games = self.psn_library_dao.get_games(library, [game_snapshot.game_id for simple_game_json, game_snapshot in game_batch if not isinstance(game_snapshot, Exception)])
+        written_games = []
+        for simple_game_json, game_snapshot in game_batch:
+            print(simple_game_json[PSN_JSON_ELEM_GAME_NAME])
+            if isinstance(game_snapshot, Exception):
+                if not is_store_entry_error(game_snapshot):
+                    raise game_snapshot
+                # Record the failure, so the game is retried with a backoff rather than every sync.
+                self.add_store_entry_failure(library, simple_game_json, game_snapshot, store_entry_failures)
                 # The PSN store has some inconsistencies. When I've seen KeyErrors for the PSN_JSON_ELEM_GAME_PRICE_BLOCK element
                 # its been because a game was still listed in the store for pre-order after it already came out. So ignore these.
-                if PSN_JSON_ELEM_GAME_PRICE_BLOCK not in str(e):
-                    print("Exception processing game: ", simple_game_json[PSN_JSON_ELEM_GAME_NAME])
-                    traceback.print_exc()
+                if PSN_JSON_ELEM_GAME_PRICE_BLOCK not in str(game_snapshot):
+                    print("Exception processing game: ", simple_game_json[PSN_JSON_ELEM_GAME_NAME], repr(game_snapshot))
+                continue
+
+            game = games.get(game_snapshot.game_id)
+            if game == None:
+                self.add_game(library, game_snapshot, simple_game_json[PSN_JSON_ELEM_GAME_URL], defer_scoring=True)
+            else:
+                self.update_game(library, game_snapshot, game, defer_scoring=True)
+            written_games.append((simple_game_json, game_snapshot))
+        return written_games
+
+    def request_game_snapshots(self, library, games_json, async_chunk_size):
+        """
+        Request the snapshot of each game from the PSN store.
+
+        With the async PSN store client enabled (settings.PSN_STORE_ASYNC), games are requested concurrently
+        in chunks, otherwise one at a time. Either way, the requests are limited by the PSN store budget.
 
-        # Update Library statistics, such as std dev, for rating weighting
-        self.psn_library_dao.update_library_statistics(library)
+        Args:
+            library: The PSN library object from the DB.
+            games_json: The simple JSON of each game from the PSN Store.
+            async_chunk_size: The number of games requested concurrently, when the async PSN store client is enabled.
+        Yields:
+            tuple: The simple JSON of each game, and its snapshot or the store entry error raised requesting it.
+        """
+        if getattr(settings, 'PSN_STORE_ASYNC', False):
+            for chunk_start in range(0, len(games_json), async_chunk_size):
+                games_json_chunk = games_json[chunk_start:chunk_start + async_chunk_size]
+                game_urls = [simple_game_json[PSN_JSON_ELEM_GAME_URL] for simple_game_json in games_json_chunk]
+                game_snapshots = self.psn_store_async_api.run(self.psn_store_async_api.request_psn_game_jsons, game_urls, library.pk)
+                for simple_game_json, game_snapshot in zip(games_json_chunk, game_snapshots):
+                    yield simple_game_json, game_snapshot
+        else:
+            for simple_game_json in games_json:
+                try:
+                    game_snapshot = self.psn_store_api.request_psn_game_json(simple_game_json[PSN_JSON_ELEM_GAME_URL], library.pk)
+                except STORE_ENTRY_ERRORS as e:
+                    game_snapshot = e
+                yield simple_game_json, game_snapshot
+
+    def update_price_history_rollups(self, library, recorded_since):
+        """
+        Roll up every month with new price history for the PSN library, and prune expired raw history.
+
+        Args:
+            library: The PSN library object from the DB.
+            recorded_since: The time from which price history is new e.g. the start of the sync.
+        """
+        for month_start in self.psn_library_dao.get_price_history_months(library, recorded_since):
+            month_end = (month_start + timedelta(days=32)).replace(day=1)
+            self.psn_library_dao.update_price_history_rollups(library, month_start, month_end)
+        self.psn_library_dao.prune_price_history(library, timezone.now() - timedelta(days=PSN_PRICE_HISTORY_RETENTION_DAYS))
+
+    """
+    Celery Task - Refresh Overdue Games
+    """
+    def get_library_ids(self):
+        """
+        Get the ID of every PSN library e.g. to refresh each library in a task of its own.
+
+        Returns:
+            list: The IDs of the libraries.
+        """
+        return [library.pk for library in self.psn_library_dao.get_all_libraries()]
+
+    def refresh_overdue_games(self, library_id, game_count):
+        """
+        Refresh the games in the local PSN library that are most overdue a refresh.
+
+        Each game is assigned a next refresh time based on its popularity and volatility
+        (see PSNRefreshScheduler). The most overdue games are re-requested from the PSN
+        store and updated, so the store request budget goes to the games whose value
+        ranking is most likely to change.
+
+        Args:
+            library_id: The ID of the local library to refresh.
+            game_count: The maximum number of games to refresh.
+        Returns:
+            number: The count of refreshed games that changed e.g. to only prime the caches of changed libraries.
+        """
+        library = self.psn_library_dao.get_library(library_id)
+        changed_game_count = 0
+
+        if library != None:
+            refresh_start = timezone.now()
+            for game in self.psn_library_dao.get_overdue_games(library, game_count):
+                try:
+                    print(game.game_name)
+                    game_snapshot = self.psn_store_api.request_psn_game_json(game.json_url, library.pk)
+                    if self.update_game(library, game_snapshot, game):
+                        changed_game_count += 1
+
+                except STORE_ENTRY_ERRORS as e:
+                    # Push back games whose store entry fails, so they don't sit at the front of the queue.
+                    self.psn_refresh_scheduler.postpone_game(game)
+                    self.psn_library_dao.update_game_next_refresh(game)
+                    if PSN_JSON_ELEM_GAME_PRICE_BLOCK not in str(e):
+                        print("Exception refreshing game: ", game.game_name)
+                        traceback.print_exc()
+
+            # Roll up the price history of the refreshed games
+            self.update_price_history_rollups(library, refresh_start)
+            self.psn_library_dao.update_library_freshness(library, timezone.now() - METRICS_STALE_GAME_AGE)
+        return changed_game_count
 
     @transaction.atomic
-    def add_game(self, library, detailed_game_json, detailed_game_json_url):
+    def add_game(self, library, game_snapshot, detailed_game_json_url, defer_scoring=False):
         """
         Add a new game to the PSN Library.
 
-        First add a skeleton record with basic (unchanging) game info to the DB. Then add game
-        content records for this game (these are also unchanging). Finally, send the skeleton
-        record to the update method to add all of the variable game data e.g. price, rating etc.
+        The game is added as an offer of a Title, which holds the (unchanging) metadata shared by the game's
+        offers in every regional library e.g. thumbnail and content descriptors. If this is the first region
+        the Title has been seen in, the Title is created. Then a skeleton record with basic game info is added
+        to the DB. Finally, the skeleton record is sent to the update method to add all of the variable game
+        data e.g. price, rating etc.
 
         This operation is an atomic transaction.
 
         Args:
             library: The PSN library object from the DB.
-            detailed_game_json: The full detailed game info JSON.
+            game_snapshot: The snapshot of the detailed game info JSON.
             detailed_game_json_url: The url contained in the library JSON
                                     that returns the detailed game json.
+            defer_scoring: True if the game is scored later, with the rest of the library (see update_game).
         """
-        game = self.add_skeleton_game_record(library, detailed_game_json, detailed_game_json_url)
-        self.set_psn_game_content(game, detailed_game_json)
-        self.update_game(library, detailed_game_json, game)
+        title = self.get_or_add_title(game_snapshot)
+        game = self.psn_library_dao.add_skeleton_game_record(game_snapshot, detailed_game_json_url, title, library)
+        self.update_game(library, game_snapshot, game, defer_scoring)
 
-    def add_skeleton_game_record(self, library, detailed_game_json, detailed_game_json_url):
+    def get_or_add_title(self, game_snapshot):
         """
-        Add a skeleton record with basic (unchanging) game info to the DB.
+        Get the Title of a game, adding it to the DB if it is not yet in any PSN Library.
+
+        The thumbnail is only uploaded, and the content descriptors only set, by the sync that added the Title,
+        so a Title added concurrently by another region's sync is not uploaded twice.
 
         Args:
-            library: The PSN library object from the DB.
-            detailed_game_json: The full detailed game info JSON.
-            detailed_game_json_url: The url contained in the library JSON
-                                    that returns the detailed game json.
+            game_snapshot: The snapshot of the detailed game info JSON.
+        Returns:
+            GameTitle: The Title of the game.
         """
-        url = detailed_game_json_url
-        id = detailed_game_json[PSN_JSON_ELEM_GAME_ID]
-        name = detailed_game_json[PSN_JSON_ELEM_GAME_NAME]
-        thumb = self.get_game_thumbnail(detailed_game_json[PSN_JSON_ELEM_GAME_IMAGES])
-        thumb_datastore = self.upload_thumb_to_cloudinary(thumb)
-        age = detailed_game_json[PSN_JSON_ELEM_GAME_AGERATING]
-        return self.psn_library_dao.add_skeleton_game_record(id, name, url, thumb, thumb_datastore, age, library)
+        title, created = self.psn_library_dao.get_or_add_title(game_snapshot)
+        if created:
+            title.image_datastore_url = self.upload_thumb_to_cloudinary(game_snapshot.thumbnail_url)
+            self.psn_library_dao.update_title(title)
+            self.set_psn_title_content(title, game_snapshot)
+        return title
 
-    def set_psn_game_content(self, game, detailed_game_json):
+    def set_psn_title_content(self, title, game_snapshot):
         """
-        Set the content descriptors for the game.
+        Set the content descriptors for the title.
 
         Content descriptors are not mandatory for a game. Some examples are 'Online', 'Drugs', 'Violence' etc.
+        The content descriptor bitmask is also set on the title and its games, so that the game list can be
+        filtered on content descriptors without joining through TitleContent.
 
         Args:
-            game: The game in the PSN library to add content descriptors for.
-            detailed_game_json: The full detailed game info JSON.
+            title: The title to add content descriptors for.
+            game_snapshot: The snapshot of the detailed game info JSON.
         """
-        # Check if there is a content descriptors json block
-        if (PSN_JSON_ELEM_EACH_GAME_CONTENT in detailed_game_json) and (detailed_game_json[PSN_JSON_ELEM_EACH_GAME_CONTENT]):
-            for eachContentDescr in detailed_game_json[PSN_JSON_ELEM_EACH_GAME_CONTENT]:
-                content_descriptor = self.psn_library_dao.get_or_create_content_descriptor(eachContentDescr[PSN_JSON_ELEM_GAME_CONTENT_NAME], eachContentDescr[PSN_JSON_ELEM_GAME_CONTENT_DESCR])
-                self.psn_library_dao.get_or_create_game_content(game, content_descriptor)
+        content_mask = 0
+        for content_name, content_description in game_snapshot.content_descriptors:
+            content_descriptor = self.psn_library_dao.get_or_create_content_descriptor(content_name, content_description)
+            self.psn_library_dao.get_or_create_title_content(title, content_descriptor)
+            content_mask |= content_descriptor.get_content_mask()
+
+        if title.content_mask != content_mask:
+            title.content_mask = content_mask
+            self.psn_library_dao.update_title_content_mask(title)
 
     @transaction.atomic
-    def update_game(self, library, detailed_game_json, game):
+    def update_game(self, library, game_snapshot, game, defer_scoring=False):
         """
         Update a game's details in the PSN library.
 
         Variable data, such as price, ratings and the resulting value, is updated with
-        data from the PSN store.
+        data from the PSN store. Only the fields that have changed are written to the DB.
+
+        The weighted rating and value can be deferred when the whole library is being synced, since they
+        depend on library statistics that are only known once every game is processed.
 
         This operation is an atomic transaction.
 
         Args:
             library: The PSN library object from the DB.
-            detailed_game_json: The full detailed game info JSON.
+            game_snapshot: The snapshot of the detailed game info JSON.
             game: The game in the PSN libray to update.
+            defer_scoring: True if the weighted rating and value are scored (and the game scheduled) later, with the rest of the library.
+        Returns:
+            list: The names of the fields of the game that changed.
         """
+        stored_values = self.get_game_field_values(game, PSN_GAME_CHANGE_TRACKED_FIELDS)
         # Set the price
-        self.set_game_price(game, detailed_game_json)
+        self.set_game_price(game, game_snapshot)
         # Set the ratings (both new ratings in psn and updated weighting)
-        self.set_game_ratings(library, game, detailed_game_json[PSN_JSON_ELEM_GAME_RATING_BLOCK])
+        self.set_game_ratings(library, game, game_snapshot, defer_scoring)
         # Set the game value
-        self.set_game_value(library, game)
-        # Update the game object in the DB
-        self.psn_library_dao.update_game(game)
+        if not defer_scoring:
+            self.set_game_value(library, game)
+        # Set the historical low prices
+        self.set_game_price_lows(game)
+        # Schedule the next refresh of the game, now that its value is known. Deferred games are scheduled
+        # once the library is scored (see update_psn_library), as until then their value is stale.
+        if not defer_scoring:
+            self.psn_refresh_scheduler.schedule_game(library, game)
+        # Update the changed fields of the game object in the DB
+        changed_fields = self.get_game_changed_fields(game, stored_values)
+        self.psn_library_dao.update_checked_game(game, changed_fields)
+        # Record price and rating changes in the price history
+        if any(field_name in changed_fields for field_name in PSN_GAME_HISTORY_FIELDS):
+            self.psn_library_dao.add_game_price_history(game)
+        return changed_fields
+
+    def get_game_field_values(self, game, field_names):
+        """
+        Get the current values of a set of fields of a game.
 
-    def set_game_price(self, game, detailed_game_json):
+        Args:
+            game: The game to get field values for.
+            field_names: The names of the fields.
+        Returns:
+            dict: The field values, keyed by field name.
+        """
+        return {field_name: getattr(game, field_name) for field_name in field_names}
+
+    def get_game_changed_fields(self, game, stored_values):
+        """
+        Get the fields of a game whose values differ from a set of previously stored values.
+
+        Args:
+            game: The game to check for changes.
+            stored_values: The previously stored field values, keyed by field name.
+        Returns:
+            list: The names of the changed fields.
+        """
+        return [field_name for field_name, stored_value in stored_values.items() if getattr(game, field_name) != stored_value]
+
+    def set_game_price(self, game, game_snapshot):
         """
         Set the price details for a game in the PSN library
 
         Args:
             game: The game to set price details for.
-            detailed_game_json: The full detailed game info JSON.
+            game_snapshot: The snapshot of the detailed game info JSON.
         """
-        game.price = detailed_game_json[PSN_JSON_ELEM_GAME_PRICE_BLOCK][PSN_JSON_ELEM_GAME_PRICE]
-        discount_dtls_tuple = self.get_game_discounts(detailed_game_json[PSN_JSON_ELEM_GAME_PRICE_BLOCK])
-        game.base_discount = discount_dtls_tuple.rates.base
-        game.plus_discount = discount_dtls_tuple.rates.plus
-        game.base_price = discount_dtls_tuple.prices.base
-        game.plus_price = discount_dtls_tuple.prices.plus
+        game.price = game_snapshot.price
+        game.base_discount = game_snapshot.base_discount
+        game.plus_discount = game_snapshot.plus_discount
+        game.base_price = game_snapshot.base_price
+        game.plus_price = game_snapshot.plus_price
 
-    def set_game_ratings(self, library, game, game_rating_block_json):
+    def set_game_ratings(self, library, game, game_snapshot, defer_scoring=False):
         """
         Set the ratings details for a game in the PSN library.
 
@@ -252,81 +463,39 @@ class PSNLibrary:
         Args:
             library: The PSN library object from the DB.
             game: The game to set ratings details for.
-            game_rating_block_json: The block of JSON containing the ratings data.
+            game_snapshot: The snapshot of the detailed game info JSON.
+            defer_scoring: True if the weighted rating is scored later, with the rest of the library.
         """
-        game.rating = game_rating_block_json[PSN_JSON_ELEM_GAME_RATING_VALUE] if game_rating_block_json[PSN_JSON_ELEM_GAME_RATING_VALUE] else PSN_MODEL_RATING_DEFAULT_VALUE
-        game.rating_count = game_rating_block_json[PSN_JSON_ELEM_GAME_RATING_COUNT] if game_rating_block_json[PSN_JSON_ELEM_GAME_RATING_COUNT] else PSN_MODEL_RATING_DEFAULT_COUNT
-        game.weighted_rating = self.determine_weighted_game_rating(library, game)
+        game.rating = game_snapshot.rating
+        game.rating_count = game_snapshot.rating_count
+        if not defer_scoring:
+            game.weighted_rating = self.determine_weighted_game_rating(library, game)
 
-    def set_game_value(self, library, game):
+    def set_game_price_lows(self, game):
         """
-        Calculate and set both the PS+ and non-PS+ value for this game.
+        Set the historical low prices for a game in the PSN library.
 
-        Args:
-            library: The PSN library object from the DB.
-            game: The game to set value details for.
-        """
-        game.base_value_score = self.calculate_game_value(library, game, False)
-        game.plus_value_score = self.calculate_game_value(library, game, True)
-
-    def get_game_discounts(self, game_price_block_json):
-        """
-        Extract the details of any discounts from the detailed game JSON.
-
-        Checks for both regular discounts and also PS+ discounts.
+        The lows are maintained incrementally as prices change, so checking if a game is at its lowest
+        ever price never requires a scan of its price history.
 
         Args:
-            game_price_block_json: The block of JSON containing the discounts data.
-        Returns:
-            namedtuple: A tuple containing the following two tuples:
-                            1) A tuple containing the discount rate for both PS+ and non-PS+.
-                            2) A tuple containing the discounted price for both PS+ and non-PS+.
+            game: The game to set the historical low prices for.
         """
-        psn_discount_dtls = collections.namedtuple('psn_discount_dtls', ['rates', 'prices'])
-        psn_discount_rates = collections.namedtuple('psn_discount_rates', ['base', 'plus'])
-        psn_discount_prices = collections.namedtuple('psn_discount_prices', ['base', 'plus'])
-        base_discount = 0
-        plus_discount = 0
+        # No low has been recorded yet for a new game. A low of zero is a free game.
+        game.lowest_base_price = game.base_price if game.lowest_base_price == None else min(game.lowest_base_price, game.base_price)
+        game.lowest_plus_price = game.plus_price if game.lowest_plus_price == None else min(game.lowest_plus_price, game.plus_price)
+        game.at_lowest_price = game.plus_price <= game.lowest_plus_price
 
-        # Use the standard game price as default, and only overwrite if there are discounts.
-        base_price = game_price_block_json[PSN_JSON_ELEM_GAME_PRICE]
-        plus_price = game_price_block_json[PSN_JSON_ELEM_GAME_PRICE]
-
-        # Check if there is a discount json block
-        if (PSN_JSON_ELEM_GAME_REWARDS in game_price_block_json) and (game_price_block_json[PSN_JSON_ELEM_GAME_REWARDS]):
-
-            # Check for discounts that apply to PS+ and non-PS+ members
-            if PSN_JSON_ELEM_GAME_BASE_DISCOUNT in game_price_block_json[PSN_JSON_ELEM_GAME_REWARDS][0]:
-                base_discount = game_price_block_json[PSN_JSON_ELEM_GAME_REWARDS][0][PSN_JSON_ELEM_GAME_BASE_DISCOUNT]
-                base_price = game_price_block_json[PSN_JSON_ELEM_GAME_REWARDS][0][PSN_JSON_ELEM_GAME_BASE_PRICE]
-                plus_discount = base_discount
-                plus_price = base_price
-
-            # Now check for discounts that apply only to PS Plus members
-            if PSN_JSON_ELEM_GAME_BONUS_DISCOUNT in game_price_block_json[PSN_JSON_ELEM_GAME_REWARDS][0]:
-                plus_discount = game_price_block_json[PSN_JSON_ELEM_GAME_REWARDS][0][PSN_JSON_ELEM_GAME_BONUS_DISCOUNT]
-                plus_price = game_price_block_json[PSN_JSON_ELEM_GAME_REWARDS][0][PSN_JSON_ELEM_GAME_BONUS_PRICE]
-
-        discount_rates_tuple = psn_discount_rates(base=base_discount, plus=plus_discount)
-        discount_prices_tuple = psn_discount_prices(base=base_price, plus=plus_price)
-        discount_dtls_tuple = psn_discount_dtls(rates=discount_rates_tuple, prices=discount_prices_tuple)
-        return discount_dtls_tuple
-
-    def get_game_thumbnail(self, image_list):
+    def set_game_value(self, library, game):
         """
-        Get a thumbnail to use for the game in the PSN library.
+        Calculate and set both the PS+ and non-PS+ value for this game.
 
         Args:
-            image_list: The list of available thumbnails from the PSN store.
-        Returns:
-            string: Return a string containing the url to the small thumbnail in the PSN Store.
+            library: The PSN library object from the DB.
+            game: The game to set value details for.
         """
-        game_thumb = None
-        for eachGameImg in image_list:
-            if eachGameImg[PSN_JSON_ELEM_GAME_IMGTYPE] == PSN_JSON_ELEM_GAME_IMGTYPE_THUMB_SML:
-                game_thumb = eachGameImg[PSN_JSON_ELEM_GAME_URL]
-                break
-        return game_thumb
+        game.base_value_score = self.calculate_game_value(library, game, False)
+        game.plus_value_score = self.calculate_game_value(library, game, True)
 
     def upload_thumb_to_cloudinary(self, thumbnail_url):
         """
@@ -341,58 +510,62 @@ class PSNLibrary:
         Returns:
             string: Return the url of the image now stored in cloudinary.
         """
+        # Imported on first upload, as only the sync and thumbnail tasks upload to cloudinary
+        import cloudinary.uploader
         upload_result = cloudinary.uploader.upload(thumbnail_url)
         return upload_result['url']
 
-    def game_is_valid(self, game_json):
+    def get_valid_games_json(self, library_json, skipped_game_ids=frozenset()):
         """
-        Check if a game is valid for addition to the PSN library.
+        Get the simple JSON of the games in the PSN Store JSON that are valid for the PSN library.
 
-        Bundles, pre-releases etc are invalid. Different editions of
-        a game, however, are valid.
+        The games are filtered up front (see filter_listing), so that the count of games to be synced is known
+        before they are requested, and no details are requested for games that can't be synced.
 
         Args:
-            game_json: The simple JSON for the game from the PSN Store.
+            library_json: The full library JSON returned by the PSN Store API.
+            skipped_game_ids: The ids of the games whose details failed to sync, and are not due a retry.
         Returns:
-            boolean: Return true if the game is valid, else false.
+            list: The simple JSON of each valid game.
         """
-        game_valid = True
-        # We're just looking for base games i.e. ignore bundles etc.
-        if PSN_JSON_ELEM_SUB_GAME in game_json:
-            game_valid = False
-        # Check to make sure the game is released - otherwise we can get games without prices etc.
-        elif self.game_is_released(game_json) == False:
-            game_valid = False
-
-        return game_valid
+        return filter_listing(library_json[PSN_JSON_ELEM_EACH_GAME], get_listing_now(), skipped_game_ids)
 
-    def game_is_released(self, game_json):
+    def add_store_entry_failure(self, library, simple_game_json, exception, store_entry_failures):
         """
-        Check if the game is released.
+        Record that the details of a game failed to sync, so that syncs skip it until its next attempt.
+
+        Each failure backs off the next attempt further, and a game that keeps failing is quarantined until
+        its listing changes (see psn_store_failures).
 
         Args:
-            game_json: The simple JSON for the game from the PSN Store.
-        Returns:
-            boolean: Return true if the game is released, else false.
-        """
-        is_released = False
-        release_date = datetime.strptime(game_json[PSN_JSON_ELEM_RELEASE_DATE], '%Y-%m-%dT%H:%M:%SZ')
-        if release_date < datetime.now():
-            is_released = True
-        return is_released
+            library: The PSN library object from the DB.
+            simple_game_json: The simple JSON for the game from the PSN Store.
+            exception: The exception raised syncing the game.
+            store_entry_failures: The library's failures before this sync, keyed by game id.
+        """
+        game_id = simple_game_json.get(PSN_JSON_ELEM_GAME_ID)
+        if game_id == None:
+            return
+        previous_failure = store_entry_failures.get(game_id)
+        attempt_count = 1 if previous_failure == None else previous_failure.attempt_count + 1
+        failed_at = timezone.now()
+        self.psn_library_dao.save_store_entry_failure(library, game_id, {
+            'url': simple_game_json.get(PSN_JSON_ELEM_GAME_URL, ''),
+            'error_class': type(exception).__name__,
+            'reason': get_failure_reason(exception),
+            'attempt_count': attempt_count,
+            'last_failed_at': failed_at,
+            'next_attempt_at': failed_at + get_retry_delay(attempt_count),
+            'quarantined': is_quarantined(attempt_count),
+            'listing_fingerprint': get_listing_fingerprint(simple_game_json),
+        })
 
     """
     PSN Library Statistics
     """
-    DEFAULT_GAME_PRICE = 1
-    DEFAULT_GAME_WEIGHTED_RATING = 1
-    RATING_COUNT_WEIGHTING = 125
-
     def determine_weighted_game_rating(self, library, game):
         """
-        Determine the weighted rating of a game.
-
-        The rating, the count of ratings made and the rating's deviation from the mean are factored in.
+        Determine the weighted rating of a game, with the production scoring model (see psn_scoring).
 
         Args:
             library: The PSN library object from the DB.
@@ -400,62 +573,18 @@ class PSNLibrary:
         Returns:
             float: The weighted rating for this game.
         """
-        # Determine if this game is above or below the mean rating. Necessary for applying different weighting algorithm.
-        aboveMean = self.rating_above_mean(library, game)
-
-        # Determine how much weight to put on the rating as a result of the number of ratings.
-        ratingCountVal = (float(game.rating_count)/self.RATING_COUNT_WEIGHTING)
-
-        # Determine weighting to apply based on rating deviation from the mean.
-        ratingConstant = 1 if aboveMean else -1
-        ratingVal = round((float(game.rating)) * (ratingConstant+((float(game.rating) - library.library_rating_mean)/library.library_rating_stdev)), 2)
-
-        # Apply different weights depending if the game rating is above or below mean.
-        finalVal = 0
-        if aboveMean:
-            finalVal = (ratingVal+ratingCountVal)
-        else:
-            finalVal = (ratingVal-ratingCountVal)
-
-        # Account for a weighted rating of zero
-        return self.DEFAULT_GAME_WEIGHTED_RATING if finalVal == 0.0 else finalVal
+        return get_scoring_model().determine_weighted_game_rating(library, game)
 
     def calculate_game_value(self, library, game, is_plus):
         """
-        Calculate the value for a game.
-
-        Calculate the value based on the weighted rating, the price and the discount.
+        Calculate the value for a game from its weighted rating, with the production scoring model (see psn_scoring).
 
         Args:
             library: The PSN library object from the DB.
             game: The game to determine the value for.
             is_plus: True if we are calculating the PS+ value, else false for non-PS+.
         """
-        game_price = 0.0
-        game_rating = 0.0
-        discount_weight = 0.0
-
-        if is_plus == True:
-            game_price = game.plus_price
-        else:
-            game_price = game.base_price
-
-        # Use DEFAULT_GAME_PRICE for anything less than 1 (stops division by zero errors).
-        game_price = round(game_price if game_price > 0.0 else self.DEFAULT_GAME_PRICE)
-
-        # Determine the weight to apply to the discount.
-        if is_plus == True:
-            discount_weight = 1+(game.plus_discount/100)
-        else:
-            discount_weight = 1+(game.base_discount/100)
-
-        # Apply the discount weight to the weighted rating.
-        if self.rating_above_mean(library, game):
-            game_rating = ((game.weighted_rating)*discount_weight)*100
-        else:
-            game_rating = ((game.weighted_rating)/discount_weight)*100
-
-        return round(1/(game_price/game_rating)*100)
+        return get_scoring_model().calculate_game_value(library, game, game.weighted_rating, is_plus)
 
     def rating_above_mean(self, library, game):
         """
@@ -467,7 +596,7 @@ class PSNLibrary:
         Returns:
             boolean: True if above the mean, else false.
         """
-        return (float(game.rating) - library.library_rating_mean) > 0
+        return get_scoring_model().rating_above_mean(library, game)
 
     """
     Celery Task - Update Thumbnails
@@ -476,9 +605,10 @@ class PSNLibrary:
         """
         View used for updating the stored game thumbnails.
 
-        Each game in the library is iterated over and the game thumbnail is retrieved using the thumbnail
+        Each game title is iterated over and the title thumbnail is retrieved using the thumbnail
         URL stored in the DB. The image at this URL is then stored in the library storage. This update is
         performed asynchronously. Update can only be triggered through this view by an admin user.
+        Thumbnails are shared by the games of every library, so each title is only uploaded once.
 
         Args:
             request: The HTTP request
@@ -486,16 +616,13 @@ class PSNLibrary:
         Returns:
             The HTTP response.
         """
-        # Get the Library Object from the DB
-        library_obj = self.psn_library_dao.get_library(library_id)
-
-        # Get all games from the DB
-        all_games = self.psn_library_dao.get_all_games()
+        # Get all game titles from the DB
+        all_titles = self.psn_library_dao.get_all_titles()
 
-        for each_game_obj in all_games:
-            print(each_game_obj.game_name)
-            each_game_obj.image_datastore_url = self.upload_thumb_to_cloudinary(each_game_obj.image_url)
-            super().update_game_obj(each_game_obj)
+        for each_title_obj in all_titles:
+            print(each_title_obj.title_name)
+            each_title_obj.image_datastore_url = self.upload_thumb_to_cloudinary(each_title_obj.image_url)
+            self.psn_library_dao.update_title(each_title_obj)
 
     """
     Celery Task - Update Weighted Ratings
@@ -518,11 +645,158 @@ class PSNLibrary:
         # Get the Library Object from the DB
         library = self.psn_library_dao.get_library(library_id)
 
-        # Get all games from the DB
-        all_games = self.psn_library_dao.get_all_games()
+        if library == None:
+            return
 
-        for each_game in all_games:
+        # Get the library's games from the DB, which are scored against its own mean and deviation
+        library_games = self.psn_library_dao.get_library_games(library)
+
+        for each_game in library_games:
             print(each_game.game_name)
+            stored_values = self.get_game_field_values(each_game, PSN_GAME_SCORE_FIELDS)
             each_game.weighted_rating = self.determine_weighted_game_rating(library, each_game)
             self.set_game_value(library, each_game)
-            self.psn_library_dao.update_game(each_game)
+            # Games whose scores are unchanged are not written at all
+            changed_fields = self.get_game_changed_fields(each_game, stored_values)
+            if changed_fields:
+                self.psn_library_dao.update_game(each_game, changed_fields)
+
+    """
+    Celery Task - Rescore Library In DB
+    """
+    def rescore_library_in_db(self, library_id):
+        """
+        Update the weighted rating and value of each game in the library, inside the DB.
+
+        The same formulas as update_weighted_ratings are expressed as DB expressions, so the whole
+        library is rescored by a single UPDATE without loading any games.
+
+        Args:
+            library_id: The ID of the local library whose games we want to update.
+        """
+        library = self.psn_library_dao.get_library(library_id)
+
+        if library != None:
+            self.psn_library_dao.update_library_scores(library, get_game_score_expressions(library))
+
+    """
+    Celery Task - Shadow Score Library
+    """
+    def shadow_score_library(self, library_id, model_versions=None):
+        """
+        Score each game in the library with other versions of the scoring model, without changing its production scores.
+
+        All of the versions are scored in a single pass over the library's games, and their scores are
+        written to GameScore, so that the game list can serve any version side by side with production.
+
+        Args:
+            library_id: The ID of the local library whose games we want to score.
+            model_versions: The versions of the scoring models to score with, or None for every shadow version.
+        Raises:
+            ValueError: If no scoring model is registered for one of the versions.
+        """
+        if model_versions == None:
+            model_versions = get_shadow_scoring_versions()
+        unknown_versions = [model_version for model_version in model_versions if get_scoring_model(model_version) == None]
+        if unknown_versions:
+            raise ValueError("No scoring model is registered for the versions: %s" % ', '.join(unknown_versions))
+
+        library = self.psn_library_dao.get_library(library_id)
+
+        if library != None and model_versions:
+            scoring_models = [get_scoring_model(model_version) for model_version in model_versions]
+            game_scores = []
+            for game in self.psn_library_dao.get_library_games(library):
+                for scoring_model in scoring_models:
+                    game_scores.append((game, scoring_model.version, scoring_model.score_game(library, game)))
+            self.psn_library_dao.replace_game_scores(library, model_versions, game_scores)
+
+    """
+    Dry Run - Diff Library
+    """
+    def diff_sync_library_with_store(self, library_id):
+        """
+        Dry run of syncing the local PSN library with the PSN store.
+
+        The library is loaded into an in-memory snapshot with a single query, and the games in the PSN store
+        are updated and scored against the snapshot exactly as a sync would (see update_psn_library).
+        Nothing is written to the DB.
+
+        Args:
+            library_id: The ID of the local library to diff.
+        Returns:
+            LibraryDiff: The changes a sync would make to the library, or None if the library does not exist.
+        """
+        library = self.psn_library_dao.get_library(library_id)
+        if library == None:
+            return None
+
+        stored_games = get_game_records(self.psn_library_dao.get_library_game_values(library, DIFF_GAME_FIELDS))
+        updated_games = copy_game_records(stored_games)
+        psn_lib_json = self.psn_store_api.request_psn_lib_json(library.library_url)
+        # Games skipped for their failures are still listed, so are not removed.
+        store_entry_failures = self.psn_library_dao.get_store_entry_failures(library)
+        skipped_game_ids = get_skipped_game_ids(psn_lib_json[PSN_JSON_ELEM_EACH_GAME], store_entry_failures, timezone.now())
+        listed_game_ids = set(skipped_game_ids)
+        rating_stats = RunningStats()
+        compute_seconds = 0.0
+
+        for simple_game_json in self.get_valid_games_json(psn_lib_json, skipped_game_ids):
+            try:
+                game_snapshot = self.psn_store_api.request_psn_game_json(simple_game_json[PSN_JSON_ELEM_GAME_URL], library.pk)
+                compute_start = time.perf_counter()
+                game = updated_games.get(game_snapshot.game_id)
+                if game == None:
+                    game = get_game_records([{'game_id': game_snapshot.game_id, 'game_name': game_snapshot.game_name}])[game_snapshot.game_id]
+                    updated_games[game_snapshot.game_id] = game
+                self.set_game_price(game, game_snapshot)
+                self.set_game_ratings(library, game, game_snapshot, defer_scoring=True)
+                rating_stats.add(game_snapshot.rating)
+                listed_game_ids.add(game_snapshot.game_id)
+                compute_seconds += time.perf_counter() - compute_start
+
+            except STORE_ENTRY_ERRORS as e:
+                if PSN_JSON_ELEM_GAME_PRICE_BLOCK not in str(e):
+                    print("Exception processing game: ", simple_game_json[PSN_JSON_ELEM_GAME_NAME])
+                    traceback.print_exc()
+
+        compute_start = time.perf_counter()
+        if rating_stats.count > 0:
+            self.score_game_records(SimpleNamespace(library_rating_mean=rating_stats.mean, library_rating_stdev=rating_stats.get_pstdev()), updated_games)
+        compute_seconds += time.perf_counter() - compute_start
+        return diff_library(stored_games, updated_games, listed_game_ids, compute_seconds)
+
+    def diff_update_weighted_ratings(self, library_id):
+        """
+        Dry run of updating the weighted rating and value of each game in the library.
+
+        The library is loaded into an in-memory snapshot with a single query, and rescored with the library's
+        current statistics. Nothing is written to the DB.
+
+        Args:
+            library_id: The ID of the local library to diff.
+        Returns:
+            LibraryDiff: The changes a rescore would make to the library, or None if the library does not exist.
+        """
+        library = self.psn_library_dao.get_library(library_id)
+        if library == None:
+            return None
+
+        stored_games = get_game_records(self.psn_library_dao.get_library_game_values(library, DIFF_GAME_FIELDS))
+        updated_games = copy_game_records(stored_games)
+        compute_start = time.perf_counter()
+        self.score_game_records(library, updated_games)
+        return diff_library(stored_games, updated_games, None, time.perf_counter() - compute_start)
+
+    def score_game_records(self, library, game_records):
+        """
+        Score in-memory game records with the production scoring model.
+
+        Args:
+            library: The PSN library, or an object with its rating statistics.
+            game_records: The game records, keyed by game id.
+        """
+        scoring_model = get_scoring_model()
+        for game in game_records.values():
+            for field_name, score in scoring_model.score_game(library, game).items():
+                setattr(game, field_name, score)
@@ -1,8 +1,24 @@
 from statistics import pstdev, mean
-from .models import Library, GameList, ContentDescriptors, GameContent
+from .models import Library, GameTitle, GameList, ContentDescriptors, TitleContent, GamePriceHistory, GamePriceMonthly, GameScore, SyncRun, SyncRunLibrary, StoreEntryFailure, TaskProfile, CONTENT_DESCRIPTOR_MAX_BIT
+from .models import SYNC_STATUS_RUNNING, SYNC_STATUS_FINISHED, SYNC_STATUS_FAILED
+from django.db import transaction
+from django.db import IntegrityError
+from django.db.models import Min, Max, Count, Sum, F, Case, When, Value, IntegerField
 from django.utils import timezone
+from .search import normalize_game_name
+from .psn_game_snapshot import get_title_key
 
 GAME_RATING_FIELD_NAME = 'rating'
+GAME_PLUS_VALUE_FIELD_NAME = 'plus_value_score'
+GAME_NEXT_REFRESH_FIELD_NAME = 'next_refresh'
+GAME_LAST_UPDATED_FIELD_NAME = 'last_updated'
+GAME_LAST_CHECKED_FIELD_NAME = 'last_checked'
+GAME_CONTENT_MASK_FIELD_NAME = 'content_mask'
+CONTENT_BIT_FIELD_NAME = 'content_bit'
+HISTORY_GAME_FIELD_NAME = 'game_id_fk'
+HISTORY_RECORDED_AT_FIELD_NAME = 'recorded_at'
+# Number of game scores written per INSERT
+GAME_SCORE_BATCH_SIZE = 500
 
 class PSNLibraryDAO:
 
@@ -39,6 +55,116 @@ class PSNLibraryDAO:
             pass
         return game
 
+    def get_games(self, library, game_ids):
+        """
+        Get a set of games from the DB for a specific Library, with a single query.
+
+        Args:
+            library: A specific library from the DB.
+            game_ids: The IDs of the games to fetch from the specified library.
+        Return:
+            dict: The Games found, keyed by game ID.
+        """
+        return {game.game_id: game for game in GameList.objects.filter(library_fk=library, game_id__in=game_ids)}
+
+    def get_overdue_games(self, library, count):
+        """
+        Get the games in a library that are most overdue a refresh from the PSN store.
+
+        Args:
+            library: A specific library from the DB.
+            count: The maximum number of games to fetch.
+        Returns:
+            QuerySet: The overdue games, most overdue first.
+        """
+        return GameList.objects.filter(library_fk=library, next_refresh__lte=timezone.now()).order_by(GAME_NEXT_REFRESH_FIELD_NAME)[:count]
+
+    def get_top_value_threshold(self, library, top_count, min_rating_count, min_price):
+        """
+        Get the PS+ value score of the game ranked at top_count among the displayable games in a library.
+
+        Args:
+            library: A specific library from the DB.
+            top_count: The rank of the game whose value score is the threshold.
+            min_rating_count: The minimum number of ratings needed by a game to be displayed.
+            min_price: The minimum price of a game to be displayed.
+        Returns:
+            number: The threshold value score, or None if the library has no displayable games.
+        """
+        top_scores = GameList.objects.filter(library_fk=library, rating_count__gte=min_rating_count, price__gte=min_price).order_by('-' + GAME_PLUS_VALUE_FIELD_NAME).values_list(GAME_PLUS_VALUE_FIELD_NAME, flat=True)[:top_count]
+        top_scores = list(top_scores)
+        return top_scores[-1] if top_scores else None
+
+    def get_all_titles(self):
+        """
+        Get all game titles from the DB.
+
+        Returns:
+            QuerySet: A copy of the current QuerySet containing all titles from the DB.
+        """
+        return GameTitle.objects.all()
+
+    def get_or_add_title(self, game_snapshot):
+        """
+        Get the Title of a game from the DB if it exists, else add it, with the metadata shared by the game's offers in every region.
+
+        Concurrent syncs of different regions race to add a Title. The loser's insert fails on the unique title
+        key, and the winner's Title is fetched instead.
+
+        Titles keyed on the product id (e.g. backfilled by migration 0025, before concept ids were stored) are
+        re-keyed on the concept id once the store sends one, rather than a duplicate Title being added.
+
+        Args:
+            game_snapshot: The snapshot of the game's details in the PSN Store.
+        Return:
+            tuple: The Title, and True if it was added by this call.
+        """
+        product_title_key = get_title_key(game_snapshot.game_id, None)
+        if game_snapshot.title_key != product_title_key and not GameTitle.objects.filter(title_key=game_snapshot.title_key).exists():
+            try:
+                with transaction.atomic():
+                    GameTitle.objects.filter(title_key=product_title_key).update(title_key=game_snapshot.title_key)
+            except IntegrityError:
+                # Another sync added or re-keyed the Title first, which is fetched below.
+                pass
+        return GameTitle.objects.get_or_create(title_key=game_snapshot.title_key, defaults={
+            'title_name': game_snapshot.game_name,
+            'age_rating': game_snapshot.age_rating,
+            'image_url': game_snapshot.thumbnail_url,
+        })
+
+    def update_title(self, title):
+        """
+        Update a Title record in the DB.
+
+        Args:
+            title: The Title object with updated info.
+        """
+        title.save()
+
+    def get_library_games(self, library):
+        """
+        Get all games in a library from the DB.
+
+        Args:
+            library: The Library to get games for.
+        Returns:
+            QuerySet: The games in the library, iterated without caching.
+        """
+        return GameList.objects.filter(library_fk=library).iterator()
+
+    def get_library_game_values(self, library, field_names):
+        """
+        Get the values of a set of fields of every game in a library, with a single query.
+
+        Args:
+            library: The Library to get games for.
+            field_names: The names of the fields.
+        Returns:
+            ValuesQuerySet: The field values of each game, as dicts.
+        """
+        return GameList.objects.filter(library_fk=library).values(*field_names)
+
     def get_all_games(self):
         """
         Get all games from the DB.
@@ -48,56 +174,218 @@ class PSNLibraryDAO:
         """
         return GameList.objects.all()
 
-    def add_skeleton_game_record(self, id, name, json_url, thumb_url, thumb_datastore_url, age, library):
+    def add_skeleton_game_record(self, game_snapshot, json_url, title, library):
         """
         Add a new game record to the DB with some basic information.
 
+        The age rating and content mask are copied from the game's title, so the game list can filter on them.
+
         Args:
-            id: The PSN Store ID for the game.
-            name: The PSN Store name for the game.
+            game_snapshot: The snapshot of the game's details in the PSN Store.
             json_url: The URL for the detailed game JSON in the PSN Store.
-            thumb_url: The URL for the game's thumbnail in the PSN Store.
-            thumb_datastore_url: The URL for the game's thumbnail in the PSN Library's image datastore.
-            age: The age rating of the game.
+            title: The Title that this game is an offer of.
             library: The PSN Library that this game belongs to.
         Return:
             GameList: The newly created Game.
         """
-        return GameList.objects.create(game_id=id, game_name=name, json_url=json_url, image_url=thumb_url, image_datastore_url=thumb_datastore_url, age_rating=age, library_fk=library)
+        return GameList.objects.create(game_id=game_snapshot.game_id, game_name=game_snapshot.game_name, game_name_normalized=normalize_game_name(game_snapshot.game_name), json_url=json_url, age_rating=title.age_rating, content_mask=title.content_mask, title_fk=title, library_fk=library)
 
-    def update_game(self, game):
+    def update_game(self, game, changed_fields=None):
         """
         Update a Game record in the DB.
 
         Args:
             game: The Game object with updated info.
+            changed_fields: The names of the fields that have changed. Only these fields (and the
+                            last updated time) are written. If None, every field is written.
         """
         game.last_updated = timezone.now()
-        game.save()
+        if changed_fields == None:
+            game.save()
+        else:
+            game.save(update_fields=list(changed_fields) + [GAME_LAST_UPDATED_FIELD_NAME])
+
+    def update_checked_game(self, game, changed_fields):
+        """
+        Update a Game record in the DB after it has been checked against the PSN store.
+
+        The last checked and next refresh times are always written. Other fields, and the last updated
+        time, are only written if they have changed. Unchanged games, the common case, therefore only
+        cost a narrow UPDATE rather than a rewrite of every column.
+
+        Args:
+            game: The Game object with updated info.
+            changed_fields: The names of the fields that have changed since the game was last checked.
+        """
+        game.last_checked = timezone.now()
+        update_fields = [GAME_LAST_CHECKED_FIELD_NAME, GAME_NEXT_REFRESH_FIELD_NAME]
+        if changed_fields:
+            game.last_updated = game.last_checked
+            update_fields += list(changed_fields) + [GAME_LAST_UPDATED_FIELD_NAME]
+        game.save(update_fields=update_fields)
+
+    def update_game_next_refresh(self, game):
+        """
+        Update only the next refresh time of a Game record in the DB.
+
+        Args:
+            game: The Game object with an updated next refresh time.
+        """
+        game.save(update_fields=[GAME_NEXT_REFRESH_FIELD_NAME])
+
+    def update_checked_games_next_refresh(self, library, checked_since, next_refresh_expression):
+        """
+        Update the next refresh time of every game in a library checked since a time, with a single UPDATE.
+
+        Args:
+            library: The Library the games are in.
+            checked_since: The time from which checked games are updated.
+            next_refresh_expression: The DB expression for the next refresh time of a game.
+        Returns:
+            number: The count of games updated.
+        """
+        return GameList.objects.filter(library_fk=library, **{GAME_LAST_CHECKED_FIELD_NAME + '__gte': checked_since}).update(**{GAME_NEXT_REFRESH_FIELD_NAME: next_refresh_expression})
+
+    def add_game_price_history(self, game):
+        """
+        Add a price history record for a game, with its current price and rating.
+
+        Prices are stored as integer cents and ratings as integer hundredths.
+
+        Args:
+            game: The Game to record the price and rating of.
+        Returns:
+            GamePriceHistory: The newly created price history record.
+        """
+        return GamePriceHistory.objects.create(
+            game_id_fk=game,
+            recorded_at=game.last_updated,
+            price=round(game.price),
+            base_price=round(game.base_price),
+            plus_price=round(game.plus_price),
+            base_discount=game.base_discount,
+            plus_discount=game.plus_discount,
+            rating=round(float(game.rating) * 100),
+            rating_count=int(game.rating_count))
+
+    def get_game_price_history(self, game):
+        """
+        Get the price history of a game, oldest first.
+
+        Args:
+            game: The Game to get the price history for.
+        Returns:
+            QuerySet: The price history records of the game.
+        """
+        return GamePriceHistory.objects.filter(game_id_fk=game).order_by(HISTORY_RECORDED_AT_FIELD_NAME)
+
+    def get_price_history_months(self, library, recorded_since):
+        """
+        Get the months with price history recorded for a library since a point in time.
+
+        Args:
+            library: The Library to get the months for.
+            recorded_since: The time from which price history is included.
+        Returns:
+            list: The start of each month, in order.
+        """
+        return list(GamePriceHistory.objects.filter(game_id_fk__library_fk=library, recorded_at__gte=recorded_since).datetimes(HISTORY_RECORDED_AT_FIELD_NAME, 'month'))
+
+    @transaction.atomic
+    def update_price_history_rollups(self, library, month_start, month_end):
+        """
+        Roll up the price history of every game in a library for a month.
+
+        The rollups for the month are replaced with the minimum and maximum prices, and the count of
+        changes, recorded within the month.
+
+        Args:
+            library: The Library to roll up the price history for.
+            month_start: The start of the month.
+            month_end: The start of the following month.
+        """
+        monthly_history = GamePriceHistory.objects.filter(game_id_fk__library_fk=library, recorded_at__gte=month_start, recorded_at__lt=month_end)
+        monthly_history = monthly_history.values(HISTORY_GAME_FIELD_NAME).annotate(
+            min_base_price=Min('base_price'),
+            max_base_price=Max('base_price'),
+            min_plus_price=Min('plus_price'),
+            max_plus_price=Max('plus_price'),
+            change_count=Count('id'))
+
+        GamePriceMonthly.objects.filter(game_id_fk__library_fk=library, month=month_start.date()).delete()
+        GamePriceMonthly.objects.bulk_create([
+            GamePriceMonthly(
+                game_id_fk_id=each_month[HISTORY_GAME_FIELD_NAME],
+                month=month_start.date(),
+                min_base_price=each_month['min_base_price'],
+                max_base_price=each_month['max_base_price'],
+                min_plus_price=each_month['min_plus_price'],
+                max_plus_price=each_month['max_plus_price'],
+                change_count=each_month['change_count'])
+            for each_month in monthly_history])
+
+    def prune_price_history(self, library, recorded_before):
+        """
+        Delete the raw price history of a library recorded before a point in time.
+
+        The monthly rollups of the pruned history are kept.
+
+        Args:
+            library: The Library to prune the price history of.
+            recorded_before: The time before which price history is deleted.
+        """
+        GamePriceHistory.objects.filter(game_id_fk__library_fk=library, recorded_at__lt=recorded_before).delete()
 
     def get_or_create_content_descriptor(self, name, description):
         """
         Get the Content Descriptor for the specified name and description from the DB if it exists, else create it.
 
+        New Content Descriptors are assigned the next free bit of GameList.content_mask. Content Descriptors
+        are unique by name, so one created by another sync in the meantime is fetched by its name, while a
+        bit taken by another sync is retried with the next free bit.
+
         Args:
             name: The name of the Content Descriptor
             description: The description of the Content Descriptor.
         Returns:
             ContentDescriptors: The newly created or fetched Content Descriptor.
         """
-        return ContentDescriptors.objects.get_or_create(content_name=name, content_description=description)[0]
+        while True:
+            try:
+                return ContentDescriptors.objects.get(content_name=name)
+            except ContentDescriptors.DoesNotExist:
+                pass
 
-    def get_or_create_game_content(self, game, content_descriptor):
+            highest_bit = ContentDescriptors.objects.aggregate(Max(CONTENT_BIT_FIELD_NAME))[CONTENT_BIT_FIELD_NAME + '__max']
+            content_bit = 0 if highest_bit == None else highest_bit + 1
+            try:
+                with transaction.atomic():
+                    return ContentDescriptors.objects.create(content_name=name, content_description=description, content_bit=content_bit if content_bit <= CONTENT_DESCRIPTOR_MAX_BIT else None)
+            except IntegrityError:
+                # Another sync created the Content Descriptor, or took the bit, first. Either is picked up on the retry.
+                pass
+
+    def get_or_create_title_content(self, title, content_descriptor):
         """
-        Get the Game Content for the specified Game and Content Descriptor from the DB if it exists, else create it.
+        Get the Title Content for the specified Title and Content Descriptor from the DB if it exists, else create it.
 
         Args:
-            game: The Game to add Game Content for.
-            content_descriptor: The Content Descriptor for this Game Content.
+            title: The Title to add Title Content for.
+            content_descriptor: The Content Descriptor for this Title Content.
         Returns:
-            GameContent: The newly created or fetched Game Content.
+            TitleContent: The newly created or fetched Title Content.
+        """
+        return TitleContent.objects.get_or_create(title_fk=title, content_descriptor_fk=content_descriptor)[0]
+
+    def update_title_content_mask(self, title):
+        """
+        Update the content descriptor bitmask of a Title record, and of all of its Games, in the DB.
+
+        Args:
+            title: The Title object with an updated content mask.
         """
-        return GameContent.objects.get_or_create(game_id_fk=game, content_descriptor_fk=content_descriptor)[0]
+        title.save(update_fields=[GAME_CONTENT_MASK_FIELD_NAME])
+        GameList.objects.filter(title_fk=title).update(content_mask=title.content_mask)
 
     def update_library_statistics(self, library):
         """
@@ -110,11 +398,63 @@ class PSNLibraryDAO:
             library: The Library to update statistics for.
         """
         list_of_game_ratings = self.get_all_game_ratings_in_library(library)
-        library.library_rating_stdev = pstdev(list_of_game_ratings)
-        library.library_rating_mean = mean(list_of_game_ratings)
+        self.set_library_statistics(library, mean(list_of_game_ratings), pstdev(list_of_game_ratings))
+
+    def set_library_statistics(self, library, rating_mean, rating_stdev):
+        """
+        Set the library statistics for a specified library, from statistics already calculated.
+
+        Args:
+            library: The Library to set statistics for.
+            rating_mean: The mean rating in the library.
+            rating_stdev: The standard deviation of the ratings from the mean.
+        """
+        library.library_rating_stdev = rating_stdev
+        library.library_rating_mean = rating_mean
         library.last_updated = timezone.now()
         library.save()
 
+    def update_library_freshness(self, library, stale_before):
+        """
+        Aggregate the freshness of a library's games onto the library, with a single query.
+
+        Args:
+            library: The Library to update.
+            stale_before: Games last checked before this time are stale.
+        """
+        freshness = GameList.objects.filter(library_fk=library).aggregate(
+            game_count=Count('pk'),
+            stale_game_count=Sum(Case(When(**{GAME_LAST_CHECKED_FIELD_NAME + '__lt': stale_before, 'then': Value(1)}), default=Value(0), output_field=IntegerField())))
+        library.game_count = freshness['game_count']
+        library.stale_game_count = freshness['stale_game_count'] or 0
+        library.freshness_updated_at = timezone.now()
+        library.save(update_fields=['game_count', 'stale_game_count', 'freshness_updated_at'])
+
+    def update_library_scores(self, library, score_expressions):
+        """
+        Update the scores of every game in a library with a single UPDATE in the DB.
+
+        Args:
+            library: The Library to update scores for.
+            score_expressions: The DB expression for each score field (see psn_db_scoring).
+        Returns:
+            number: The count of games updated.
+        """
+        return GameList.objects.filter(library_fk=library).update(**score_expressions)
+
+    @transaction.atomic
+    def replace_game_scores(self, library, model_versions, game_scores):
+        """
+        Replace the scores of the games in a library for versions of the scoring model.
+
+        Args:
+            library: The Library the games are in.
+            model_versions: The versions of the scoring model being replaced.
+            game_scores: The (game, model version, scores) tuples of the new scores.
+        """
+        GameScore.objects.filter(game_id_fk__library_fk=library, model_version__in=model_versions).delete()
+        GameScore.objects.bulk_create([GameScore(game_id_fk=game, model_version=model_version, **scores) for game, model_version, scores in game_scores], batch_size=GAME_SCORE_BATCH_SIZE)
+
     def get_all_game_ratings_in_library(self, library):
         """
         Get a list of all the game ratings in a library.
@@ -127,3 +467,197 @@ class PSNLibraryDAO:
             ValueList: List of all game ratings in the library.
         """
         return GameList.objects.filter(library_fk=library).values_list(GAME_RATING_FIELD_NAME, flat=True)
+
+    def get_all_libraries(self):
+        """
+        Get all libraries from the DB.
+
+        Returns:
+            QuerySet: A copy of the current QuerySet containing all libraries from the DB.
+        """
+        return Library.objects.all()
+
+    @transaction.atomic
+    def add_sync_run(self, libraries):
+        """
+        Add a new sync run to the DB, with a pending sync for each of the libraries.
+
+        Args:
+            libraries: The Libraries to be synced in this run.
+        Returns:
+            SyncRun: The newly created Sync Run.
+        """
+        sync_run = SyncRun.objects.create()
+        SyncRunLibrary.objects.bulk_create([SyncRunLibrary(sync_run_fk=sync_run, library_fk=library) for library in libraries])
+        return sync_run
+
+    def get_sync_run(self, sync_run_id):
+        """
+        Get a specific sync run from the DB.
+
+        Args:
+            sync_run_id: The ID of the Sync Run to fetch.
+        Return:
+            SyncRun: The Sync Run if found, else None.
+        """
+        sync_run = None
+        try:
+            sync_run = SyncRun.objects.get(pk=sync_run_id)
+        except SyncRun.DoesNotExist:
+            pass
+        return sync_run
+
+    def get_sync_run_library(self, sync_run_id, library):
+        """
+        Get the sync of a library within a sync run from the DB.
+
+        Args:
+            sync_run_id: The ID of the Sync Run.
+            library: The Library being synced.
+        Return:
+            SyncRunLibrary: The library's sync if found, else None.
+        """
+        sync_run_library = None
+        try:
+            sync_run_library = SyncRunLibrary.objects.get(sync_run_fk_id=sync_run_id, library_fk=library)
+        except SyncRunLibrary.DoesNotExist:
+            pass
+        return sync_run_library
+
+    def start_sync_run_library(self, sync_run_library, games_total):
+        """
+        Mark the sync of a library as running.
+
+        Args:
+            sync_run_library: The library's sync.
+            games_total: The count of games to be synced in the library.
+        """
+        sync_run_library.status = SYNC_STATUS_RUNNING
+        sync_run_library.started_at = timezone.now()
+        sync_run_library.games_total = games_total
+        sync_run_library.save(update_fields=['status', 'started_at', 'games_total'])
+
+    def add_sync_run_library_progress(self, sync_run_library, game_count):
+        """
+        Add to the count of games processed by the sync of a library.
+
+        The count is incremented in the DB, so it is not lost if the progress is read concurrently.
+
+        Args:
+            sync_run_library: The library's sync.
+            game_count: The count of games processed since the progress was last added.
+        """
+        SyncRunLibrary.objects.filter(pk=sync_run_library.pk).update(games_processed=F('games_processed') + game_count)
+
+    def finish_sync_run_library(self, sync_run_library, status):
+        """
+        Mark the sync of a library as finished or failed.
+
+        Args:
+            sync_run_library: The library's sync.
+            status: The final status of the library's sync.
+        """
+        sync_run_library.status = status
+        sync_run_library.finished_at = timezone.now()
+        sync_run_library.save(update_fields=['status', 'finished_at'])
+
+    def finish_sync_run(self, sync_run):
+        """
+        Mark a sync run as finished, or failed if the sync of any of its libraries failed.
+
+        Args:
+            sync_run: The Sync Run.
+        """
+        library_failed = sync_run.syncrunlibrary_set.exclude(status=SYNC_STATUS_FINISHED).exists()
+        sync_run.status = SYNC_STATUS_FAILED if library_failed else SYNC_STATUS_FINISHED
+        sync_run.finished_at = timezone.now()
+        sync_run.save(update_fields=['status', 'finished_at'])
+
+    def get_sync_run_progress(self, sync_run):
+        """
+        Get the combined progress of the libraries in a sync run.
+
+        Args:
+            sync_run: The Sync Run.
+        Returns:
+            dict: The games_total and games_processed of all libraries in the run.
+        """
+        progress = sync_run.syncrunlibrary_set.aggregate(games_total=Sum('games_total'), games_processed=Sum('games_processed'))
+        return {key: value or 0 for key, value in progress.items()}
+
+    def get_store_entry_failures(self, library):
+        """
+        Get the store entry failures of a library.
+
+        Args:
+            library: The Library the games are listed in.
+        Returns:
+            dict: The StoreEntryFailures, keyed by game id.
+        """
+        return {failure.game_id: failure for failure in StoreEntryFailure.objects.filter(library_fk=library)}
+
+    def save_store_entry_failure(self, library, game_id, failure_fields):
+        """
+        Add (or update) the failure of a game's store entry.
+
+        Args:
+            library: The Library the game is listed in.
+            game_id: The id of the game in the PSN store.
+            failure_fields: The values of the other fields of the failure.
+        """
+        StoreEntryFailure.objects.update_or_create(game_id=game_id, library_fk=library, defaults=failure_fields)
+
+    def delete_store_entry_failures(self, library, game_ids):
+        """
+        Delete the store entry failures of games, e.g. once the games have synced successfully.
+
+        Args:
+            library: The Library the games are listed in.
+            game_ids: The ids of the games in the PSN store.
+        """
+        StoreEntryFailure.objects.filter(library_fk=library, game_id__in=game_ids).delete()
+
+    def release_store_entry_failures(self, failures):
+        """
+        Release store entry failures from quarantine, so the games are requested by the next sync.
+
+        Args:
+            failures: QuerySet of the StoreEntryFailures to release.
+        Returns:
+            int: The number of failures released.
+        """
+        return failures.update(quarantined=False, attempt_count=0, next_attempt_at=timezone.now())
+
+    def prune_store_entry_failures(self, library, failed_before):
+        """
+        Delete the store entry failures of a library that are not quarantined and have not failed recently.
+
+        Args:
+            library: The Library to prune.
+            failed_before: Failures that last failed before this time are deleted.
+        """
+        StoreEntryFailure.objects.filter(library_fk=library, quarantined=False, last_failed_at__lt=failed_before).delete()
+
+    def add_task_profile(self, task_name, library_id, sync_run_id, started_at, duration_seconds, summary, profile_data):
+        """
+        Add the profile of a task to the DB.
+
+        Args:
+            task_name: The name of the task.
+            library_id: The ID of the library the task was for, or None.
+            sync_run_id: The ID of the sync run the task was part of, or None.
+            started_at: When the task started.
+            duration_seconds: The time taken by the task.
+            summary: The top functions of the profile.
+            profile_data: The full profile.
+        Returns:
+            TaskProfile: The newly created Task Profile.
+        """
+        return TaskProfile.objects.create(
+            task_name=task_name,
+            library_fk=self.get_library(library_id) if library_id != None else None,
+            sync_run_fk=self.get_sync_run(sync_run_id) if sync_run_id != None else None,
+            started_at=started_at,
+            duration_seconds=duration_seconds,
+            summary=summary,
+            profile_data=profile_data)
@@ -0,0 +1,91 @@
+import collections
+from types import SimpleNamespace
+from .models import GAMELIST_MIN_RATING_COUNT, GAMELIST_MIN_PRICE
+
+# Game fields loaded into the in-memory snapshot of a library, for a dry run.
+DIFF_GAME_FIELDS = ['game_id', 'game_name', 'price', 'base_price', 'plus_price', 'base_discount', 'plus_discount', 'rating', 'rating_count', 'weighted_rating', 'base_value_score', 'plus_value_score']
+
+LibraryDiff = collections.namedtuple('LibraryDiff', [
+    # (game_id, game_name) of games in the store but not the library
+    'new_games',
+    # (game_id, game_name) of games in the library but no longer in the store
+    'removed_games',
+    # (game_id, game_name, old plus price, new plus price) of games whose PS+ price changed
+    'price_changes',
+    # (game_id, game_name, old rank, new rank) of games whose PS+ value rank changed, or None if unranked
+    'rank_movements',
+    # Seconds spent computing the diff, apart from requests to the PSN store
+    'compute_seconds',
+])
+
+def get_game_records(game_values):
+    """
+    Build the in-memory game records of a library snapshot.
+
+    Records have the same attributes as a Game, so can be updated and scored by the PSN library as if
+    they were Games, without anything being written to the DB.
+
+    Args:
+        game_values: The field values of each game, as loaded by a values() query.
+    Returns:
+        dict: The game records, keyed by game id.
+    """
+    return {values['game_id']: SimpleNamespace(**values) for values in game_values}
+
+def copy_game_records(game_records):
+    """
+    Copy the in-memory game records of a library snapshot, so that the copy can be updated.
+
+    Args:
+        game_records: The game records, keyed by game id.
+    Returns:
+        dict: The copied game records, keyed by game id.
+    """
+    return {game_id: SimpleNamespace(**vars(game)) for game_id, game in game_records.items()}
+
+def get_game_ranks(game_records):
+    """
+    Get the rank of each displayed game by PS+ value, as in the game list.
+
+    Games with too few ratings, or free to play, are not displayed in the game list, so are not ranked.
+
+    Args:
+        game_records: The game records, keyed by game id.
+    Returns:
+        dict: The rank of each displayed game (starting at 1), keyed by game id.
+    """
+    displayed_games = [game for game in game_records.values() if game.rating_count >= GAMELIST_MIN_RATING_COUNT and game.price >= GAMELIST_MIN_PRICE]
+    displayed_games.sort(key=lambda game: game.plus_value_score, reverse=True)
+    return {game.game_id: rank for rank, game in enumerate(displayed_games, 1)}
+
+def diff_library(stored_games, updated_games, listed_game_ids, compute_seconds):
+    """
+    Diff the in-memory snapshot of a library before and after a dry run.
+
+    Args:
+        stored_games: The game records as stored in the DB, keyed by game id.
+        updated_games: The game records after the dry run, keyed by game id.
+        listed_game_ids: The ids of the games listed in the PSN store, or None if the store was not requested.
+        compute_seconds: Seconds spent computing the dry run, apart from requests to the PSN store.
+    Returns:
+        LibraryDiff: The changes the dry run would make to the library.
+    """
+    stored_ranks = get_game_ranks(stored_games)
+    updated_ranks = get_game_ranks(updated_games)
+
+    new_games = [(game_id, game.game_name) for game_id, game in updated_games.items() if game_id not in stored_games]
+    removed_games = [(game_id, game.game_name) for game_id, game in stored_games.items() if listed_game_ids != None and game_id not in listed_game_ids]
+    price_changes = [
+        (game_id, game.game_name, stored_games[game_id].plus_price, game.plus_price)
+        for game_id, game in updated_games.items()
+        if game_id in stored_games and game.plus_price != stored_games[game_id].plus_price
+    ]
+    rank_movements = [
+        (game_id, updated_games[game_id].game_name, stored_ranks.get(game_id), updated_ranks.get(game_id))
+        for game_id in updated_games
+        if game_id in stored_games and stored_ranks.get(game_id) != updated_ranks.get(game_id)
+    ]
+    # Biggest movers first, treating unranked games as ranked last
+    unranked = max(len(stored_ranks), len(updated_ranks)) + 1
+    rank_movements.sort(key=lambda movement: abs((movement[2] or unranked) - (movement[3] or unranked)), reverse=True)
+    return LibraryDiff(new_games, removed_games, price_changes, rank_movements, compute_seconds)
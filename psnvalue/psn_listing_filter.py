@@ -0,0 +1,40 @@
+from datetime import datetime
+from .psn_store_json import PSN_JSON_ELEM_SUB_GAME, PSN_JSON_ELEM_RELEASE_DATE, PSN_JSON_ELEM_GAME_ID, PSN_JSON_ELEM_GAME_PRICE_BLOCK
+
+# Format of the release dates in the PSN Store JSON. They are ISO 8601 in UTC, so sort correctly as strings.
+LISTING_RELEASE_DATE_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+def get_listing_now(now=None):
+    """
+    Get the current time in the format of the release dates in the PSN Store JSON.
+
+    Args:
+        now: The current UTC time, or None for the system clock.
+    Returns:
+        str: The current time, which can be compared directly with the release dates.
+    """
+    return (now or datetime.utcnow()).strftime(LISTING_RELEASE_DATE_FORMAT)
+
+def filter_listing(games_json, listing_now, skipped_game_ids):
+    """
+    Filter the games listed in the PSN Store JSON down to those worth requesting the details of.
+
+    The whole listing is filtered in one pass before any details are requested. Release dates are compared
+    as strings against the current time, so no date is parsed. Bundles, unreleased games, games without a
+    price block (e.g. pre-orders) and games whose details recently failed to sync are dropped. Different
+    editions of a game are kept.
+
+    Args:
+        games_json: The simple JSON of each game listed in the PSN Store.
+        listing_now: The current time, from get_listing_now().
+        skipped_game_ids: The ids of the games whose details failed to sync, and are not due a retry.
+    Returns:
+        list: The simple JSON of each game to request.
+    """
+    return [
+        game_json for game_json in games_json
+        if PSN_JSON_ELEM_SUB_GAME not in game_json
+        and game_json.get(PSN_JSON_ELEM_GAME_PRICE_BLOCK)
+        and (game_json.get(PSN_JSON_ELEM_RELEASE_DATE) or listing_now) < listing_now
+        and game_json.get(PSN_JSON_ELEM_GAME_ID) not in skipped_game_ids
+    ]
@@ -0,0 +1,16 @@
+# resource is only available on Unix. Without it, the peak RSS is not measured.
+try:
+    import resource
+except ImportError:
+    resource = None
+
+def get_peak_rss_kb():
+    """
+    Get the peak resident set size of this process.
+
+    Returns:
+        int: The peak RSS in kilobytes, or None if it can't be measured on this platform.
+    """
+    if resource == None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
@@ -0,0 +1,240 @@
+import time
+import bisect
+import redis
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+
+# Upper bounds (milliseconds) of the buckets of the PSN store latency histogram. The last bucket is unbounded.
+METRICS_LATENCY_BUCKETS_MS = [25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+# Label of the unbounded latency bucket.
+METRICS_LATENCY_OVERFLOW_BUCKET = '10000+'
+# Percentiles of the PSN store latency shown on the dashboard.
+METRICS_LATENCY_PERCENTILES = [50, 90, 99]
+# Redis key prefix for the daily latency histogram of requests to the PSN store, hashed by bucket.
+METRICS_STORE_LATENCY_KEY = 'psn_metrics:store_latency:'
+# Redis key prefix for the daily count of failed requests to the PSN store, hashed by error class.
+METRICS_STORE_ERRORS_KEY = 'psn_metrics:store_errors:'
+# Redis key prefixes for the daily histograms of the latency, DB time and template render time of each view,
+# hashed by view name and bucket.
+METRICS_VIEW_LATENCY_KEY = 'psn_metrics:view_latency:'
+METRICS_VIEW_DB_KEY = 'psn_metrics:view_db:'
+METRICS_VIEW_TEMPLATE_KEY = 'psn_metrics:view_template:'
+# Redis key prefix for the daily count of DB queries made by each view, hashed by view name.
+METRICS_VIEW_QUERIES_KEY = 'psn_metrics:view_queries:'
+# Separator of the view name and bucket in the fields of the view histograms. URL names never contain it.
+METRICS_VIEW_FIELD_SEPARATOR = '|'
+# Seconds the daily metrics are kept in Redis.
+METRICS_RETENTION_SECONDS = 7 * 24 * 60 * 60
+# Seconds to wait for Redis to connect, or to answer, before giving up on recording or reading the metrics.
+METRICS_REDIS_TIMEOUT_SECONDS = 0.25
+# Seconds the metrics are not recorded or read after Redis fails, so requests don't each wait on its timeout.
+METRICS_REDIS_BACKOFF_SECONDS = 30
+# Games that have not been checked against the PSN store for this long are stale.
+METRICS_STALE_GAME_AGE = timedelta(days=2)
+
+def get_latency_bucket(latency_ms):
+    """
+    Get the label of the histogram bucket of a latency.
+
+    Args:
+        latency_ms: The latency in milliseconds.
+    Returns:
+        str: The upper bound of the bucket, or METRICS_LATENCY_OVERFLOW_BUCKET.
+    """
+    bucket_index = bisect.bisect_left(METRICS_LATENCY_BUCKETS_MS, latency_ms)
+    if bucket_index == len(METRICS_LATENCY_BUCKETS_MS):
+        return METRICS_LATENCY_OVERFLOW_BUCKET
+    return str(METRICS_LATENCY_BUCKETS_MS[bucket_index])
+
+def get_latency_percentile(bucket_counts, percentile):
+    """
+    Get a percentile of a latency histogram, to the upper bound of the bucket it falls in.
+
+    Args:
+        bucket_counts: The count of latencies in each bucket, keyed by bucket label.
+        percentile: The percentile (0-100).
+    Returns:
+        str: The upper bound of the bucket of the percentile, or None if the histogram is empty.
+    """
+    total = sum(bucket_counts.values())
+    if total == 0:
+        return None
+    count = 0
+    for bucket in [str(bucket_ms) for bucket_ms in METRICS_LATENCY_BUCKETS_MS] + [METRICS_LATENCY_OVERFLOW_BUCKET]:
+        count += bucket_counts.get(bucket, 0)
+        if count * 100 >= total * percentile:
+            return bucket
+    return METRICS_LATENCY_OVERFLOW_BUCKET
+
+def get_view_bucket_counts(view_counts):
+    """
+    Split the fields of a view histogram from Redis into a histogram for each view.
+
+    Args:
+        view_counts: The count of each field of the histogram, keyed by 'view name|bucket' bytes.
+    Returns:
+        dict: The count of latencies in each bucket, keyed by bucket label, keyed by view name.
+    """
+    bucket_counts = {}
+    for field, count in view_counts.items():
+        view_name, bucket = field.decode().rsplit(METRICS_VIEW_FIELD_SEPARATOR, 1)
+        bucket_counts.setdefault(view_name, {})[bucket] = int(count)
+    return bucket_counts
+
+def get_latency_percentiles(bucket_counts):
+    """
+    Get the (percentile, latency bucket) pairs of a latency histogram, for each of METRICS_LATENCY_PERCENTILES.
+    """
+    return [(percentile, get_latency_percentile(bucket_counts, percentile)) for percentile in METRICS_LATENCY_PERCENTILES]
+
+class PSNMetrics:
+    """
+    Pre-aggregated metrics of requests to the PSN store and to the views, shared through Redis by every worker.
+
+    Each request only increments a counter, so the metrics stay cheap to record and to read however many
+    requests are made. Metrics are best effort: Redis being unavailable never fails a request, and only
+    delays it by a short timeout, after which Redis is left alone for a while.
+    """
+
+    def __init__(self):
+        self.redis_client = None
+        # Monotonic time until which Redis is not used, after it failed.
+        self.backoff_until = 0.0
+
+    def get_redis_client(self):
+        """
+        Get the Redis client, connecting on first use.
+
+        Raises:
+            redis.ConnectionError: If Redis failed within the last METRICS_REDIS_BACKOFF_SECONDS.
+        """
+        if time.monotonic() < self.backoff_until:
+            raise redis.ConnectionError("Redis failed recently, so the metrics are not used until %s." % self.backoff_until)
+        if self.redis_client == None:
+            self.redis_client = redis.StrictRedis.from_url(settings.REDIS_URL_VAL, socket_timeout=METRICS_REDIS_TIMEOUT_SECONDS, socket_connect_timeout=METRICS_REDIS_TIMEOUT_SECONDS)
+        return self.redis_client
+
+    def back_off(self):
+        """
+        Stop using Redis for METRICS_REDIS_BACKOFF_SECONDS after it failed, unless already backing off.
+        """
+        now = time.monotonic()
+        if now >= self.backoff_until:
+            self.backoff_until = now + METRICS_REDIS_BACKOFF_SECONDS
+
+    def get_day_key(self, key_prefix, day=None):
+        """
+        Get the Redis key of a daily metric.
+        """
+        return key_prefix + (day or timezone.now()).strftime('%Y%m%d')
+
+    def record_store_request(self, latency_seconds, error_class=None):
+        """
+        Record a request to the PSN store in today's metrics.
+
+        Args:
+            latency_seconds: The time taken by the request.
+            error_class: The class name of the exception raised by the request, or None if it succeeded.
+        """
+        latency_key = self.get_day_key(METRICS_STORE_LATENCY_KEY)
+        errors_key = self.get_day_key(METRICS_STORE_ERRORS_KEY)
+        try:
+            pipe = self.get_redis_client().pipeline()
+            pipe.hincrby(latency_key, get_latency_bucket(latency_seconds * 1000), 1)
+            pipe.expire(latency_key, METRICS_RETENTION_SECONDS)
+            if error_class != None:
+                pipe.hincrby(errors_key, error_class, 1)
+                pipe.expire(errors_key, METRICS_RETENTION_SECONDS)
+            pipe.execute()
+        except redis.RedisError:
+            self.back_off()
+
+    def get_store_metrics(self, day=None):
+        """
+        Get a day's metrics of requests to the PSN store.
+
+        Args:
+            day: The day, or None for today.
+        Returns:
+            dict: The request count, the (percentile, latency bucket) pairs and the (error class, count) pairs,
+                  or None if Redis is unavailable.
+        """
+        try:
+            pipe = self.get_redis_client().pipeline()
+            pipe.hgetall(self.get_day_key(METRICS_STORE_LATENCY_KEY, day))
+            pipe.hgetall(self.get_day_key(METRICS_STORE_ERRORS_KEY, day))
+            latency_counts, error_counts = pipe.execute()
+        except redis.RedisError:
+            self.back_off()
+            return None
+        bucket_counts = {bucket.decode(): int(count) for bucket, count in latency_counts.items()}
+        return {
+            'request_count': sum(bucket_counts.values()),
+            'latency_percentiles': get_latency_percentiles(bucket_counts),
+            'error_counts': sorted((error_class.decode(), int(count)) for error_class, count in error_counts.items()),
+        }
+
+    def record_view_request(self, view_name, latency_seconds, db_seconds, query_count, template_seconds):
+        """
+        Record a request to a view in today's metrics.
+
+        Args:
+            view_name: The URL name of the view, including its namespace.
+            latency_seconds: The time taken by the request.
+            db_seconds: The time taken by the DB queries made by the request.
+            query_count: The number of DB queries made by the request.
+            template_seconds: The time taken to render the template of the response, or None if it has none.
+        """
+        view_field_prefix = view_name + METRICS_VIEW_FIELD_SEPARATOR
+        latencies = [(METRICS_VIEW_LATENCY_KEY, latency_seconds), (METRICS_VIEW_DB_KEY, db_seconds)]
+        if template_seconds != None:
+            latencies.append((METRICS_VIEW_TEMPLATE_KEY, template_seconds))
+        queries_key = self.get_day_key(METRICS_VIEW_QUERIES_KEY)
+        try:
+            pipe = self.get_redis_client().pipeline()
+            for key_prefix, seconds in latencies:
+                key = self.get_day_key(key_prefix)
+                pipe.hincrby(key, view_field_prefix + get_latency_bucket(seconds * 1000), 1)
+                pipe.expire(key, METRICS_RETENTION_SECONDS)
+            pipe.hincrby(queries_key, view_name, query_count)
+            pipe.expire(queries_key, METRICS_RETENTION_SECONDS)
+            pipe.execute()
+        except redis.RedisError:
+            self.back_off()
+
+    def get_view_metrics(self, day=None):
+        """
+        Get a day's metrics of requests to each view.
+
+        Args:
+            day: The day, or None for today.
+        Returns:
+            list: For each view, in order of view name, a dict of the view name, the request count, the mean
+                  query count and the (percentile, bucket) pairs of its latency, DB time and template render time,
+                  or None if Redis is unavailable.
+        """
+        try:
+            pipe = self.get_redis_client().pipeline()
+            for key_prefix in (METRICS_VIEW_LATENCY_KEY, METRICS_VIEW_DB_KEY, METRICS_VIEW_TEMPLATE_KEY, METRICS_VIEW_QUERIES_KEY):
+                pipe.hgetall(self.get_day_key(key_prefix, day))
+            latency_counts, db_counts, template_counts, query_counts = pipe.execute()
+        except redis.RedisError:
+            self.back_off()
+            return None
+        latency_bucket_counts = get_view_bucket_counts(latency_counts)
+        db_bucket_counts = get_view_bucket_counts(db_counts)
+        template_bucket_counts = get_view_bucket_counts(template_counts)
+        query_counts = {view_name.decode(): int(count) for view_name, count in query_counts.items()}
+        view_metrics = []
+        for view_name in sorted(latency_bucket_counts):
+            request_count = sum(latency_bucket_counts[view_name].values())
+            view_metrics.append({
+                'view_name': view_name,
+                'request_count': request_count,
+                'mean_query_count': query_counts.get(view_name, 0) / request_count,
+                'latency_percentiles': get_latency_percentiles(latency_bucket_counts[view_name]),
+                'db_percentiles': get_latency_percentiles(db_bucket_counts.get(view_name, {})),
+                'template_percentiles': get_latency_percentiles(template_bucket_counts.get(view_name, {})),
+            })
+        return view_metrics
@@ -0,0 +1,110 @@
+import io
+import time
+import marshal
+import pstats
+import cProfile
+import threading
+from django.utils import timezone
+from .psn_library_dao import PSNLibraryDAO
+
+# Number of functions listed in the summary of a profile.
+PROFILE_SUMMARY_FUNCTION_COUNT = 40
+# Order of the functions in the summary of a profile.
+PROFILE_SUMMARY_SORT = 'cumulative'
+
+# The profiles of the threads started by the task being profiled in this thread, if any.
+_task_profiling = threading.local()
+
+def profile_thread_target(target):
+    """
+    Wrap the target of a thread started by a task, so that the thread is profiled too when the task is.
+
+    cProfile only profiles the thread it is enabled in, so each thread started by a profiled task (e.g. the
+    fetch stage of a sync pipeline) gets its own profile, which is merged into the task's profile.
+
+    Args:
+        target: The target function of the thread.
+    Returns:
+        The target, wrapped to profile it if the calling thread's task is being profiled.
+    """
+    thread_profiles = getattr(_task_profiling, 'thread_profiles', None)
+    if thread_profiles == None:
+        return target
+
+    def profiled_target(*args, **kwargs):
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            return target(*args, **kwargs)
+        finally:
+            profiler.disable()
+            thread_profiles.append(profiler)
+    return profiled_target
+
+def get_profile_summary(stats):
+    """
+    Get the summary of a profile: its top functions by cumulative time, as printed by pstats.
+
+    Args:
+        stats: The pstats.Stats of the profile.
+    Returns:
+        str: The summary.
+    """
+    stream = io.StringIO()
+    stats.stream = stream
+    stats.sort_stats(PROFILE_SUMMARY_SORT).print_stats(PROFILE_SUMMARY_FUNCTION_COUNT)
+    return stream.getvalue()
+
+def get_profile_data(stats):
+    """
+    Get the raw data of a profile, in the format written by pstats.Stats.dump_stats.
+
+    The data can be saved to a .prof file and loaded by pstats, snakeviz etc.
+    """
+    return marshal.dumps(stats.stats)
+
+class PSNTaskProfiler:
+    """
+    Opt-in cProfile capture of Celery tasks.
+
+    cProfile slows a task down, so tasks are only profiled when asked, e.g. with the p_profile kwarg of a
+    task. The profile is saved to the DB with a summary of the top functions, so hot spots in production can
+    be diagnosed after the task has finished.
+    """
+
+    psn_library_dao = PSNLibraryDAO()
+
+    def run(self, profile, task_name, function, *args, library_id=None, sync_run_id=None):
+        """
+        Run a task's function, profiling it if asked.
+
+        The profile is saved even if the function raises an exception. The profiles of the threads started by
+        the function with profile_thread_target, and finished by the time it returns, are merged into it.
+
+        Args:
+            profile: True to profile the function, else it is just run.
+            task_name: The name of the task.
+            function: The function to run.
+            args: The arguments of the function.
+            library_id: The ID of the library the task is for, or None.
+            sync_run_id: The ID of the sync run the task is part of, or None.
+        Returns:
+            The result of the function.
+        """
+        if not profile:
+            return function(*args)
+
+        profiler = cProfile.Profile()
+        thread_profiles = []
+        _task_profiling.thread_profiles = thread_profiles
+        started_at = timezone.now()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            return function(*args)
+        finally:
+            profiler.disable()
+            _task_profiling.thread_profiles = None
+            duration_seconds = time.perf_counter() - start
+            stats = pstats.Stats(profiler, *thread_profiles)
+            self.psn_library_dao.add_task_profile(task_name, library_id, sync_run_id, started_at, duration_seconds, get_profile_summary(stats), get_profile_data(stats))
@@ -0,0 +1,137 @@
+import datetime
+from django.db.models import Q, Case, When, Value, DateTimeField
+from django.utils import timezone
+from .models import GAMELIST_MIN_RATING_COUNT, GAMELIST_MIN_PRICE
+from .psn_library_dao import PSNLibraryDAO
+
+# Refresh interval for games whose value ranking is likely to move e.g. discounted or top value games.
+REFRESH_INTERVAL_HOURLY = datetime.timedelta(hours=1)
+# Refresh interval for all other games.
+REFRESH_INTERVAL_DAILY = datetime.timedelta(days=1)
+# Refresh interval for games that are never displayed e.g. unrated or free to play games.
+REFRESH_INTERVAL_WEEKLY = datetime.timedelta(days=7)
+
+# Games in this many of the top ranked games in a library are treated as high value.
+REFRESH_TOP_VALUE_GAME_COUNT = 120
+# How long the top value threshold of a library is reused before it is fetched again.
+REFRESH_THRESHOLD_MAX_AGE = datetime.timedelta(hours=1)
+
+class PSNRefreshScheduler:
+    """
+    Assigns each game in the PSN library a time at which it should next be refreshed from the PSN store.
+
+    The refresh interval is chosen from signals already stored for the game, so that the store request
+    budget is spent on the games whose value ranking is most likely to change.
+    """
+
+    psn_library_dao = PSNLibraryDAO()
+
+    def __init__(self):
+        # Top value thresholds per library, as (threshold, time fetched) tuples.
+        self.top_value_thresholds = {}
+
+    def schedule_game(self, library, game):
+        """
+        Set the next refresh time for a game, based on its refresh interval.
+
+        Args:
+            library: The PSN library object from the DB.
+            game: The game to schedule.
+        """
+        game.next_refresh = timezone.now() + self.get_refresh_interval(library, game)
+
+    def schedule_checked_games(self, library, checked_since):
+        """
+        Set the next refresh time for every game in a library checked since a time, inside the DB.
+
+        Used once a sync has scored the whole library (see PSNLibrary.update_psn_library), as its games are
+        written before they are scored, when their value scores are stale.
+
+        Args:
+            library: The PSN library object from the DB.
+            checked_since: The time from which checked games are scheduled e.g. the start of the sync.
+        """
+        # The scores have just changed, so the cached top value threshold is stale too.
+        self.top_value_thresholds.pop(library.pk, None)
+        self.psn_library_dao.update_checked_games_next_refresh(library, checked_since, self.get_next_refresh_expression(library, timezone.now()))
+
+    def get_next_refresh_expression(self, library, now):
+        """
+        Get the DB expression for the next refresh time of a game, matching get_refresh_interval.
+
+        Args:
+            library: The PSN library object from the DB.
+            now: The time the refresh intervals start from.
+        Returns:
+            Expression: The next refresh time of a game in the library.
+        """
+        hourly = Q(base_discount__gt=0) | Q(plus_discount__gt=0)
+        threshold = self.get_top_value_threshold(library)
+        if threshold != None:
+            hourly |= Q(plus_value_score__gte=threshold)
+        return Case(
+            When(Q(rating_count__lt=GAMELIST_MIN_RATING_COUNT) | Q(price__lt=GAMELIST_MIN_PRICE), then=Value(now + REFRESH_INTERVAL_WEEKLY)),
+            When(hourly, then=Value(now + REFRESH_INTERVAL_HOURLY)),
+            default=Value(now + REFRESH_INTERVAL_DAILY),
+            output_field=DateTimeField())
+
+    def get_refresh_interval(self, library, game):
+        """
+        Determine how often a game should be refreshed from the PSN store.
+
+        Discounted and high value games are refreshed hourly. Games that are not displayed in the game
+        list (too few ratings, or free to play) are refreshed weekly. All other games are refreshed daily.
+
+        Args:
+            library: The PSN library object from the DB.
+            game: The game to determine the refresh interval for.
+        Returns:
+            timedelta: The interval until the game should next be refreshed.
+        """
+        if int(game.rating_count) < GAMELIST_MIN_RATING_COUNT or game.price < GAMELIST_MIN_PRICE:
+            return REFRESH_INTERVAL_WEEKLY
+        if game.base_discount > 0 or game.plus_discount > 0:
+            return REFRESH_INTERVAL_HOURLY
+        if self.game_is_top_value(library, game):
+            return REFRESH_INTERVAL_HOURLY
+        return REFRESH_INTERVAL_DAILY
+
+    def game_is_top_value(self, library, game):
+        """
+        Check if a game is ranked within the top value games of its library i.e. the first pages of the game list.
+
+        Args:
+            library: The PSN library object from the DB.
+            game: The game to check.
+        Returns:
+            boolean: True if the game is in the top value games, else false.
+        """
+        threshold = self.get_top_value_threshold(library)
+        return threshold != None and game.plus_value_score >= threshold
+
+    def get_top_value_threshold(self, library):
+        """
+        Get the PS+ value score of the lowest ranked game within the top value games of a library.
+
+        The threshold is cached per library, so that scheduling a batch of games costs a single query.
+
+        Args:
+            library: The PSN library object from the DB.
+        Returns:
+            number: The threshold value score, or None if the library has no games.
+        """
+        cached_threshold = self.top_value_thresholds.get(library.pk)
+        if cached_threshold == None or (timezone.now() - cached_threshold[1]) > REFRESH_THRESHOLD_MAX_AGE:
+            threshold = self.psn_library_dao.get_top_value_threshold(library, REFRESH_TOP_VALUE_GAME_COUNT, GAMELIST_MIN_RATING_COUNT, GAMELIST_MIN_PRICE)
+            cached_threshold = (threshold, timezone.now())
+            self.top_value_thresholds[library.pk] = cached_threshold
+        return cached_threshold[0]
+
+    def postpone_game(self, game):
+        """
+        Push back the next refresh of a game that could not be refreshed, so that it does not block the queue.
+
+        Args:
+            game: The game to postpone.
+        """
+        game.next_refresh = timezone.now() + REFRESH_INTERVAL_DAILY
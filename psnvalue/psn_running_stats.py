@@ -0,0 +1,39 @@
+import math
+
+class RunningStats:
+    """
+    Running mean and population variance of a stream of values, using Welford's algorithm.
+
+    Values are accumulated one at a time in constant memory, so the statistics of a library are known
+    as soon as its last game has been processed, without querying the games again.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        # Sum of squared differences from the current mean
+        self.sum_squared_diff = 0.0
+
+    def add(self, value):
+        """
+        Add a value to the statistics.
+
+        Args:
+            value: The value to add.
+        """
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.sum_squared_diff += delta * (value - self.mean)
+
+    def get_pvariance(self):
+        """
+        Get the population variance of the values added, or 0.0 if no values have been added.
+        """
+        return self.sum_squared_diff / self.count if self.count > 0 else 0.0
+
+    def get_pstdev(self):
+        """
+        Get the population standard deviation of the values added, or 0.0 if no values have been added.
+        """
+        return math.sqrt(self.get_pvariance())
@@ -0,0 +1,164 @@
+from collections import OrderedDict
+from decimal import Decimal, ROUND_HALF_UP
+
+# The version of the scoring model whose scores are stored on GameList and served by default.
+SCORING_PRODUCTION_VERSION = 'v1'
+
+# Registered scoring models, by version.
+SCORING_MODELS = OrderedDict()
+
+def register_scoring_model(scoring_model_class):
+    """
+    Class decorator registering a scoring model under its version.
+    """
+    SCORING_MODELS[scoring_model_class.version] = scoring_model_class()
+    return scoring_model_class
+
+def get_scoring_model(version=SCORING_PRODUCTION_VERSION):
+    """
+    Get a registered scoring model.
+
+    Args:
+        version: The version of the scoring model.
+    Returns:
+        ScoringModel: The scoring model, or None if no model is registered for the version.
+    """
+    return SCORING_MODELS.get(version)
+
+def round_half_up(value, places=0):
+    """
+    Round a number to a number of places, rounding halves away from zero as SQL's ROUND does.
+
+    Python's round rounds halves to even, so scores calculated with it would differ from those calculated
+    in the DB (see psn_db_scoring) wherever a value is exactly half way between two roundings.
+
+    Args:
+        value: The number to round.
+        places: The number of decimal places to round to.
+    Returns:
+        number: The rounded number, an int when rounded to no places, else a float.
+    """
+    rounded = Decimal(repr(value)).quantize(Decimal(1).scaleb(-places), rounding=ROUND_HALF_UP)
+    return float(rounded) if places else int(rounded)
+
+def get_shadow_scoring_versions():
+    """
+    Get the versions of every registered scoring model other than the production model.
+    """
+    return [version for version in SCORING_MODELS if version != SCORING_PRODUCTION_VERSION]
+
+@register_scoring_model
+class ScoringModelV1:
+    """
+    The original value formula: the rating weighted by its count and deviation from the library mean,
+    then by the discount, per unit of price.
+
+    Variants of the formula can subclass this model, override its constants or methods, and register
+    under a new version.
+    """
+    version = 'v1'
+
+    DEFAULT_GAME_PRICE = 1
+    DEFAULT_GAME_WEIGHTED_RATING = 1
+    RATING_COUNT_WEIGHTING = 125
+
+    def score_game(self, library, game):
+        """
+        Calculate all of the scores of a game, without changing the game.
+
+        Args:
+            library: The PSN library object from the DB.
+            game: The game to score.
+        Returns:
+            dict: The weighted_rating, base_value_score and plus_value_score of the game.
+        """
+        weighted_rating = self.determine_weighted_game_rating(library, game)
+        return {
+            'weighted_rating': weighted_rating,
+            'base_value_score': self.calculate_game_value(library, game, weighted_rating, False),
+            'plus_value_score': self.calculate_game_value(library, game, weighted_rating, True),
+        }
+
+    def determine_weighted_game_rating(self, library, game):
+        """
+        Determine the weighted rating of a game.
+
+        The rating, the count of ratings made and the rating's deviation from the mean are factored in.
+
+        Args:
+            library: The PSN library object from the DB.
+            game: The game to determine the weighted rating for.
+        Returns:
+            float: The weighted rating for this game.
+        """
+        # Determine if this game is above or below the mean rating. Necessary for applying different weighting algorithm.
+        aboveMean = self.rating_above_mean(library, game)
+
+        # Determine how much weight to put on the rating as a result of the number of ratings.
+        ratingCountVal = (float(game.rating_count)/self.RATING_COUNT_WEIGHTING)
+
+        # Determine weighting to apply based on rating deviation from the mean.
+        ratingConstant = 1 if aboveMean else -1
+        # A library whose ratings are all the same has no deviation, rather than dividing by zero.
+        ratingDeviation = 0.0 if library.library_rating_stdev == 0 else ((float(game.rating) - library.library_rating_mean)/library.library_rating_stdev)
+        ratingVal = round_half_up((float(game.rating)) * (ratingConstant+ratingDeviation), 2)
+
+        # Apply different weights depending if the game rating is above or below mean.
+        finalVal = 0
+        if aboveMean:
+            finalVal = (ratingVal+ratingCountVal)
+        else:
+            finalVal = (ratingVal-ratingCountVal)
+
+        # Account for a weighted rating of zero
+        return self.DEFAULT_GAME_WEIGHTED_RATING if finalVal == 0.0 else finalVal
+
+    def calculate_game_value(self, library, game, weighted_rating, is_plus):
+        """
+        Calculate the value for a game.
+
+        Calculate the value based on the weighted rating, the price and the discount.
+
+        Args:
+            library: The PSN library object from the DB.
+            game: The game to determine the value for.
+            weighted_rating: The weighted rating of the game.
+            is_plus: True if we are calculating the PS+ value, else false for non-PS+.
+        """
+        game_price = 0.0
+        game_rating = 0.0
+        discount_weight = 0.0
+
+        if is_plus == True:
+            game_price = game.plus_price
+        else:
+            game_price = game.base_price
+
+        # Use DEFAULT_GAME_PRICE for anything less than 1 (stops division by zero errors).
+        game_price = round_half_up(game_price if game_price > 0.0 else self.DEFAULT_GAME_PRICE)
+
+        # Determine the weight to apply to the discount.
+        if is_plus == True:
+            discount_weight = 1+(game.plus_discount/100)
+        else:
+            discount_weight = 1+(game.base_discount/100)
+
+        # Apply the discount weight to the weighted rating.
+        if self.rating_above_mean(library, game):
+            game_rating = ((weighted_rating)*discount_weight)*100
+        else:
+            game_rating = ((weighted_rating)/discount_weight)*100
+
+        return round_half_up(1/(game_price/game_rating)*100)
+
+    def rating_above_mean(self, library, game):
+        """
+        Determine if a game's rating is above or below the mean rating for the library.
+
+        Args:
+            library: The PSN library object from the DB.
+            game: The game to determine if it is above or below the mean.
+        Returns:
+            boolean: True if above the mean, else false.
+        """
+        return (float(game.rating) - library.library_rating_mean) > 0
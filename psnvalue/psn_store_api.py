@@ -1,16 +1,46 @@
 import requests
 import time
+from .psn_store_json import loads
+from .psn_game_snapshot import GameSnapshot
+from .psn_store_budget import PSNStoreBudget
+from .psn_metrics import PSNMetrics
+from .psn_store_failures import PSNStoreError
 
 # Spacing between library api requests
 PSN_API_SPACING_LIB = 5
-# Spacing between game api requests
-PSN_API_SPACING_GAME = 2
 # This controls the returning of game JSON during our request for the count of games.
 PSN_API_COUNT_OF_GAMES_URL_SUFFIX = '0'
 #PSN Library Total Results
 PSN_JSON_ELEM_TOTAL_RESULTS = 'total_results'
 
 class PSNStoreAPI:
+
+    psn_store_budget = PSNStoreBudget()
+    psn_metrics = PSNMetrics()
+
+    def request_store(self, request_url):
+        """
+        Make a GET request to the PSN store, recording its latency and any error in the store metrics.
+
+        Args:
+            request_url: The URL to request.
+        Returns:
+            Response: The response from the PSN store.
+        Raises:
+            PSNStoreError: If the PSN store responded with an HTTP error.
+        """
+        request_start = time.perf_counter()
+        try:
+            response = requests.get(request_url)
+        except Exception as e:
+            self.psn_metrics.record_store_request(time.perf_counter() - request_start, type(e).__name__)
+            raise
+        error_class = None if response.ok else 'HTTP ' + str(response.status_code)
+        self.psn_metrics.record_store_request(time.perf_counter() - request_start, error_class)
+        if error_class != None:
+            raise PSNStoreError(error_class)
+        return response
+
     """
     Library Requests
     """
@@ -45,9 +75,9 @@ class PSNStoreAPI:
         """
         request_url = library_url+PSN_API_COUNT_OF_GAMES_URL_SUFFIX
         print("URL: ", request_url)
-        response_json = requests.get(request_url)
+        response_json = self.request_store(request_url)
         print("Status Code for Game Count request: ", print(response_json.status_code))
-        psn_lib_json = response_json.json()
+        psn_lib_json = loads(response_json.content)
         return psn_lib_json[PSN_JSON_ELEM_TOTAL_RESULTS]
 
     def make_psn_lib_json_api_request(self, library_url, count_to_fetch):
@@ -62,25 +92,27 @@ class PSNStoreAPI:
         """
         request_url = library_url+str(count_to_fetch)
         print("URL: ", request_url)
-        response_json = requests.get(request_url)
+        response_json = self.request_store(request_url)
         print("Status Code for Library List request: ", print(response_json.status_code))
-        return response_json.json()
+        return loads(response_json.content)
 
     """
     Game Requests
     """
-    def request_psn_game_json(self, detailed_game_json_url):
+    def request_psn_game_json(self, detailed_game_json_url, library_id):
         """
         Get the detailed JSON for a game in the PSN Store.
 
-        Sleep after this request to ensure requests are spaced out.
+        Only a snapshot of the fields used by the PSN library is kept from the detailed JSON.
+        Wait for the library's share of the PSN store budget before this request, to ensure requests
+        from every library sync are spaced out.
 
         Args:
             detailed_game_json_url: The URL for the detailed game JSON.
+            library_id: The ID of the library requesting the game.
         Return:
-            JSON: The detailed game JSON.
+            GameSnapshot: The snapshot of the detailed game JSON.
         """
-        response_json = requests.get(detailed_game_json_url)
-        time.sleep(PSN_API_SPACING_GAME)
-        psn_game_json = response_json.json()
-        return psn_game_json
+        self.psn_store_budget.acquire(library_id)
+        response_json = self.request_store(detailed_game_json_url)
+        return GameSnapshot.from_json(loads(response_json.content))
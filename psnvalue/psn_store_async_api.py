@@ -0,0 +1,160 @@
+import time
+import asyncio
+import aiohttp
+from .psn_store_json import loads
+from .psn_game_snapshot import GameSnapshot
+from .psn_store_budget import PSNStoreBudget
+from .psn_metrics import PSNMetrics
+from .psn_store_failures import PSNStoreError
+from .psn_store_api import PSN_API_SPACING_LIB, PSN_API_COUNT_OF_GAMES_URL_SUFFIX, PSN_JSON_ELEM_TOTAL_RESULTS
+
+# The maximum number of requests in flight to the PSN store at once, and the size of the connection pool.
+PSN_ASYNC_MAX_IN_FLIGHT = 200
+
+class PSNStoreAsyncAPI:
+    """
+    Asyncio implementation of PSNStoreAPI, for fetching many games concurrently from one worker process.
+
+    Requests share one connection pool, and the number in flight is bounded by a semaphore. Each game
+    request still waits for its share of the PSN store budget, so the budget is the only limit on the
+    request rate. A slot is only reserved once a request is in flight, and one at a time, so a library
+    never holds more than one slot ahead of the budget, leaving the other libraries their fair share.
+    The coroutines are run from synchronous code (e.g. Celery tasks) with run().
+    """
+
+    psn_store_budget = PSNStoreBudget()
+    psn_metrics = PSNMetrics()
+
+    def __init__(self, max_in_flight=PSN_ASYNC_MAX_IN_FLIGHT):
+        self.max_in_flight = max_in_flight
+        self.session = None
+        self.semaphore = None
+        self.budget_lock = None
+
+    def run(self, coroutine_function, *args):
+        """
+        Run a coroutine of this API to completion, in a new event loop with a new connection pool.
+
+        Args:
+            coroutine_function: The coroutine function of this API to run e.g. self.request_psn_game_jsons.
+            args: The arguments of the coroutine function.
+        Returns:
+            The result of the coroutine.
+        """
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            return loop.run_until_complete(self.run_in_session(coroutine_function, *args))
+        finally:
+            asyncio.set_event_loop(None)
+            loop.close()
+
+    async def run_in_session(self, coroutine_function, *args):
+        """
+        Await a coroutine of this API with an open connection pool, closing the pool afterwards.
+        """
+        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.max_in_flight)) as session:
+            self.session = session
+            self.semaphore = asyncio.Semaphore(self.max_in_flight)
+            self.budget_lock = asyncio.Lock()
+            try:
+                return await coroutine_function(*args)
+            finally:
+                self.session = None
+                self.semaphore = None
+                self.budget_lock = None
+
+    async def wait_for_budget(self, library_id):
+        """
+        Wait for the library's next slot in the PSN store budget.
+
+        Slots are reserved one at a time, each after the last one has passed, and in a thread, so the event
+        loop is not blocked on Redis.
+
+        Args:
+            library_id: The ID of the library making the request.
+        """
+        async with self.budget_lock:
+            delay = await asyncio.get_event_loop().run_in_executor(None, self.psn_store_budget.reserve, library_id)
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+    async def fetch_json(self, url, library_id=None):
+        """
+        Request JSON from the PSN store, waiting if the maximum number of requests are in flight.
+
+        The latency and any error of the request are recorded in the store metrics, in a thread.
+
+        Args:
+            url: The URL of the JSON.
+            library_id: The ID of the library making the request, to wait for its slot in the PSN store budget
+                once the request is in flight, or None if the request is not budgeted.
+        Returns:
+            JSON: The decoded JSON.
+        Raises:
+            PSNStoreError: If the PSN store responded with an HTTP error, or the request failed.
+        """
+        async with self.semaphore:
+            if library_id != None:
+                await self.wait_for_budget(library_id)
+            request_start = time.perf_counter()
+            error_class = None
+            try:
+                async with self.session.get(url) as response:
+                    if response.status >= 400:
+                        error_class = 'HTTP ' + str(response.status)
+                    response_body = await response.read()
+            except aiohttp.ClientError as e:
+                error_class = type(e).__name__
+                raise PSNStoreError(error_class) from e
+            except Exception as e:
+                error_class = type(e).__name__
+                raise
+            finally:
+                await asyncio.get_event_loop().run_in_executor(None, self.psn_metrics.record_store_request, time.perf_counter() - request_start, error_class)
+            if error_class != None:
+                raise PSNStoreError(error_class)
+            return loads(response_body)
+
+    """
+    Library Requests
+    """
+    async def request_psn_lib_json(self, library_url):
+        """
+        Request the JSON detailing the contents of the PSN Store (see PSNStoreAPI.request_psn_lib_json).
+
+        Args:
+            library_url: The URL for the PSN Store JSON.
+        Returns:
+            JSON: JSON containing the basic details of all games in the PSN Store.
+        """
+        psn_lib_json = await self.fetch_json(library_url + PSN_API_COUNT_OF_GAMES_URL_SUFFIX)
+        await asyncio.sleep(PSN_API_SPACING_LIB)
+        return await self.fetch_json(library_url + str(psn_lib_json[PSN_JSON_ELEM_TOTAL_RESULTS]))
+
+    """
+    Game Requests
+    """
+    async def request_psn_game_json(self, detailed_game_json_url, library_id):
+        """
+        Get the snapshot of a game in the PSN Store (see PSNStoreAPI.request_psn_game_json).
+
+        Args:
+            detailed_game_json_url: The URL for the detailed game JSON.
+            library_id: The ID of the library requesting the game.
+        Return:
+            GameSnapshot: The snapshot of the detailed game JSON.
+        """
+        return GameSnapshot.from_json(await self.fetch_json(detailed_game_json_url, library_id))
+
+    async def request_psn_game_jsons(self, detailed_game_json_urls, library_id):
+        """
+        Get the snapshots of many games in the PSN Store concurrently.
+
+        Args:
+            detailed_game_json_urls: The URLs for the detailed game JSON of each game.
+            library_id: The ID of the library requesting the games.
+        Return:
+            list: The snapshot of each game, or the exception raised requesting it, in the order of the URLs.
+        """
+        return await asyncio.gather(*[self.request_psn_game_json(url, library_id) for url in detailed_game_json_urls], return_exceptions=True)
@@ -0,0 +1,164 @@
+import time
+import redis
+import threading
+from django.conf import settings
+
+# The request budget of the PSN store, shared by every library sync. One request is allowed per interval (seconds),
+# unless overridden by settings.PSN_STORE_BUDGET_INTERVAL. This is the spacing of the old per-game sleep.
+PSN_STORE_BUDGET_DEFAULT_INTERVAL = 2.0
+# Libraries that have not reserved a request for this long (seconds) no longer take a share of the budget.
+PSN_STORE_BUDGET_ACTIVE_TTL = 60
+# Seconds to wait for Redis to connect, or to answer, before spacing requests locally instead.
+PSN_STORE_BUDGET_REDIS_TIMEOUT_SECONDS = 1.0
+# Seconds requests are spaced locally after Redis fails, before the shared budget is tried again.
+PSN_STORE_BUDGET_REDIS_BACKOFF_SECONDS = 30
+# Redis key for the time of the next free request slot of the whole budget.
+PSN_STORE_BUDGET_NEXT_SLOT_KEY = 'psn_store_budget:next_slot'
+# Redis key for the times of the next request slot of each library.
+PSN_STORE_BUDGET_LIBRARY_SLOTS_KEY = 'psn_store_budget:library_slots'
+# Redis key for the sorted set of active libraries, scored by the time of their last reservation.
+PSN_STORE_BUDGET_ACTIVE_LIBRARIES_KEY = 'psn_store_budget:active_libraries'
+
+class PSNStoreBudget:
+    """
+    Rate budget for requests to the PSN store, shared through Redis by every worker.
+
+    The budget is fair shared between the libraries that are syncing, so that each library gets an equal
+    share of the requests, however many libraries are synced concurrently.
+
+    While Redis is unavailable, each worker spaces its own requests by the budget's interval instead, as
+    the syncs did before the budget was shared.
+    """
+
+    def __init__(self):
+        self.redis_client = None
+        # Monotonic time until which Redis is not used, after it failed.
+        self.backoff_until = 0.0
+        # The next free request slot of this worker, while spacing requests locally.
+        self.local_next_slot = 0.0
+        self.local_lock = threading.Lock()
+
+    def get_redis_client(self):
+        """
+        Get the Redis client, connecting on first use.
+
+        Raises:
+            redis.ConnectionError: If Redis failed within the last PSN_STORE_BUDGET_REDIS_BACKOFF_SECONDS.
+        """
+        if time.monotonic() < self.backoff_until:
+            raise redis.ConnectionError("Redis failed recently, so the budget is not shared until %s." % self.backoff_until)
+        if self.redis_client == None:
+            self.redis_client = redis.StrictRedis.from_url(settings.REDIS_URL_VAL, socket_timeout=PSN_STORE_BUDGET_REDIS_TIMEOUT_SECONDS, socket_connect_timeout=PSN_STORE_BUDGET_REDIS_TIMEOUT_SECONDS)
+        return self.redis_client
+
+    def back_off(self):
+        """
+        Stop using Redis for PSN_STORE_BUDGET_REDIS_BACKOFF_SECONDS after it failed, unless already backing off.
+        """
+        now = time.monotonic()
+        if now >= self.backoff_until:
+            self.backoff_until = now + PSN_STORE_BUDGET_REDIS_BACKOFF_SECONDS
+
+    def get_interval(self):
+        """
+        Get the interval between requests of the whole budget, in seconds.
+        """
+        return getattr(settings, 'PSN_STORE_BUDGET_INTERVAL', PSN_STORE_BUDGET_DEFAULT_INTERVAL)
+
+    def acquire(self, library_id):
+        """
+        Block until the library may make its next request to the PSN store.
+
+        Args:
+            library_id: The ID of the library making the request.
+        """
+        delay = self.reserve(library_id)
+        if delay > 0:
+            time.sleep(delay)
+
+    def reserve(self, library_id):
+        """
+        Reserve the next request slot of the library in the shared budget.
+
+        The reservation is made in a Redis transaction, which is retried if another worker reserves a slot
+        at the same time. If Redis is unavailable, the slot is reserved locally instead.
+
+        Args:
+            library_id: The ID of the library making the request.
+        Returns:
+            number: The delay in seconds until the reserved slot.
+        """
+        try:
+            return self.reserve_shared(library_id)
+        except redis.RedisError:
+            self.back_off()
+            return self.reserve_locally()
+
+    def reserve_shared(self, library_id):
+        """
+        Reserve the next request slot of the library in the budget shared through Redis.
+
+        Args:
+            library_id: The ID of the library making the request.
+        Returns:
+            number: The delay in seconds until the reserved slot.
+        """
+        library_key = str(library_id)
+        with self.get_redis_client().pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(PSN_STORE_BUDGET_NEXT_SLOT_KEY, PSN_STORE_BUDGET_LIBRARY_SLOTS_KEY, PSN_STORE_BUDGET_ACTIVE_LIBRARIES_KEY)
+                    now = time.time()
+                    active_libraries = set(pipe.zrangebyscore(PSN_STORE_BUDGET_ACTIVE_LIBRARIES_KEY, now - PSN_STORE_BUDGET_ACTIVE_TTL, '+inf'))
+                    active_libraries.add(library_key.encode())
+                    next_slot = pipe.get(PSN_STORE_BUDGET_NEXT_SLOT_KEY)
+                    library_next_slot = pipe.hget(PSN_STORE_BUDGET_LIBRARY_SLOTS_KEY, library_key)
+
+                    slot, next_slot, library_next_slot = get_budget_slot(
+                        now,
+                        float(next_slot) if next_slot != None else now,
+                        float(library_next_slot) if library_next_slot != None else now,
+                        len(active_libraries),
+                        self.get_interval())
+
+                    pipe.multi()
+                    pipe.set(PSN_STORE_BUDGET_NEXT_SLOT_KEY, next_slot)
+                    pipe.hset(PSN_STORE_BUDGET_LIBRARY_SLOTS_KEY, library_key, library_next_slot)
+                    pipe.zadd(PSN_STORE_BUDGET_ACTIVE_LIBRARIES_KEY, now, library_key)
+                    pipe.zremrangebyscore(PSN_STORE_BUDGET_ACTIVE_LIBRARIES_KEY, '-inf', now - PSN_STORE_BUDGET_ACTIVE_TTL)
+                    pipe.execute()
+                    return slot - now
+                except redis.WatchError:
+                    continue
+
+    def reserve_locally(self):
+        """
+        Reserve the next request slot of this worker, spacing its requests by the budget's interval.
+
+        Returns:
+            number: The delay in seconds until the reserved slot.
+        """
+        with self.local_lock:
+            now = time.time()
+            slot, self.local_next_slot, library_next_slot = get_budget_slot(now, self.local_next_slot, now, 1, self.get_interval())
+            return slot - now
+
+def get_budget_slot(now, next_slot, library_next_slot, active_library_count, interval):
+    """
+    Get the next request slot of a library in the shared budget.
+
+    The slot is the first time after both the budget's and the library's next free slot. The whole budget
+    moves on by one interval, and the library moves on by one interval per active library, so that with
+    N active libraries each library makes every Nth request.
+
+    Args:
+        now: The current time, in seconds.
+        next_slot: The time of the next free slot of the whole budget.
+        library_next_slot: The time of the next free slot of the library.
+        active_library_count: The number of libraries sharing the budget.
+        interval: The interval between requests of the whole budget, in seconds.
+    Returns:
+        tuple: The reserved slot, the budget's next free slot and the library's next free slot.
+    """
+    slot = max(now, next_slot, library_next_slot)
+    return slot, slot + interval, slot + (interval * max(active_library_count, 1))
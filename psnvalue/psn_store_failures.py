@@ -0,0 +1,91 @@
+import json
+import asyncio
+import hashlib
+from datetime import timedelta
+from .psn_store_json import PSN_JSON_ELEM_GAME_ID
+
+# Delay before the first retry of a game whose details failed to sync. Each further failure doubles it.
+FAILURE_RETRY_BASE_DELAY = timedelta(days=1)
+# Longest delay between retries of a game whose details failed to sync.
+FAILURE_RETRY_MAX_DELAY = timedelta(days=7)
+# Number of failures after which a game is quarantined, until its listing changes.
+FAILURE_QUARANTINE_ATTEMPTS = 5
+# Number of days a game's failure is kept after it last failed, once it is no longer quarantined.
+FAILURE_RETENTION_DAYS = 30
+# Longest failure reason kept.
+FAILURE_REASON_MAX_LENGTH = 100
+
+class PSNStoreError(Exception):
+    """
+    The PSN store responded to a request with an HTTP error.
+    """
+
+# Errors raised by the PSN store's entry for a game: HTTP errors, network errors (requests' errors are OSErrors)
+# and timeouts, and JSON that can't be parsed into a snapshot. Any other error (e.g. from Redis or the DB) is a
+# local fault, which is not the store entry's to record.
+STORE_ENTRY_ERRORS = (PSNStoreError, OSError, asyncio.TimeoutError, ValueError, KeyError, TypeError, IndexError)
+
+def is_store_entry_error(exception):
+    """
+    Check if an exception was raised by the PSN store's entry for a game, rather than by a local fault.
+    """
+    return isinstance(exception, STORE_ENTRY_ERRORS)
+
+def get_listing_fingerprint(game_json):
+    """
+    Get a fingerprint of a game's entry in the PSN Store listing, which changes whenever the entry does.
+
+    Args:
+        game_json: The simple JSON for the game from the PSN Store.
+    Returns:
+        str: The fingerprint of the entry.
+    """
+    return hashlib.sha1(json.dumps(game_json, sort_keys=True).encode('utf-8')).hexdigest()
+
+def get_retry_delay(attempt_count):
+    """
+    Get the delay before the next attempt to sync a game, backing off exponentially after each failure.
+
+    Args:
+        attempt_count: The number of times the game has failed.
+    Returns:
+        timedelta: The delay before the next attempt.
+    """
+    return min(FAILURE_RETRY_BASE_DELAY * (2 ** (attempt_count - 1)), FAILURE_RETRY_MAX_DELAY)
+
+def is_quarantined(attempt_count):
+    """
+    Check if a game has failed enough times to be quarantined.
+    """
+    return attempt_count >= FAILURE_QUARANTINE_ATTEMPTS
+
+def get_failure_reason(exception):
+    """
+    Get the reason recorded for a failure, from the exception raised.
+    """
+    return str(exception)[:FAILURE_REASON_MAX_LENGTH]
+
+def get_skipped_game_ids(games_json, store_entry_failures, now):
+    """
+    Get the ids of the games in the PSN Store listing whose details should not be requested by this sync.
+
+    A game is skipped until its next attempt, or if it is quarantined, until its listing changes.
+
+    Args:
+        games_json: The simple JSON of each game listed in the PSN Store.
+        store_entry_failures: The store entry failures of the library, keyed by game id.
+        now: The current time.
+    Returns:
+        set: The ids of the games to skip.
+    """
+    skipped_game_ids = set()
+    for game_json in games_json:
+        failure = store_entry_failures.get(game_json.get(PSN_JSON_ELEM_GAME_ID))
+        if failure == None:
+            continue
+        if failure.quarantined:
+            if failure.listing_fingerprint == get_listing_fingerprint(game_json):
+                skipped_game_ids.add(failure.game_id)
+        elif failure.next_attempt_at > now:
+            skipped_game_ids.add(failure.game_id)
+    return skipped_game_ids
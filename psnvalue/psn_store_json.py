@@ -0,0 +1,83 @@
+import json
+
+# orjson is a faster JSON backend, pinned in requirements.txt. Fall back to the stdlib json module if it isn't installed
+# e.g. on a platform without an orjson wheel.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+###############################################################
+#   These elements below are part of the PSN library's JSON   #
+###############################################################
+#PSN Each Game JSON element
+PSN_JSON_ELEM_EACH_GAME = 'links'
+#PSN Sub-Base Game JSON element i.e. bundles etc.
+PSN_JSON_ELEM_SUB_GAME = 'parent_name'
+#PSN Game release date
+PSN_JSON_ELEM_RELEASE_DATE = 'release_date'
+#PSN Game ID JSON element
+PSN_JSON_ELEM_GAME_ID = 'id'
+#PSN Game Name JSON element
+PSN_JSON_ELEM_GAME_NAME = 'name'
+#PSN Game Full Detials URL JSON element
+PSN_JSON_ELEM_GAME_URL = 'url'
+#PSN Game Image list JSON element
+PSN_JSON_ELEM_GAME_IMAGES = 'images'
+#PSN Game Image type JSON element
+PSN_JSON_ELEM_GAME_IMGTYPE = 'type'
+#PSN Game Image large thumb
+PSN_JSON_ELEM_GAME_IMGTYPE_THUMB_LRG = 1
+#PSN Game Image small thumb
+PSN_JSON_ELEM_GAME_IMGTYPE_THUMB_SML = 2
+#PSN Main Game details block - This element is part of both the library and game JSON!
+PSN_JSON_ELEM_GAME_PRICE_BLOCK = 'default_sku'
+
+####################################################################
+#   These elements below are part of each individual game's JSON   #
+####################################################################
+# Element - The price of the game before discounts are applied
+PSN_JSON_ELEM_GAME_PRICE = 'price'
+# Parent Element - Block that contains the details of any discounts
+PSN_JSON_ELEM_GAME_REWARDS = 'rewards'
+# Element - The discount on the game for non-PSPlus members
+PSN_JSON_ELEM_GAME_BASE_DISCOUNT = 'discount'
+# Element - The price of the game after applying discount for non-PSPlus members
+PSN_JSON_ELEM_GAME_BASE_PRICE = 'price'
+# Element - The discount on the game for PSPlus members
+PSN_JSON_ELEM_GAME_BONUS_DISCOUNT = 'bonus_discount'
+# Element - The price of the game after applying discount for PSPlus members
+PSN_JSON_ELEM_GAME_BONUS_PRICE = 'bonus_price'
+
+# Parent Element - Block that contains all rating info
+PSN_JSON_ELEM_GAME_RATING_BLOCK = 'star_rating'
+# Element - The rating for this game
+PSN_JSON_ELEM_GAME_RATING_VALUE = 'score'
+# Element - The number of rating votes this game has recieved
+PSN_JSON_ELEM_GAME_RATING_COUNT = 'total'
+
+# Element - The age limit of this game
+PSN_JSON_ELEM_GAME_AGERATING = 'age_limit'
+
+# Parent Element - Block that contains list of content descriptors
+PSN_JSON_ELEM_EACH_GAME_CONTENT = 'content_descriptors'
+# Element - Name of content e.g. Language
+PSN_JSON_ELEM_GAME_CONTENT_NAME = 'name'
+# Element - Description of content e.g. Language
+PSN_JSON_ELEM_GAME_CONTENT_DESCR = 'description'
+
+def loads(json_bytes):
+    """
+    Decode a JSON document returned by the PSN Store.
+
+    Uses orjson when it is installed, else the stdlib json module. Either way the whole document is decoded,
+    as only the decoder differs; the game records are then built from the decoded document (see GameSnapshot).
+
+    Args:
+        json_bytes: The raw bytes (or str) of the JSON document.
+    Returns:
+        JSON: The decoded JSON.
+    """
+    if orjson != None:
+        return orjson.loads(json_bytes)
+    return json.loads(json_bytes)
@@ -0,0 +1,90 @@
+import queue
+import threading
+from .psn_profiling import profile_thread_target
+
+# Seconds a stage waits on a full (or empty) queue before checking if the pipeline has been closed.
+PIPELINE_POLL_INTERVAL = 0.5
+# Seconds a pipeline closed early waits for a stage to stop, before leaving its (daemon) thread to stop in the background
+# e.g. once a chunk of games being fetched from the PSN store arrives.
+PIPELINE_CLOSE_TIMEOUT = 5.0
+
+class _StageEnd:
+    """
+    Marks the end of the items of a stage, with the exception that ended it, if any.
+    """
+    def __init__(self, exception=None):
+        self.exception = exception
+
+def bounded_stage(items, queue_size):
+    """
+    Run a stage of a pipeline in a thread, passing its items on through a bounded queue.
+
+    The stage blocks whenever the queue is full, until the next stage catches up, so at most queue_size
+    items are held between the two stages however many items there are. The stage runs ahead of the next
+    one by up to that many items e.g. fetching games from the PSN store while earlier games are written.
+    Only use for stages that don't touch the DB, as DB connections belong to the thread that opened them.
+    If the next stage fails, its exception is raised without waiting for more than a few seconds for the stage
+    to stop, even while the stage is stuck in a long running item.
+
+    Args:
+        items: Iterable of the items of the stage, iterated in the thread.
+        queue_size: The maximum number of items held in the queue.
+    Yields:
+        The items of the stage, in order. An exception raised by the stage is raised here.
+    """
+    item_queue = queue.Queue(maxsize=queue_size)
+    closed = threading.Event()
+
+    def put(item):
+        while not closed.is_set():
+            try:
+                item_queue.put(item, timeout=PIPELINE_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for item in items:
+                if not put(item):
+                    return
+        except Exception as e:
+            put(_StageEnd(e))
+        else:
+            put(_StageEnd())
+
+    # The stage is profiled with the task that runs the pipeline, if it is being profiled
+    producer = threading.Thread(target=profile_thread_target(produce), daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = item_queue.get()
+            if isinstance(item, _StageEnd):
+                if item.exception != None:
+                    raise item.exception
+                return
+            yield item
+    finally:
+        # Stop the stage if the pipeline is closed early
+        closed.set()
+        producer.join(PIPELINE_CLOSE_TIMEOUT)
+
+def batched(items, batch_size):
+    """
+    Group the items of a stage into batches, for stages that process items in bulk e.g. DB writes.
+
+    Args:
+        items: Iterable of the items of the stage.
+        batch_size: The maximum number of items in a batch.
+    Yields:
+        list: Each batch of items, in order.
+    """
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
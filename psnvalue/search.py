@@ -0,0 +1,58 @@
+import re
+import sys
+from django.db import connections
+from django.db.models import Case, When, Value, IntegerField
+
+# Symbols stripped from game names before searching e.g. 'DARK SOULS™ III'.
+GAME_NAME_SYMBOLS = re.compile('[™®©]')
+# Runs of whitespace, collapsed to a single space before searching.
+GAME_NAME_WHITESPACE = re.compile(r'\s+')
+# The normalized game name field, which is indexed for searching.
+GAME_NAME_NORMALIZED_FIELD_NAME = 'game_name_normalized'
+# The annotation holding how well each game matches the search text.
+GAME_MATCH_RANK = 'match_rank'
+# Appended to the search text for the upper bound of a prefix match, as it sorts after any other character.
+GAME_NAME_PREFIX_END = chr(sys.maxunicode)
+# The default secondary ordering of search results.
+GAME_SEARCH_ORDER_BY = '-plus_value_score'
+
+def normalize_game_name(game_name):
+    """
+    Normalize a game name, or search text, for searching.
+
+    Trademark symbols are stripped, case is folded and whitespace is collapsed.
+
+    Args:
+        game_name: The game name or search text.
+    Returns:
+        string: The normalized game name.
+    """
+    return GAME_NAME_WHITESPACE.sub(' ', GAME_NAME_SYMBOLS.sub('', game_name)).strip().casefold()
+
+def search_games(games, search_text, order_by=GAME_SEARCH_ORDER_BY):
+    """
+    Search a QuerySet of games by name, ranked by match quality and then PS Plus value score (or another ordering).
+
+    On PostgreSQL games are matched anywhere in the name, using the trigram index on the normalized
+    name, and ranked by trigram similarity. Other databases fall back to a prefix match on the
+    normalized name index, ranking exact matches first. The prefix match is a range, as startswith is
+    a LIKE with an ESCAPE clause on SQLite, which can't use the index.
+
+    Args:
+        games: The QuerySet of games to search.
+        search_text: The text to search for.
+        order_by: The ordering of games that match equally well e.g. by the scores of a shadow scoring model.
+    Returns:
+        QuerySet: The matching games, best match first.
+    """
+    normalized_text = normalize_game_name(search_text)
+
+    if connections[games.db].vendor == 'postgresql':
+        from django.contrib.postgres.search import TrigramSimilarity
+        games = games.filter(game_name_normalized__contains=normalized_text)
+        games = games.annotate(match_rank=TrigramSimilarity(GAME_NAME_NORMALIZED_FIELD_NAME, normalized_text))
+    else:
+        games = games.filter(game_name_normalized__gte=normalized_text, game_name_normalized__lt=normalized_text + GAME_NAME_PREFIX_END)
+        games = games.annotate(match_rank=Case(When(game_name_normalized=normalized_text, then=Value(1)), default=Value(0), output_field=IntegerField()))
+
+    return games.order_by('-' + GAME_MATCH_RANK, order_by)
@@ -1,42 +1,163 @@
+from celery import chord
 from celery.decorators import task
+from celery.signals import worker_ready
 from celery.utils.log import get_task_logger
 
 from .psn_library import PSNLibrary
+from .psn_profiling import PSNTaskProfiler
+from .psn_cache_priming import PSNCachePrimer
 
 logger = get_task_logger(__name__)
 
+@task(name="task_sync_all_psn_libraries_with_psn_store")
+def task_sync_all_psn_libraries_with_psn_store(p_profile=False):
+    """
+    Celery task for syncing every local PSN library with the PSN store.
+
+    A sync task is scheduled for each library, so that libraries are synced concurrently across
+    workers, and the sync run is finished once every library sync has finished.
+    If p_profile is set, each library sync is profiled and its profile kept with the sync run.
+
+    Can be scheduled to run or called directly.
+    """
+    psn_library = PSNLibrary()
+    sync_run = psn_library.start_sync_run()
+    logger.info("Started sync run %s of all PSN libraries.", sync_run.pk)
+    library_syncs = [task_sync_psn_library_with_psn_store.si(sync_run_library.library_fk_id, sync_run.pk, p_profile) for sync_run_library in sync_run.syncrunlibrary_set.all()]
+    chord(library_syncs)(task_finish_sync_run.si(sync_run.pk))
+
+@task(name="task_finish_sync_run")
+def task_finish_sync_run(p_sync_run_id):
+    """
+    Celery task for finishing a sync run, once every library sync in the run has finished.
+    """
+    psn_library = PSNLibrary()
+    psn_library.finish_sync_run(p_sync_run_id)
+    logger.info("Finished sync run %s of all PSN libraries.", p_sync_run_id)
+    task_prime_psn_caches.delay()
+
 @task(name="task_sync_psn_library_with_psn_store")
-def task_sync_psn_library_with_psn_store(p_library_id):
+def task_sync_psn_library_with_psn_store(p_library_id, p_sync_run_id=None, p_profile=False):
     """
     Celery task for syncing the local PSN library with the PSN store.
 
-    Can be scheduled to run or called directly.
+    Can be scheduled to run or called directly. If p_profile is set, the sync is profiled (see psn_profiling).
     """
     psn_library = PSNLibrary()
     logger.info("Started syncing the PSN library with the PSN store.")
-    psn_library.sync_library_with_store(p_library_id)
+    PSNTaskProfiler().run(p_profile, "task_sync_psn_library_with_psn_store", psn_library.sync_library_with_store, p_library_id, p_sync_run_id, library_id=p_library_id, sync_run_id=p_sync_run_id)
     logger.info("Finished syncing the PSN library with the PSN store.")
+    # The caches are primed once the whole sync run has finished
+    if p_sync_run_id == None:
+        task_prime_psn_caches.delay([p_library_id])
 
 @task(name="task_update_psn_weighted_ratings")
-def task_update_psn_weighted_ratings(p_library_id):
+def task_update_psn_weighted_ratings(p_library_id, p_profile=False):
     """
     Celery task for updating the weighted rating for each game in the library.
 
-    Can be scheduled to run or called directly.
+    Can be scheduled to run or called directly. If p_profile is set, the update is profiled (see psn_profiling).
     """
     psn_library = PSNLibrary()
     logger.info("Started applying weighting to the PSN library.")
-    psn_library.update_weighted_ratings(p_library_id)
+    PSNTaskProfiler().run(p_profile, "task_update_psn_weighted_ratings", psn_library.update_weighted_ratings, p_library_id, library_id=p_library_id)
     logger.info("Finished applying weighting to the PSN library.")
+    task_prime_psn_caches.delay([p_library_id])
+
+@task(name="task_rescore_psn_library_in_db")
+def task_rescore_psn_library_in_db(p_library_id):
+    """
+    Celery task for updating the weighted rating and value of each game in the library, inside the DB.
+
+    Can be scheduled to run or called directly.
+    """
+    psn_library = PSNLibrary()
+    logger.info("Started rescoring the PSN library in the DB.")
+    psn_library.rescore_library_in_db(p_library_id)
+    logger.info("Finished rescoring the PSN library in the DB.")
+    task_prime_psn_caches.delay([p_library_id])
+
+@task(name="task_shadow_score_psn_library")
+def task_shadow_score_psn_library(p_library_id, p_model_versions=None):
+    """
+    Celery task for scoring each game in the library with shadow versions of the scoring model.
+
+    Can be scheduled to run or called directly.
+    """
+    psn_library = PSNLibrary()
+    logger.info("Started shadow scoring the PSN library.")
+    psn_library.shadow_score_library(p_library_id, p_model_versions)
+    logger.info("Finished shadow scoring the PSN library.")
 
 @task(name="task_update_psn_game_thumbnails")
-def task_update_psn_game_thumbnails(p_library_id):
+def task_update_psn_game_thumbnails(p_library_id, p_profile=False):
     """
     Celery task for updating the stored game thumbnails.
 
-    Can be scheduled to run or called directly.
+    Can be scheduled to run or called directly. If p_profile is set, the update is profiled (see psn_profiling).
     """
     psn_library = PSNLibrary()
     logger.info("Started update of the thumbnails in the PSN library.")
-    psn_library.upload_thumbnails_to_cloudinary(p_library_id)
+    PSNTaskProfiler().run(p_profile, "task_update_psn_game_thumbnails", psn_library.upload_thumbnails_to_cloudinary, p_library_id, library_id=p_library_id)
     logger.info("Finished update of the thumbnails in the PSN library.")
+
+@task(name="task_refresh_all_overdue_psn_games")
+def task_refresh_all_overdue_psn_games(p_game_count):
+    """
+    Celery task for refreshing the games in every library that are most overdue a refresh.
+
+    A refresh task is scheduled for each library, so that libraries are refreshed concurrently across
+    workers, and the caches of the libraries with changed games are primed once every refresh has finished.
+    Scheduled by celery beat (see CELERYBEAT_SCHEDULE in settings).
+    """
+    psn_library = PSNLibrary()
+    library_ids = psn_library.get_library_ids()
+    if library_ids:
+        library_refreshes = [task_refresh_overdue_psn_games.si(library_id, p_game_count, False) for library_id in library_ids]
+        chord(library_refreshes)(task_prime_refreshed_psn_caches.s(library_ids))
+
+@task(name="task_refresh_overdue_psn_games")
+def task_refresh_overdue_psn_games(p_library_id, p_game_count, p_prime_caches=True):
+    """
+    Celery task for refreshing the games in the library that are most overdue a refresh.
+
+    Scheduled frequently for every library (see task_refresh_all_overdue_psn_games), with the game
+    count sized to the PSN store request budget. Returns the count of refreshed games that changed.
+    If p_prime_caches is set, the library's caches are primed if any game changed.
+    """
+    psn_library = PSNLibrary()
+    logger.info("Started refreshing overdue games in the PSN library.")
+    changed_game_count = psn_library.refresh_overdue_games(p_library_id, p_game_count)
+    logger.info("Finished refreshing overdue games in the PSN library, %s of which changed.", changed_game_count)
+    if p_prime_caches and changed_game_count > 0:
+        task_prime_psn_caches.delay([p_library_id])
+    return changed_game_count
+
+@task(name="task_prime_refreshed_psn_caches")
+def task_prime_refreshed_psn_caches(p_changed_game_counts, p_library_ids):
+    """
+    Celery task for priming the page cache of the libraries with changed games, once every library refresh has finished.
+
+    The changed game counts are the results of the library refreshes, in the order of the library IDs.
+    """
+    changed_library_ids = [library_id for library_id, changed_game_count in zip(p_library_ids, p_changed_game_counts) if changed_game_count > 0]
+    if changed_library_ids:
+        task_prime_psn_caches.delay(changed_library_ids)
+
+@task(name="task_prime_psn_caches")
+def task_prime_psn_caches(p_library_ids=None):
+    """
+    Celery task for priming the page cache with the index page and the first pages of each library's game list.
+
+    Runs after each sync, refresh of overdue games that changed games and rescore, and when a worker starts (e.g. after a deploy).
+    """
+    logger.info("Started priming the page cache.")
+    page_count = PSNCachePrimer().prime(p_library_ids)
+    logger.info("Finished priming the page cache with %s pages.", page_count)
+
+@worker_ready.connect
+def prime_psn_caches_on_worker_ready(sender=None, **kwargs):
+    """
+    Prime the page cache when a worker starts, so the first visitors after a deploy don't pay for a cold cache.
+    """
+    task_prime_psn_caches.delay()
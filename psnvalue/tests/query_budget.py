@@ -0,0 +1,67 @@
+import re
+from collections import Counter
+from contextlib import contextmanager
+from django.db import connections, DEFAULT_DB_ALIAS
+from django.test.utils import CaptureQueriesContext
+
+# Queries slower than this (seconds) fail a query budget. Generous, as the test DB is small.
+QUERY_BUDGET_MAX_QUERY_SECONDS = 0.5
+# Literal values in SQL, replaced so that queries differing only in their parameters are grouped together.
+QUERY_LITERAL_PATTERN = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?(?:e[+-]?\d+)?\b")
+# Savepoint names, which are unique to each savepoint.
+QUERY_SAVEPOINT_PATTERN = re.compile(r'"s\d+_x\d+"')
+# Lists of literal values in SQL e.g. IN (...), collapsed so that queries differing only in their length are grouped together.
+QUERY_LITERAL_LIST_PATTERN = re.compile(r"\((?:\s*\?\s*,)+\s*\?\s*\)")
+# The page cache, kept in memory for view tests so that query counts only include the views' own queries.
+PAGE_CACHE_TEST_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+def normalize_query(sql):
+    """
+    Normalize a query for grouping, by replacing its literal values with placeholders.
+    """
+    sql = QUERY_SAVEPOINT_PATTERN.sub('?', sql)
+    sql = QUERY_LITERAL_PATTERN.sub('?', sql)
+    sql = QUERY_LITERAL_LIST_PATTERN.sub('(...)', sql)
+    return sql.replace('%s', '?')
+
+def format_query_report(summary, queries):
+    """
+    Format the queries executed by an operation that went over its query budget.
+
+    Repeated queries are grouped first, since a query repeated once per item is the usual cause (N+1).
+
+    Args:
+        summary: How the operation went over its budget.
+        queries: The captured queries, as in connection.queries.
+    Returns:
+        str: The report.
+    """
+    lines = [summary, "", "Queries by count:"]
+    for sql, count in Counter(normalize_query(query['sql']) for query in queries).most_common():
+        lines.append("  %4d x %s" % (count, sql))
+    lines += ["", "Queries in order:"]
+    for index, query in enumerate(queries, 1):
+        lines.append("  %4d. [%ss] %s" % (index, query['time'], query['sql']))
+    return "\n".join(lines)
+
+class QueryBudgetMixin:
+    """
+    TestCase mixin to fix the query budget of an operation, so that N+1 query regressions fail the tests.
+    """
+    # The views read through the test replica, which shares the default database's connection.
+    multi_db = True
+
+    @contextmanager
+    def assertMaxQueries(self, max_count, max_query_seconds=QUERY_BUDGET_MAX_QUERY_SECONDS, using=DEFAULT_DB_ALIAS):
+        """
+        Fail if the block executes more than max_count queries, or any query slower than max_query_seconds,
+        reporting the queries executed.
+        """
+        with CaptureQueriesContext(connections[using]) as context:
+            yield context
+        queries = context.captured_queries
+        if len(queries) > max_count:
+            self.fail(format_query_report("%d queries executed, over the budget of %d (+%d)." % (len(queries), max_count, len(queries) - max_count), queries))
+        slow_queries = [query for query in queries if float(query['time']) > max_query_seconds]
+        if slow_queries:
+            self.fail(format_query_report("%d queries took longer than %ss." % (len(slow_queries), max_query_seconds), slow_queries))
@@ -0,0 +1,18 @@
+from django.db import connections
+from django.test.runner import DiscoverRunner
+
+class MirrorTestRunner(DiscoverRunner):
+    """
+    Test runner sharing each mirrored database's connection with its mirrors, such as the read replica.
+
+    A mirror would otherwise have a connection of its own, which doesn't see the data written in a test's
+    transaction on the database it mirrors.
+    """
+
+    def setup_databases(self, **kwargs):
+        old_config = super(MirrorTestRunner, self).setup_databases(**kwargs)
+        for alias in connections:
+            mirror_alias = connections[alias].settings_dict['TEST']['MIRROR']
+            if mirror_alias != None:
+                connections[alias] = connections[mirror_alias]
+        return old_config
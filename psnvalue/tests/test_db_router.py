@@ -0,0 +1,68 @@
+from unittest import mock
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.http import HttpResponse
+from django.test import SimpleTestCase, RequestFactory
+from django.views import generic
+from ..models import GameList
+from ..db_router import ReplicaRouter, read_from_replica, replica_reads_enabled, REPLICA_DATABASE, PRIMARY_DATABASE
+from ..middleware import ReadReplicaMiddleware
+
+# Stand-in read replica, mirroring the default database.
+TEST_REPLICA_DATABASES = {REPLICA_DATABASE: dict(settings.DATABASES[PRIMARY_DATABASE], TEST={'MIRROR': PRIMARY_DATABASE})}
+
+class ReplicaReadView(generic.View):
+    read_from_replica = True
+
+    def get(self, request):
+        return HttpResponse(str(replica_reads_enabled()))
+
+    def post(self, request):
+        return HttpResponse(str(replica_reads_enabled()))
+
+class PrimaryReadView(generic.View):
+
+    def get(self, request):
+        return HttpResponse(str(replica_reads_enabled()))
+
+class ReplicaRouterTestCase(SimpleTestCase):
+
+    def test_reads_from_replica(self):
+        router = ReplicaRouter()
+
+        with mock.patch.dict(settings.DATABASES, TEST_REPLICA_DATABASES):
+            self.assertEqual(router.db_for_read(GameList), PRIMARY_DATABASE)
+            with read_from_replica():
+                self.assertEqual(router.db_for_read(GameList), REPLICA_DATABASE)
+                self.assertEqual(router.db_for_write(GameList), PRIMARY_DATABASE)
+            self.assertEqual(router.db_for_read(GameList), PRIMARY_DATABASE)
+        self.assertFalse(router.allow_migrate(REPLICA_DATABASE, 'psnvalue'))
+
+    def test_reads_from_primary_without_replica(self):
+        router = ReplicaRouter()
+
+        with mock.patch.dict(settings.DATABASES, {PRIMARY_DATABASE: settings.DATABASES[PRIMARY_DATABASE]}, clear=True):
+            with read_from_replica():
+                self.assertEqual(router.db_for_read(GameList), PRIMARY_DATABASE)
+
+    def test_reads_sessions_from_primary(self):
+        router = ReplicaRouter()
+
+        with mock.patch.dict(settings.DATABASES, TEST_REPLICA_DATABASES), read_from_replica():
+            self.assertEqual(router.db_for_read(Session), PRIMARY_DATABASE)
+            self.assertEqual(router.db_for_read(User), PRIMARY_DATABASE)
+
+    def test_middleware(self):
+        request_factory = RequestFactory()
+
+        with mock.patch.dict(settings.DATABASES, TEST_REPLICA_DATABASES):
+            for view_class, request, expected_content in [
+                    (ReplicaReadView, request_factory.get('/'), b'True'),
+                    (ReplicaReadView, request_factory.post('/'), b'False'),
+                    (PrimaryReadView, request_factory.get('/'), b'False')]:
+                view = view_class.as_view()
+                middleware = ReadReplicaMiddleware(lambda request: middleware.process_view(request, view, (), {}) or view(request))
+                self.assertEqual(middleware(request).content, expected_content)
+                # Reads go back to the primary once the response is complete.
+                self.assertFalse(replica_reads_enabled())
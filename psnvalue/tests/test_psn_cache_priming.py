@@ -0,0 +1,73 @@
+from unittest import mock
+from django.test import TestCase, override_settings
+from django.core.cache import cache
+from django.urls import reverse
+from ..models import Library, GameList
+from ..psn_cache_priming import PSNCachePrimer, get_page_cache_key, PAGE_CACHE_DEFAULT_TIMEOUT
+from ..views import GameListView
+from .query_budget import PAGE_CACHE_TEST_CACHES
+
+@override_settings(CACHES=PAGE_CACHE_TEST_CACHES, PSN_CACHE_PRIME_PAGES=2)
+class PSNCachePrimerTestCase(TestCase):
+    # The primed views read through the test replica.
+    multi_db = True
+
+    TEST_URL = "test_url"
+
+    def setUp(self):
+        cache.clear()
+        self.TEST_LIBRARY = Library.objects.create(library_name="test_lib", library_url=self.TEST_URL)
+        GameList.objects.create(game_id="valuable", game_name="Valuable Game", json_url=self.TEST_URL, age_rating=18, library_fk=self.TEST_LIBRARY, price=6999, plus_price=6999, rating_count=100, plus_value_score=300)
+
+    def test_get_prime_paths(self):
+        gamelist_path = reverse('psnvalue:gamelist', args=[self.TEST_LIBRARY.id])
+        self.assertEqual(PSNCachePrimer().get_prime_paths(), [(reverse('psnvalue:index'), None), (gamelist_path, 1), (gamelist_path, 2)])
+
+    def test_prime(self):
+        psn_cache_primer = PSNCachePrimer()
+        with mock.patch.object(psn_cache_primer, 'prime_page_in_thread', return_value=True) as prime_page_mock:
+            self.assertEqual(psn_cache_primer.prime([self.TEST_LIBRARY.id]), 3)
+        self.assertEqual(prime_page_mock.call_count, 3)
+
+    def test_prime_page(self):
+        gamelist_path = reverse('psnvalue:gamelist', args=[self.TEST_LIBRARY.id])
+        self.assertTrue(PSNCachePrimer().prime_page(gamelist_path, 1))
+        # A page past the end of the game list isn't cached.
+        self.assertFalse(PSNCachePrimer().prime_page(gamelist_path, 2))
+
+        # The primed page is served from the cache, without querying the DB.
+        with self.assertNumQueries(0):
+            response = self.client.get(gamelist_path)
+        self.assertContains(response, "Valuable Game")
+
+        # Sorted and filtered pages are rendered as usual.
+        response = self.client.get(gamelist_path, {'sort': 'base_value'})
+        self.assertEqual(response.context['current_sort'], 'base_value')
+
+    def test_prime_page_replaces_cached_page(self):
+        gamelist_path = reverse('psnvalue:gamelist', args=[self.TEST_LIBRARY.id])
+        self.client.get(gamelist_path)
+        GameList.objects.filter(game_id="valuable").update(game_name="Rescored Game")
+        PSNCachePrimer().prime_page(gamelist_path, 1)
+        self.assertContains(self.client.get(gamelist_path), "Rescored Game")
+
+    def test_prime_page_deletes_missing_page(self):
+        gamelist_path = reverse('psnvalue:gamelist', args=[self.TEST_LIBRARY.id])
+        second_page_cache_key = get_page_cache_key('gamelist', str(self.TEST_LIBRARY.id), '2')
+        GameList.objects.create(game_id="cheap", game_name="Cheap Game", json_url=self.TEST_URL, age_rating=12, library_fk=self.TEST_LIBRARY, price=999, plus_price=999, rating_count=100, plus_value_score=200)
+        with mock.patch.object(GameListView, 'paginate_by', 1):
+            self.assertTrue(PSNCachePrimer().prime_page(gamelist_path, 2))
+            self.assertNotEqual(cache.get(second_page_cache_key), None)
+
+            # The library shrinks to a single page, so its primed second page is no longer served from the cache.
+            GameList.objects.filter(game_id="cheap").delete()
+            self.assertFalse(PSNCachePrimer().prime_page(gamelist_path, 2))
+        self.assertEqual(cache.get(second_page_cache_key), None)
+
+    def test_primed_pages_do_not_expire(self):
+        gamelist_path = reverse('psnvalue:gamelist', args=[self.TEST_LIBRARY.id])
+        with mock.patch.object(cache, 'set') as set_mock:
+            PSNCachePrimer().prime_page(gamelist_path, 1)
+            self.client.get(reverse('psnvalue:index'))
+        # Primed pages are kept until they are primed again, pages rendered for visitors until they time out.
+        self.assertEqual([call[0][2] for call in set_mock.call_args_list], [None, PAGE_CACHE_DEFAULT_TIMEOUT])
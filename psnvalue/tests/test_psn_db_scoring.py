@@ -0,0 +1,51 @@
+import os
+import json
+from django.test import TestCase
+from ..models import Library, GameList
+from ..psn_library import PSNLibrary, PSN_GAME_SCORE_FIELDS
+from ..psn_game_snapshot import GameSnapshot
+
+class PSNDBScoringTestCase(TestCase):
+
+    TEST_LIBRARY_STDEV = 0.81955041074842
+    TEST_LIBRARY_MEAN = 4.02023510971787
+    # A library mean between the fixture ratings, so that both sides of the mean are scored.
+    TEST_LIBRARY_HIGH_MEAN = 4.7
+    TEST_HALF_WAY_RATING = 4.125
+    TEST_URL = "test_url"
+    TEST_FILENAMES = ['test_data/DarkSoulsIII_FullGame.json', 'test_data/DragonAgeInquisition_FullGame.json']
+
+    def setUp(self):
+        self.game_snapshots = []
+        for filename in self.TEST_FILENAMES:
+            with open(os.path.join(os.path.dirname(__file__), filename)) as data_file:
+                self.game_snapshots.append(GameSnapshot.from_json(json.load(data_file)))
+
+        # Free, unrated and at the mean rating, to cover the default branches of the formulas.
+        self.game_snapshots.append(self.game_snapshots[0]._replace(game_id="free", price=0, base_price=0, plus_price=0, rating_count=0))
+        self.game_snapshots.append(self.game_snapshots[1]._replace(game_id="mean", rating=self.TEST_LIBRARY_HIGH_MEAN))
+        # Exactly half way between two roundings of the weighted rating, when the library has no deviation.
+        self.game_snapshots.append(self.game_snapshots[1]._replace(game_id="half", rating=self.TEST_HALF_WAY_RATING))
+
+    def assert_db_scores_match_python(self, library_mean, library_stdev=TEST_LIBRARY_STDEV):
+        psn_library = PSNLibrary()
+        library = Library.objects.create(library_name="test_lib", library_url=self.TEST_URL, library_rating_stdev=library_stdev, library_rating_mean=library_mean)
+        for game_snapshot in self.game_snapshots:
+            game = GameList.objects.create(game_id=game_snapshot.game_id, game_name=game_snapshot.game_name, json_url=self.TEST_URL, library_fk=library)
+            psn_library.update_game(library, game_snapshot, game)
+        python_scores = list(GameList.objects.filter(library_fk=library).order_by('pk').values_list(*PSN_GAME_SCORE_FIELDS))
+
+        GameList.objects.filter(library_fk=library).update(weighted_rating=0.0, base_value_score=0, plus_value_score=0)
+        psn_library.rescore_library_in_db(library.pk)
+        db_scores = list(GameList.objects.filter(library_fk=library).order_by('pk').values_list(*PSN_GAME_SCORE_FIELDS))
+
+        self.assertEqual(db_scores, python_scores)
+
+    def test_db_scores_match_python(self):
+        self.assert_db_scores_match_python(self.TEST_LIBRARY_MEAN)
+
+    def test_db_scores_match_python_below_mean(self):
+        self.assert_db_scores_match_python(self.TEST_LIBRARY_HIGH_MEAN)
+
+    def test_db_scores_match_python_without_deviation(self):
+        self.assert_db_scores_match_python(self.TEST_LIBRARY_MEAN, 0.0)
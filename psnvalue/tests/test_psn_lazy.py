@@ -0,0 +1,48 @@
+import sys
+import importlib
+from unittest import mock
+from django.contrib import admin
+from django.test import SimpleTestCase
+import psnvalue
+from ..psn_lazy import LazyClient
+from ..psn_library import PSNLibrary
+from ..management.commands.psn_import_benchmark import IMPORT_BENCHMARK_PATHS, IMPORT_BENCHMARK_SYNC_ONLY_MODULES
+
+# Modules of the app loaded by django.setup(), which are kept when the web modules are imported afresh.
+WEB_BOOT_MODULES = ['psnvalue.apps', 'psnvalue.models']
+
+class LazyClientOwner:
+    client = LazyClient('collections.OrderedDict')
+
+class PSNLazyTestCase(SimpleTestCase):
+
+    def test_lazy_client(self):
+        self.assertIsNone(LazyClientOwner.__dict__['client'].client)
+        # The client is built on first use, and shared by every instance.
+        self.assertIs(LazyClientOwner().client, LazyClientOwner().client)
+        owner = LazyClientOwner()
+        owner.client = 'replaced'
+        self.assertEqual(owner.client, 'replaced')
+        self.assertIsNot(LazyClientOwner().client, 'replaced')
+
+    def test_lazy_client_patched(self):
+        with mock.patch.object(PSNLibrary, 'psn_store_api') as psn_store_api_mock:
+            self.assertIs(PSNLibrary().psn_store_api, psn_store_api_mock)
+        self.assertIsInstance(PSNLibrary.__dict__['psn_store_api'], LazyClient)
+
+    def test_web_imports(self):
+        # The web modules are imported afresh, with the sync-only modules unimportable (None in sys.modules).
+        # Everything is restored afterwards, including the admin models registered by psnvalue.admin.
+        with mock.patch.dict(sys.modules), mock.patch.dict(psnvalue.__dict__), mock.patch.dict(admin.site._registry, clear=True):
+            for module_name in list(sys.modules):
+                if module_name.startswith('psnvalue.') and module_name not in WEB_BOOT_MODULES:
+                    del sys.modules[module_name]
+            for module_name in IMPORT_BENCHMARK_SYNC_ONLY_MODULES:
+                sys.modules[module_name] = None
+
+            # The web workers boot without importing the sync path.
+            for module_path in IMPORT_BENCHMARK_PATHS['web']:
+                try:
+                    importlib.import_module(module_path)
+                except ImportError as e:
+                    self.fail("%s imports a sync-only module: %s" % (module_path, e))
@@ -1,11 +1,18 @@
 import os
 import json
 import datetime
+import redis
+from statistics import mean, pstdev
+from unittest import mock
 from django.test import TestCase
+from django.db.models.query import QuerySet
 from django.utils import timezone
-from ..models import Library, GameList
+from ..models import Library, GameTitle, GameList, GameScore, ContentDescriptors, SYNC_STATUS_FINISHED, SYNC_STATUS_FAILED
 from ..psn_library import PSNLibrary
 from ..psn_library_dao import PSNLibraryDAO
+from ..psn_game_snapshot import GameSnapshot, get_title_key
+from ..psn_scoring import SCORING_MODELS, ScoringModelV1
+from ..psn_refresh_scheduler import REFRESH_INTERVAL_HOURLY, REFRESH_INTERVAL_DAILY
 
 # Create your tests here.
 class PSNLibraryTestCase(TestCase):
@@ -19,7 +26,7 @@ class PSNLibraryTestCase(TestCase):
 
     DARK_SOULS_III_FILENAME = 'test_data/DarkSoulsIII_FullGame.json'
     DARK_SOULS_III_GAME = None
-    DARK_SOULS_III_DETAILED_GAME_JSON = None
+    DARK_SOULS_III_GAME_SNAPSHOT = None
     DARK_SOULS_III_ID = "EP0700-CUSA03365_00-DARKSOULS3000000"
     DARK_SOULS_III_NAME = "DARK SOULS™ III"
     DARK_SOULS_III_AGE_RATING = 16
@@ -32,7 +39,7 @@ class PSNLibraryTestCase(TestCase):
 
     DRAGON_AGE_INQUISITION_FILENAME = 'test_data/DragonAgeInquisition_FullGame.json'
     DRAGON_AGE_INQUISITION_GAME = None
-    DRAGON_AGE_INQUISITION_DETAILED_GAME_JSON = None
+    DRAGON_AGE_INQUISITION_GAME_SNAPSHOT = None
     DRAGON_AGE_INQUISITION_ID = "EP0006-CUSA00503_00-DAINQUISITION000"
     DRAGON_AGE_INQUISITION_NAME = "Dragon Age™: Inquisition"
     DRAGON_AGE_INQUISITION_AGE_RATING = 18
@@ -49,23 +56,25 @@ class PSNLibraryTestCase(TestCase):
 
     def setUp(self):
         self.TEST_LIBRARY = Library.objects.create(library_name=self.TEST_LIBRARY_NAME, library_url=self.TEST_URL, library_rating_stdev=self.TEST_LIBRARY_STDEV, library_rating_mean=self.TEST_LIBRARY_MEAN)
-        self.DARK_SOULS_III_GAME = GameList.objects.create(game_id=self.DARK_SOULS_III_ID, game_name=self.DARK_SOULS_III_NAME, json_url=self.TEST_URL, image_url=self.TEST_URL, image_datastore_url=self.TEST_URL, age_rating=self.DARK_SOULS_III_AGE_RATING, library_fk=self.TEST_LIBRARY)
-        self.DRAGON_AGE_INQUISITION_GAME = GameList.objects.create(game_id=self.DRAGON_AGE_INQUISITION_ID, game_name=self.DRAGON_AGE_INQUISITION_NAME, json_url=self.TEST_URL, image_url=self.TEST_URL, image_datastore_url=self.TEST_URL, age_rating=self.DRAGON_AGE_INQUISITION_AGE_RATING, library_fk=self.TEST_LIBRARY)
+        dark_souls_III_title = GameTitle.objects.create(title_key=get_title_key(self.DARK_SOULS_III_ID, None), title_name=self.DARK_SOULS_III_NAME, age_rating=self.DARK_SOULS_III_AGE_RATING, image_url=self.TEST_URL, image_datastore_url=self.TEST_URL)
+        dragon_age_inquisition_title = GameTitle.objects.create(title_key=get_title_key(self.DRAGON_AGE_INQUISITION_ID, None), title_name=self.DRAGON_AGE_INQUISITION_NAME, age_rating=self.DRAGON_AGE_INQUISITION_AGE_RATING, image_url=self.TEST_URL, image_datastore_url=self.TEST_URL)
+        self.DARK_SOULS_III_GAME = GameList.objects.create(game_id=self.DARK_SOULS_III_ID, game_name=self.DARK_SOULS_III_NAME, json_url=self.TEST_URL, age_rating=self.DARK_SOULS_III_AGE_RATING, title_fk=dark_souls_III_title, library_fk=self.TEST_LIBRARY)
+        self.DRAGON_AGE_INQUISITION_GAME = GameList.objects.create(game_id=self.DRAGON_AGE_INQUISITION_ID, game_name=self.DRAGON_AGE_INQUISITION_NAME, json_url=self.TEST_URL, age_rating=self.DRAGON_AGE_INQUISITION_AGE_RATING, title_fk=dragon_age_inquisition_title, library_fk=self.TEST_LIBRARY)
 
         dark_souls_III_file = os.path.join(os.path.dirname(__file__), self.DARK_SOULS_III_FILENAME)
         with open(dark_souls_III_file) as data_file:
-            self.DARK_SOULS_III_DETAILED_GAME_JSON = json.load(data_file)
+            self.DARK_SOULS_III_GAME_SNAPSHOT = GameSnapshot.from_json(json.load(data_file))
 
         dragon_age_inquisition_file = os.path.join(os.path.dirname(__file__), self.DRAGON_AGE_INQUISITION_FILENAME)
         with open(dragon_age_inquisition_file) as data_file:
-            self.DRAGON_AGE_INQUISITION_DETAILED_GAME_JSON = json.load(data_file)
+            self.DRAGON_AGE_INQUISITION_GAME_SNAPSHOT = GameSnapshot.from_json(json.load(data_file))
 
     def test_update_game_with_discounts(self):
         psn_library = PSNLibrary()
         psn_library_dao = PSNLibraryDAO()
 
         self.assertTrue(self.DRAGON_AGE_INQUISITION_GAME != None)
-        psn_library.update_game(self.TEST_LIBRARY, self.DRAGON_AGE_INQUISITION_DETAILED_GAME_JSON, self.DRAGON_AGE_INQUISITION_GAME)
+        psn_library.update_game(self.TEST_LIBRARY, self.DRAGON_AGE_INQUISITION_GAME_SNAPSHOT, self.DRAGON_AGE_INQUISITION_GAME)
         game = psn_library_dao.get_game(self.TEST_LIBRARY, self.DRAGON_AGE_INQUISITION_ID)
 
         self.assertTrue(game != None)
@@ -75,8 +84,8 @@ class PSNLibraryTestCase(TestCase):
         self.assertEqual(game.library_fk, self.TEST_LIBRARY)
         self.assertTrue((timezone.now() - game.last_updated) < datetime.timedelta(minutes=self.TEST_TIME_DELTA_MIN))
         self.assertEqual(game.json_url, self.TEST_URL)
-        self.assertEqual(game.image_url, self.TEST_URL)
-        self.assertEqual(game.image_datastore_url, self.TEST_URL)
+        self.assertEqual(game.title_fk.image_url, self.TEST_URL)
+        self.assertEqual(game.title_fk.image_datastore_url, self.TEST_URL)
         self.assertEqual(game.price, self.DRAGON_AGE_INQUISITION_PRICE)
         self.assertEqual(game.base_price, self.DRAGON_AGE_INQUISITION_BASE_PRICE)
         self.assertEqual(game.plus_price, self.DRAGON_AGE_INQUISITION_PLUS_PRICE)
@@ -87,13 +96,14 @@ class PSNLibraryTestCase(TestCase):
         self.assertEqual(game.weighted_rating, self.DRAGON_AGE_INQUISITION_WEIGHTED_RATING)
         self.assertEqual(game.base_value_score, self.DRAGON_AGE_INQUISITION_BASE_VALUE)
         self.assertEqual(game.plus_value_score, self.DRAGON_AGE_INQUISITION_PLUS_VALUE)
+        self.assertEqual(psn_library_dao.get_game_price_history(game).count(), 1)
 
     def test_update_game_without_discounts(self):
         psn_library = PSNLibrary()
         psn_library_dao = PSNLibraryDAO()
 
-        self.assertTrue(self.DARK_SOULS_III_DETAILED_GAME_JSON != None)
-        psn_library.update_game(self.TEST_LIBRARY, self.DARK_SOULS_III_DETAILED_GAME_JSON, self.DARK_SOULS_III_GAME)
+        self.assertTrue(self.DARK_SOULS_III_GAME_SNAPSHOT != None)
+        psn_library.update_game(self.TEST_LIBRARY, self.DARK_SOULS_III_GAME_SNAPSHOT, self.DARK_SOULS_III_GAME)
         game = psn_library_dao.get_game(self.TEST_LIBRARY, self.DARK_SOULS_III_ID)
 
         self.assertTrue(game != None)
@@ -103,8 +113,8 @@ class PSNLibraryTestCase(TestCase):
         self.assertEqual(game.library_fk, self.TEST_LIBRARY)
         self.assertTrue((timezone.now() - game.last_updated) < datetime.timedelta(minutes=self.TEST_TIME_DELTA_MIN))
         self.assertEqual(game.json_url, self.TEST_URL)
-        self.assertEqual(game.image_url, self.TEST_URL)
-        self.assertEqual(game.image_datastore_url, self.TEST_URL)
+        self.assertEqual(game.title_fk.image_url, self.TEST_URL)
+        self.assertEqual(game.title_fk.image_datastore_url, self.TEST_URL)
         self.assertEqual(game.price, self.DARK_SOULS_III_PRICE)
         self.assertEqual(game.base_price, self.DARK_SOULS_III_PRICE)
         self.assertEqual(game.plus_price, self.DARK_SOULS_III_PRICE)
@@ -115,3 +125,421 @@ class PSNLibraryTestCase(TestCase):
         self.assertEqual(game.weighted_rating, self.DARK_SOULS_III_WEIGHTED_RATING)
         self.assertEqual(game.base_value_score, self.DARK_SOULS_III_VALUE)
         self.assertEqual(game.plus_value_score, self.DARK_SOULS_III_VALUE)
+
+    def test_update_game_without_changes(self):
+        psn_library = PSNLibrary()
+        psn_library_dao = PSNLibraryDAO()
+
+        first_update_time = timezone.now()
+        second_update_time = first_update_time + datetime.timedelta(hours=1)
+
+        with mock.patch('django.utils.timezone.now', return_value=first_update_time):
+            psn_library.update_game(self.TEST_LIBRARY, self.DRAGON_AGE_INQUISITION_GAME_SNAPSHOT, self.DRAGON_AGE_INQUISITION_GAME)
+        first_update = psn_library_dao.get_game(self.TEST_LIBRARY, self.DRAGON_AGE_INQUISITION_ID)
+
+        with mock.patch('django.utils.timezone.now', return_value=second_update_time):
+            psn_library.update_game(self.TEST_LIBRARY, self.DRAGON_AGE_INQUISITION_GAME_SNAPSHOT, first_update)
+        game = psn_library_dao.get_game(self.TEST_LIBRARY, self.DRAGON_AGE_INQUISITION_ID)
+
+        # The game was checked again, but not updated as nothing changed.
+        self.assertEqual(game.last_updated, first_update_time)
+        self.assertEqual(game.last_checked, second_update_time)
+        self.assertEqual(game.plus_value_score, self.DRAGON_AGE_INQUISITION_PLUS_VALUE)
+        self.assertEqual(psn_library_dao.get_game_price_history(game).count(), 1)
+
+    def test_update_price_history_rollups(self):
+        psn_library = PSNLibrary()
+        psn_library_dao = PSNLibraryDAO()
+
+        psn_library.update_game(self.TEST_LIBRARY, self.DRAGON_AGE_INQUISITION_GAME_SNAPSHOT, self.DRAGON_AGE_INQUISITION_GAME)
+        psn_library.update_price_history_rollups(self.TEST_LIBRARY, timezone.now() - datetime.timedelta(minutes=self.TEST_TIME_DELTA_MIN))
+        game = psn_library_dao.get_game(self.TEST_LIBRARY, self.DRAGON_AGE_INQUISITION_ID)
+
+        self.assertEqual(game.lowest_base_price, self.DRAGON_AGE_INQUISITION_BASE_PRICE)
+        self.assertEqual(game.lowest_plus_price, self.DRAGON_AGE_INQUISITION_PLUS_PRICE)
+        self.assertTrue(game.at_lowest_price)
+        monthly_history = game.gamepricemonthly_set.get()
+        self.assertEqual(monthly_history.min_plus_price, self.DRAGON_AGE_INQUISITION_PLUS_PRICE)
+        self.assertEqual(monthly_history.change_count, 1)
+
+    def test_free_price_is_lowest_price(self):
+        psn_library = PSNLibrary()
+        psn_library_dao = PSNLibraryDAO()
+        free_game_snapshot = self.DRAGON_AGE_INQUISITION_GAME_SNAPSHOT._replace(price=0, base_price=0, plus_price=0)
+
+        psn_library.update_game(self.TEST_LIBRARY, free_game_snapshot, self.DRAGON_AGE_INQUISITION_GAME)
+        game = psn_library_dao.get_game(self.TEST_LIBRARY, self.DRAGON_AGE_INQUISITION_ID)
+        psn_library.update_game(self.TEST_LIBRARY, self.DRAGON_AGE_INQUISITION_GAME_SNAPSHOT, game)
+        game = psn_library_dao.get_game(self.TEST_LIBRARY, self.DRAGON_AGE_INQUISITION_ID)
+
+        # The free price is kept as the low, rather than being taken as no low.
+        self.assertEqual((game.lowest_base_price, game.lowest_plus_price), (0, 0))
+        self.assertFalse(game.at_lowest_price)
+
+    def test_refresh_overdue_games(self):
+        psn_library = PSNLibrary()
+        psn_library_dao = PSNLibraryDAO()
+        now = timezone.now()
+        GameList.objects.filter(pk=self.DARK_SOULS_III_GAME.pk).update(next_refresh=now - datetime.timedelta(hours=1))
+        GameList.objects.filter(pk=self.DRAGON_AGE_INQUISITION_GAME.pk).update(next_refresh=now - datetime.timedelta(hours=2))
+
+        # Only the most overdue game is refreshed, and is scheduled again.
+        with mock.patch.object(psn_library.psn_store_api, 'request_psn_game_json', return_value=self.DRAGON_AGE_INQUISITION_GAME_SNAPSHOT) as request_mock:
+            changed_game_count = psn_library.refresh_overdue_games(self.TEST_LIBRARY.pk, 1)
+        self.assertEqual(request_mock.call_count, 1)
+        self.assertEqual(changed_game_count, 1)
+        dragon_age_inquisition = psn_library_dao.get_game(self.TEST_LIBRARY, self.DRAGON_AGE_INQUISITION_ID)
+        self.assertEqual(dragon_age_inquisition.rating_count, self.DRAGON_AGE_INQUISITION_RATING_COUNT)
+        self.assertTrue(dragon_age_inquisition.next_refresh > now)
+        self.assertEqual(list(psn_library_dao.get_overdue_games(self.TEST_LIBRARY, 2)), [self.DARK_SOULS_III_GAME])
+
+    def test_refresh_overdue_games_postpones_failures(self):
+        psn_library = PSNLibrary()
+        psn_library_dao = PSNLibraryDAO()
+        now = timezone.now()
+        GameList.objects.filter(pk=self.DARK_SOULS_III_GAME.pk).update(next_refresh=now - datetime.timedelta(hours=1))
+
+        with mock.patch.object(psn_library.psn_store_api, 'request_psn_game_json', side_effect=OSError("Store unavailable")):
+            self.assertEqual(psn_library.refresh_overdue_games(self.TEST_LIBRARY.pk, 1), 0)
+        # A game whose store entry fails goes to the back of the queue, rather than blocking it.
+        dark_souls_III = psn_library_dao.get_game(self.TEST_LIBRARY, self.DARK_SOULS_III_ID)
+        self.assertAlmostEqual((dark_souls_III.next_refresh - now).total_seconds(), REFRESH_INTERVAL_DAILY.total_seconds(), delta=self.TEST_TIME_DELTA_MIN * 60)
+        self.assertEqual(list(psn_library_dao.get_overdue_games(self.TEST_LIBRARY, 2)), [self.DRAGON_AGE_INQUISITION_GAME])
+
+    def test_refresh_overdue_games_rolls_up_every_month(self):
+        psn_library = PSNLibrary()
+        psn_library_dao = PSNLibraryDAO()
+        now = timezone.now()
+        last_month = now.replace(day=1) - datetime.timedelta(days=1)
+
+        # The price is first recorded last month, and the refresh records a new price this month.
+        with mock.patch('django.utils.timezone.now', return_value=last_month):
+            psn_library.update_game(self.TEST_LIBRARY, self.DARK_SOULS_III_GAME_SNAPSHOT, self.DARK_SOULS_III_GAME)
+            psn_library.update_price_history_rollups(self.TEST_LIBRARY, last_month)
+        GameList.objects.filter(pk=self.DARK_SOULS_III_GAME.pk).update(next_refresh=last_month)
+        discounted_game_snapshot = self.DARK_SOULS_III_GAME_SNAPSHOT._replace(base_price=self.DARK_SOULS_III_PRICE // 2, plus_price=self.DARK_SOULS_III_PRICE // 2, base_discount=50, plus_discount=50)
+        with mock.patch.object(psn_library.psn_store_api, 'request_psn_game_json', return_value=discounted_game_snapshot):
+            psn_library.refresh_overdue_games(self.TEST_LIBRARY.pk, 1)
+
+        game = psn_library_dao.get_game(self.TEST_LIBRARY, self.DARK_SOULS_III_ID)
+        monthly_history = list(game.gamepricemonthly_set.order_by('month').values_list('month', 'min_plus_price', 'change_count'))
+        self.assertEqual(monthly_history, [(last_month.replace(day=1).date(), self.DARK_SOULS_III_PRICE, 1), (now.replace(day=1).date(), self.DARK_SOULS_III_PRICE // 2, 1)])
+
+    def test_set_psn_title_content(self):
+        psn_library = PSNLibrary()
+        psn_library_dao = PSNLibraryDAO()
+
+        psn_library.set_psn_title_content(self.DARK_SOULS_III_GAME.title_fk, self.DARK_SOULS_III_GAME_SNAPSHOT)
+        psn_library.set_psn_title_content(self.DRAGON_AGE_INQUISITION_GAME.title_fk, self.DRAGON_AGE_INQUISITION_GAME_SNAPSHOT)
+        dark_souls_III = psn_library_dao.get_game(self.TEST_LIBRARY, self.DARK_SOULS_III_ID)
+        dragon_age_inquisition = psn_library_dao.get_game(self.TEST_LIBRARY, self.DRAGON_AGE_INQUISITION_ID)
+
+        # Dark Souls III content: Online, Violence. Dragon Age Inquisition content: Language, Online, Violence.
+        self.assertEqual(dark_souls_III.title_fk.content_mask, 0b011)
+        self.assertEqual(dark_souls_III.content_mask, 0b011)
+        self.assertEqual(dragon_age_inquisition.title_fk.content_mask, 0b111)
+        self.assertEqual(dragon_age_inquisition.content_mask, 0b111)
+        self.assertEqual(dragon_age_inquisition.title_fk.titlecontent_set.count(), 3)
+
+    def test_add_game_to_second_region(self):
+        psn_library = PSNLibrary()
+        psn_library_dao = PSNLibraryDAO()
+        us_library = Library.objects.create(library_name="us_lib", library_url=self.TEST_URL, library_rating_stdev=self.TEST_LIBRARY_STDEV, library_rating_mean=self.TEST_LIBRARY_MEAN)
+        us_game_snapshot = self.DARK_SOULS_III_GAME_SNAPSHOT._replace(game_id="UP0700-CUSA03388_00-DARKSOULS3000000", title_key=get_title_key("UP0700-CUSA03388_00-DARKSOULS3000000", None))
+
+        # The title already exists from the EU region, so no thumbnail is uploaded.
+        psn_library.add_game(us_library, us_game_snapshot, self.TEST_URL)
+        us_game = psn_library_dao.get_game(us_library, us_game_snapshot.game_id)
+
+        self.assertEqual(us_game.title_fk, self.DARK_SOULS_III_GAME.title_fk)
+        self.assertEqual(us_game.age_rating, self.DARK_SOULS_III_AGE_RATING)
+        self.assertEqual(us_game.price, self.DARK_SOULS_III_PRICE)
+        self.assertEqual(GameTitle.objects.count(), 2)
+
+    def test_add_game_rekeys_product_title(self):
+        psn_library = PSNLibrary()
+        us_library = Library.objects.create(library_name="us_lib", library_url=self.TEST_URL, library_rating_stdev=self.TEST_LIBRARY_STDEV, library_rating_mean=self.TEST_LIBRARY_MEAN)
+        us_game_id = "UP0700-CUSA03388_00-DARKSOULS3000000"
+        us_game_snapshot = self.DARK_SOULS_III_GAME_SNAPSHOT._replace(game_id=us_game_id, title_key=get_title_key(us_game_id, 1234))
+
+        # The EU title is keyed on its product id, as backfilled before concept ids were stored.
+        with mock.patch.object(psn_library, 'upload_thumb_to_cloudinary') as upload_mock:
+            psn_library.add_game(us_library, us_game_snapshot, self.TEST_URL)
+
+        # The title is re-keyed on the concept id and shared, without uploading its thumbnail again.
+        self.assertFalse(upload_mock.called)
+        us_game = PSNLibraryDAO().get_game(us_library, us_game_id)
+        self.assertEqual(us_game.title_fk, self.DARK_SOULS_III_GAME.title_fk)
+        self.assertEqual(us_game.title_fk.title_key, get_title_key(us_game_id, 1234))
+        self.assertEqual(GameTitle.objects.count(), 2)
+
+    def test_add_game_title_race(self):
+        psn_library = PSNLibrary()
+        us_library = Library.objects.create(library_name="us_lib", library_url=self.TEST_URL, library_rating_stdev=self.TEST_LIBRARY_STDEV, library_rating_mean=self.TEST_LIBRARY_MEAN)
+        us_game_snapshot = self.DARK_SOULS_III_GAME_SNAPSHOT._replace(game_id="UP0700-CUSA03388_00-DARKSOULS3000000", title_key=get_title_key("UP0700-CUSA03388_00-DARKSOULS3000000", None))
+        queryset_get = QuerySet.get
+
+        def get_after_race(queryset, *args, **kwargs):
+            # The title is missing when first checked, as if another region's sync added it just after.
+            if queryset.model == GameTitle and not get_after_race.raced:
+                get_after_race.raced = True
+                raise GameTitle.DoesNotExist()
+            return queryset_get(queryset, *args, **kwargs)
+        get_after_race.raced = False
+
+        with mock.patch.object(QuerySet, 'get', get_after_race), mock.patch.object(psn_library, 'upload_thumb_to_cloudinary') as upload_mock:
+            psn_library.add_game(us_library, us_game_snapshot, self.TEST_URL)
+
+        # The losing sync uses the winner's title, without uploading its thumbnail again.
+        self.assertFalse(upload_mock.called)
+        self.assertEqual(PSNLibraryDAO().get_game(us_library, us_game_snapshot.game_id).title_fk, self.DARK_SOULS_III_GAME.title_fk)
+        self.assertEqual(GameTitle.objects.count(), 2)
+
+    def race_content_descriptor(self, **fields):
+        # Another sync creates a Content Descriptor just after this one looks for the next free bit.
+        aggregate_descriptors = ContentDescriptors.objects.aggregate
+
+        def aggregate_before_race(*args, **kwargs):
+            highest_bit = aggregate_descriptors(*args, **kwargs)
+            if not aggregate_before_race.raced:
+                aggregate_before_race.raced = True
+                ContentDescriptors.objects.create(**fields)
+            return highest_bit
+        aggregate_before_race.raced = False
+        return mock.patch.object(ContentDescriptors.objects, 'aggregate', aggregate_before_race)
+
+    def test_content_descriptor_bit_race(self):
+        with self.race_content_descriptor(content_name="Violence", content_description="Violence", content_bit=0):
+            blood_content = PSNLibraryDAO().get_or_create_content_descriptor("Blood", "Blood")
+
+        # The losing sync takes the next free bit, rather than going without one.
+        self.assertEqual(blood_content.content_bit, 1)
+        self.assertEqual(ContentDescriptors.objects.get(content_name="Violence").content_bit, 0)
+
+    def test_content_descriptor_name_race(self):
+        with self.race_content_descriptor(content_name="Blood", content_description="Blood", content_bit=0):
+            blood_content = PSNLibraryDAO().get_or_create_content_descriptor("Blood", "Blood")
+
+        # The losing sync uses the winner's Content Descriptor and its bit.
+        self.assertEqual(blood_content, ContentDescriptors.objects.get())
+        self.assertEqual(blood_content.content_bit, 0)
+
+    def test_sync_run_progress(self):
+        psn_library = PSNLibrary()
+        psn_library_dao = PSNLibraryDAO()
+        library_json = {'links': [
+            {'id': self.DARK_SOULS_III_ID, 'name': self.DARK_SOULS_III_NAME, 'url': self.DARK_SOULS_III_ID, 'release_date': '2016-04-12T00:00:00Z', 'default_sku': {'price': self.DARK_SOULS_III_PRICE}},
+            {'id': self.DRAGON_AGE_INQUISITION_ID, 'name': self.DRAGON_AGE_INQUISITION_NAME, 'url': self.DRAGON_AGE_INQUISITION_ID, 'release_date': '2014-11-18T00:00:00Z', 'default_sku': {'price': self.DRAGON_AGE_INQUISITION_PRICE}},
+            {'id': "bundle", 'name': "Bundle", 'url': "bundle", 'release_date': '2014-11-18T00:00:00Z', 'default_sku': {'price': 1}, 'parent_name': "Parent Game"},
+        ]}
+        game_snapshots = {self.DARK_SOULS_III_ID: self.DARK_SOULS_III_GAME_SNAPSHOT, self.DRAGON_AGE_INQUISITION_ID: self.DRAGON_AGE_INQUISITION_GAME_SNAPSHOT}
+        us_library = Library.objects.create(library_name="us_lib", library_url=self.TEST_URL)
+
+        sync_run = psn_library.start_sync_run()
+        with mock.patch.object(psn_library.psn_store_api, 'request_psn_lib_json', return_value=library_json), \
+                mock.patch.object(psn_library.psn_store_api, 'request_psn_game_json', side_effect=lambda url, library_id: game_snapshots[url]):
+            psn_library.sync_library_with_store(self.TEST_LIBRARY.pk, sync_run.pk)
+        self.assertEqual(psn_library_dao.get_sync_run_progress(sync_run), {'games_total': 2, 'games_processed': 2})
+
+        with mock.patch.object(psn_library.psn_store_api, 'request_psn_lib_json', side_effect=IOError("Store unavailable")):
+            psn_library.sync_library_with_store(us_library.pk, sync_run.pk)
+        psn_library.finish_sync_run(sync_run.pk)
+
+        sync_run = psn_library_dao.get_sync_run(sync_run.pk)
+        self.assertEqual(psn_library_dao.get_sync_run_library(sync_run.pk, self.TEST_LIBRARY).status, SYNC_STATUS_FINISHED)
+        self.assertEqual(psn_library_dao.get_sync_run_library(sync_run.pk, us_library).status, SYNC_STATUS_FAILED)
+        self.assertEqual(sync_run.status, SYNC_STATUS_FAILED)
+        self.assertTrue(sync_run.finished_at != None)
+
+    def test_shadow_score_library(self):
+        psn_library = PSNLibrary()
+        psn_library_dao = PSNLibraryDAO()
+        psn_library.update_game(self.TEST_LIBRARY, self.DARK_SOULS_III_GAME_SNAPSHOT, self.DARK_SOULS_III_GAME)
+        psn_library.update_game(self.TEST_LIBRARY, self.DRAGON_AGE_INQUISITION_GAME_SNAPSHOT, self.DRAGON_AGE_INQUISITION_GAME)
+
+        class ScoringModelCountWeighted(ScoringModelV1):
+            version = 'count250'
+            RATING_COUNT_WEIGHTING = 250
+
+        with mock.patch.dict(SCORING_MODELS, {'count250': ScoringModelCountWeighted()}):
+            psn_library.shadow_score_library(self.TEST_LIBRARY.pk, ['v1', 'count250'])
+        game = psn_library_dao.get_game(self.TEST_LIBRARY, self.DARK_SOULS_III_ID)
+
+        # The production scores are untouched, and the production model's shadow scores match them.
+        self.assertEqual(game.plus_value_score, self.DARK_SOULS_III_VALUE)
+        v1_score = game.gamescore_set.get(model_version='v1')
+        self.assertEqual((v1_score.weighted_rating, v1_score.plus_value_score), (game.weighted_rating, game.plus_value_score))
+        count250_score = game.gamescore_set.get(model_version='count250')
+        self.assertAlmostEqual(count250_score.weighted_rating, game.weighted_rating - (self.DARK_SOULS_III_RATING_COUNT / 250))
+
+    def test_shadow_score_library_unknown_version(self):
+        psn_library = PSNLibrary()
+        psn_library.update_game(self.TEST_LIBRARY, self.DARK_SOULS_III_GAME_SNAPSHOT, self.DARK_SOULS_III_GAME)
+
+        # Unknown versions fail before any game is scored.
+        with self.assertRaisesMessage(ValueError, "unknown"):
+            psn_library.shadow_score_library(self.TEST_LIBRARY.pk, ['v1', 'unknown'])
+        self.assertFalse(GameScore.objects.exists())
+
+    def test_update_psn_library_scores_with_new_statistics(self):
+        psn_library = PSNLibrary()
+        psn_library_dao = PSNLibraryDAO()
+        library_json = {'links': [
+            {'id': self.DARK_SOULS_III_ID, 'name': self.DARK_SOULS_III_NAME, 'url': self.DARK_SOULS_III_ID, 'release_date': '2016-04-12T00:00:00Z', 'default_sku': {'price': self.DARK_SOULS_III_PRICE}},
+            {'id': self.DRAGON_AGE_INQUISITION_ID, 'name': self.DRAGON_AGE_INQUISITION_NAME, 'url': self.DRAGON_AGE_INQUISITION_ID, 'release_date': '2014-11-18T00:00:00Z', 'default_sku': {'price': self.DRAGON_AGE_INQUISITION_PRICE}},
+        ]}
+        game_snapshots = {self.DARK_SOULS_III_ID: self.DARK_SOULS_III_GAME_SNAPSHOT, self.DRAGON_AGE_INQUISITION_ID: self.DRAGON_AGE_INQUISITION_GAME_SNAPSHOT}
+        unlisted_game_rating = 4.6
+        GameList.objects.create(game_id="unlisted", game_name="Unlisted Game", json_url=self.TEST_URL, library_fk=self.TEST_LIBRARY, rating=unlisted_game_rating, rating_count=100, price=99999, plus_price=99999)
+
+        with mock.patch.object(psn_library.psn_store_api, 'request_psn_game_json', side_effect=lambda url, library_id: game_snapshots[url]), \
+                mock.patch('psnvalue.psn_refresh_scheduler.REFRESH_TOP_VALUE_GAME_COUNT', 1):
+            psn_library.update_psn_library(self.TEST_LIBRARY, library_json)
+        library = psn_library_dao.get_library(self.TEST_LIBRARY.pk)
+
+        # The statistics come from the ratings of every game in the library, including games this sync didn't
+        # fetch, and every game is scored with them in the same sync.
+        ratings = [self.DARK_SOULS_III_RATING, self.DRAGON_AGE_INQUISITION_RATING, unlisted_game_rating]
+        self.assertAlmostEqual(library.library_rating_mean, mean(ratings))
+        self.assertAlmostEqual(library.library_rating_stdev, pstdev(ratings))
+        for game_id in list(game_snapshots) + ["unlisted"]:
+            game = psn_library_dao.get_game(library, game_id)
+            scores = ScoringModelV1().score_game(library, game)
+            self.assertEqual((game.weighted_rating, game.base_value_score, game.plus_value_score), (scores['weighted_rating'], scores['base_value_score'], scores['plus_value_score']))
+
+        # Each game is scheduled from its new value, rather than the stale value it was written with: the
+        # undiscounted game is refreshed hourly as it is now the (single) top value game.
+        for game_id, refresh_interval in [(self.DARK_SOULS_III_ID, REFRESH_INTERVAL_HOURLY), (self.DRAGON_AGE_INQUISITION_ID, REFRESH_INTERVAL_HOURLY)]:
+            game = psn_library_dao.get_game(library, game_id)
+            self.assertAlmostEqual((game.next_refresh - game.last_checked).total_seconds(), refresh_interval.total_seconds(), delta=self.TEST_TIME_DELTA_MIN * 60)
+
+    def test_skip_failed_store_entries(self):
+        psn_library = PSNLibrary()
+        psn_library_dao = PSNLibraryDAO()
+        library_json = {'links': [
+            {'id': self.DARK_SOULS_III_ID, 'name': self.DARK_SOULS_III_NAME, 'url': self.DARK_SOULS_III_ID, 'release_date': '2016-04-12T00:00:00Z', 'default_sku': {'price': self.DARK_SOULS_III_PRICE}},
+            {'id': "preorder", 'name': "Pre-order", 'url': "preorder", 'release_date': '2016-04-12T00:00:00Z', 'default_sku': {'price': self.DARK_SOULS_III_PRICE}},
+        ]}
+        game_snapshots = {self.DARK_SOULS_III_ID: self.DARK_SOULS_III_GAME_SNAPSHOT}
+
+        def request_psn_game_json(url, library_id):
+            if url not in game_snapshots:
+                raise KeyError('default_sku')
+            return game_snapshots[url]
+
+        with mock.patch.object(psn_library.psn_store_api, 'request_psn_game_json', side_effect=request_psn_game_json) as request_mock:
+            psn_library.update_psn_library(self.TEST_LIBRARY, library_json)
+            self.assertEqual(request_mock.call_count, 2)
+            self.assertEqual(set(psn_library_dao.get_store_entry_failures(self.TEST_LIBRARY)), {"preorder"})
+
+            # The game without a price block is not requested again until its next attempt.
+            psn_library.update_psn_library(self.TEST_LIBRARY, library_json)
+            self.assertEqual(request_mock.call_count, 3)
+
+            with mock.patch('django.utils.timezone.now', return_value=timezone.now() + datetime.timedelta(days=8)):
+                psn_library.update_psn_library(self.TEST_LIBRARY, library_json)
+            self.assertEqual(request_mock.call_count, 5)
+
+    def test_quarantine_failed_store_entries(self):
+        psn_library = PSNLibrary()
+        psn_library_dao = PSNLibraryDAO()
+        broken_game_json = {'id': "broken", 'name': "Broken", 'url': "broken", 'release_date': '2016-04-12T00:00:00Z', 'default_sku': {'price': self.DARK_SOULS_III_PRICE}}
+        library_json = {'links': [broken_game_json]}
+        game_snapshots = {}
+
+        def request_psn_game_json(url, library_id):
+            if url not in game_snapshots:
+                raise IOError("Server error")
+            return game_snapshots[url]
+
+        with mock.patch.object(psn_library.psn_store_api, 'request_psn_game_json', side_effect=request_psn_game_json) as request_mock:
+            # Each retry waits until the backoff has passed, and the game is quarantined after the last attempt.
+            for days in [0, 1, 3, 7, 14, 21, 60]:
+                with mock.patch('django.utils.timezone.now', return_value=timezone.now() + datetime.timedelta(days=days, minutes=1)):
+                    psn_library.update_psn_library(self.TEST_LIBRARY, library_json)
+            self.assertEqual(request_mock.call_count, 5)
+            failure = psn_library_dao.get_store_entry_failures(self.TEST_LIBRARY)["broken"]
+            self.assertEqual((failure.url, failure.error_class, failure.reason, failure.attempt_count, failure.quarantined), ("broken", "OSError", "Server error", 5, True))
+
+            # A quarantined game is requested again once its listing changes, and starts afresh once it syncs.
+            game_snapshots["broken"] = self.DARK_SOULS_III_GAME_SNAPSHOT._replace(game_id="broken", game_name="Broken")
+            broken_game_json['default_sku'] = {'price': self.DRAGON_AGE_INQUISITION_PRICE}
+            psn_library.update_psn_library(self.TEST_LIBRARY, library_json)
+            self.assertEqual(request_mock.call_count, 6)
+            self.assertEqual(psn_library_dao.get_store_entry_failures(self.TEST_LIBRARY), {})
+
+    def test_local_errors_are_not_store_entry_failures(self):
+        psn_library = PSNLibrary()
+        psn_library_dao = PSNLibraryDAO()
+        library_json = {'links': [
+            {'id': self.DARK_SOULS_III_ID, 'name': self.DARK_SOULS_III_NAME, 'url': self.DARK_SOULS_III_ID, 'release_date': '2016-04-12T00:00:00Z', 'default_sku': {'price': self.DARK_SOULS_III_PRICE}},
+        ]}
+
+        with mock.patch.object(psn_library.psn_store_api, 'request_psn_game_json', side_effect=redis.ConnectionError("Redis unavailable")):
+            with self.assertRaises(redis.ConnectionError):
+                psn_library.update_psn_library(self.TEST_LIBRARY, library_json)
+        self.assertEqual(psn_library_dao.get_store_entry_failures(self.TEST_LIBRARY), {})
+
+    def test_update_library_freshness(self):
+        psn_library_dao = PSNLibraryDAO()
+        GameList.objects.filter(pk=self.DARK_SOULS_III_GAME.pk).update(last_checked=timezone.now() - datetime.timedelta(days=3))
+
+        psn_library_dao.update_library_freshness(self.TEST_LIBRARY, timezone.now() - datetime.timedelta(days=2))
+        library = psn_library_dao.get_library(self.TEST_LIBRARY.pk)
+        self.assertEqual((library.game_count, library.stale_game_count, library.get_stale_game_percent()), (2, 1, 50))
+
+    def test_diff_sync_library_with_store(self):
+        psn_library = PSNLibrary()
+        psn_library_dao = PSNLibraryDAO()
+        GameList.objects.create(game_id="delisted", game_name="Delisted Game", json_url=self.TEST_URL, library_fk=self.TEST_LIBRARY)
+        new_game_snapshot = self.DARK_SOULS_III_GAME_SNAPSHOT._replace(game_id="new", game_name="New Game", rating=4.0)
+        library_json = {'links': [
+            {'id': self.DARK_SOULS_III_ID, 'name': self.DARK_SOULS_III_NAME, 'url': self.DARK_SOULS_III_ID, 'release_date': '2016-04-12T00:00:00Z', 'default_sku': {'price': self.DARK_SOULS_III_PRICE}},
+            {'id': "new", 'name': "New Game", 'url': "new", 'release_date': '2016-04-12T00:00:00Z', 'default_sku': {'price': self.DARK_SOULS_III_PRICE}},
+        ]}
+        game_snapshots = {self.DARK_SOULS_III_ID: self.DARK_SOULS_III_GAME_SNAPSHOT, "new": new_game_snapshot}
+
+        with mock.patch.object(psn_library.psn_store_api, 'request_psn_lib_json', return_value=library_json), \
+                mock.patch.object(psn_library.psn_store_api, 'request_psn_game_json', side_effect=lambda url, library_id: game_snapshots[url]):
+            # The library and its store entry failures are loaded with a single query each, and nothing is written.
+            with self.assertNumQueries(3):
+                library_diff = psn_library.diff_sync_library_with_store(self.TEST_LIBRARY.pk)
+
+        self.assertEqual(library_diff.new_games, [("new", "New Game")])
+        self.assertEqual(sorted(library_diff.removed_games), [(self.DRAGON_AGE_INQUISITION_ID, self.DRAGON_AGE_INQUISITION_NAME), ("delisted", "Delisted Game")])
+        self.assertEqual(library_diff.price_changes, [(self.DARK_SOULS_III_ID, self.DARK_SOULS_III_NAME, 0.0, self.DARK_SOULS_III_PRICE)])
+        self.assertEqual(library_diff.rank_movements, [(self.DARK_SOULS_III_ID, self.DARK_SOULS_III_NAME, None, 1)])
+        self.assertEqual(psn_library_dao.get_game(self.TEST_LIBRARY, self.DARK_SOULS_III_ID).price, 0.0)
+        self.assertEqual(psn_library_dao.get_game(self.TEST_LIBRARY, "new"), None)
+
+    def test_update_weighted_ratings_of_library_only(self):
+        psn_library = PSNLibrary()
+        psn_library_dao = PSNLibraryDAO()
+        other_library = Library.objects.create(library_name="other_lib", library_url=self.TEST_URL, library_rating_stdev=self.TEST_LIBRARY_STDEV, library_rating_mean=4.7)
+        other_game = GameList.objects.create(game_id=self.DARK_SOULS_III_ID, game_name=self.DARK_SOULS_III_NAME, json_url=self.TEST_URL, library_fk=other_library)
+        psn_library.update_game(self.TEST_LIBRARY, self.DARK_SOULS_III_GAME_SNAPSHOT, self.DARK_SOULS_III_GAME)
+        psn_library.update_game(other_library, self.DARK_SOULS_III_GAME_SNAPSHOT, other_game)
+        other_weighted_rating = psn_library_dao.get_game(other_library, self.DARK_SOULS_III_ID).weighted_rating
+
+        psn_library.update_weighted_ratings(self.TEST_LIBRARY.pk)
+
+        # The other region's game keeps the score from its own library's mean.
+        self.assertEqual(psn_library_dao.get_game(other_library, self.DARK_SOULS_III_ID).weighted_rating, other_weighted_rating)
+        self.assertNotEqual(psn_library_dao.get_game(self.TEST_LIBRARY, self.DARK_SOULS_III_ID).weighted_rating, other_weighted_rating)
+
+    def test_diff_update_weighted_ratings(self):
+        psn_library = PSNLibrary()
+        psn_library.update_game(self.TEST_LIBRARY, self.DARK_SOULS_III_GAME_SNAPSHOT, self.DARK_SOULS_III_GAME)
+        psn_library.update_game(self.TEST_LIBRARY, self.DRAGON_AGE_INQUISITION_GAME_SNAPSHOT, self.DRAGON_AGE_INQUISITION_GAME)
+        Library.objects.filter(pk=self.TEST_LIBRARY.pk).update(library_rating_mean=4.7)
+
+        library_diff = psn_library.diff_update_weighted_ratings(self.TEST_LIBRARY.pk)
+
+        # Dragon Age Inquisition drops below the higher mean, so Dark Souls III overtakes it.
+        self.assertEqual(sorted(library_diff.rank_movements), [
+            (self.DRAGON_AGE_INQUISITION_ID, self.DRAGON_AGE_INQUISITION_NAME, 1, 2),
+            (self.DARK_SOULS_III_ID, self.DARK_SOULS_III_NAME, 2, 1),
+        ])
+        self.assertEqual(library_diff.new_games, [])
+        self.assertEqual(library_diff.removed_games, [])
+        self.assertEqual(library_diff.price_changes, [])
@@ -0,0 +1,22 @@
+import datetime
+from django.test import SimpleTestCase
+from ..psn_listing_filter import get_listing_now, filter_listing
+
+class PSNListingFilterTestCase(SimpleTestCase):
+
+    TEST_NOW = datetime.datetime(2017, 6, 1, 12, 0, 0)
+
+    def test_get_listing_now(self):
+        self.assertEqual(get_listing_now(self.TEST_NOW), '2017-06-01T12:00:00Z')
+
+    def test_filter_listing(self):
+        games_json = [
+            {'id': "released", 'release_date': '2017-06-01T11:59:59Z', 'default_sku': {'price': 1999}},
+            {'id': "unreleased", 'release_date': '2017-06-01T12:00:00Z', 'default_sku': {'price': 1999}},
+            {'id': "no_release_date", 'default_sku': {'price': 1999}},
+            {'id': "bundle", 'release_date': '2016-01-01T00:00:00Z', 'default_sku': {'price': 1999}, 'parent_name': "Parent Game"},
+            {'id': "unpriced", 'release_date': '2016-01-01T00:00:00Z'},
+            {'id': "failed", 'release_date': '2016-01-01T00:00:00Z', 'default_sku': {'price': 1999}},
+        ]
+        valid_games_json = filter_listing(games_json, get_listing_now(self.TEST_NOW), {"failed"})
+        self.assertEqual([game_json['id'] for game_json in valid_games_json], ["released"])
@@ -0,0 +1,65 @@
+import time
+import redis
+from unittest import mock
+from django.test import SimpleTestCase, override_settings
+from ..psn_metrics import PSNMetrics, get_latency_bucket, get_latency_percentile, METRICS_REDIS_TIMEOUT_SECONDS, METRICS_REDIS_BACKOFF_SECONDS
+
+class PSNMetricsTestCase(SimpleTestCase):
+
+    def test_get_latency_bucket(self):
+        self.assertEqual(get_latency_bucket(10), '25')
+        self.assertEqual(get_latency_bucket(25), '25')
+        self.assertEqual(get_latency_bucket(300), '500')
+        self.assertEqual(get_latency_bucket(60000), '10000+')
+
+    def test_get_latency_percentile(self):
+        bucket_counts = {'50': 50, '250': 40, '1000': 9, '10000+': 1}
+        self.assertEqual(get_latency_percentile(bucket_counts, 50), '50')
+        self.assertEqual(get_latency_percentile(bucket_counts, 90), '250')
+        self.assertEqual(get_latency_percentile(bucket_counts, 99), '1000')
+        self.assertEqual(get_latency_percentile(bucket_counts, 100), '10000+')
+        self.assertEqual(get_latency_percentile({}, 50), None)
+
+    def test_redis_unavailable(self):
+        psn_metrics = PSNMetrics()
+        with mock.patch.object(psn_metrics, 'get_redis_client', side_effect=redis.ConnectionError("Redis unavailable")):
+            # Recording is best effort, so never fails a request.
+            psn_metrics.record_store_request(0.1, 'OSError')
+            psn_metrics.record_view_request('psnvalue:index', 0.1, 0.01, 3, None)
+            self.assertEqual(psn_metrics.get_store_metrics(), None)
+            self.assertEqual(psn_metrics.get_view_metrics(), None)
+
+    @override_settings(REDIS_URL_VAL='redis://localhost:6379')
+    def test_redis_backoff(self):
+        psn_metrics = PSNMetrics()
+        with mock.patch('redis.StrictRedis.from_url') as from_url_mock:
+            from_url_mock.return_value.pipeline.return_value.execute.side_effect = redis.TimeoutError("Timeout reading from socket")
+            psn_metrics.record_view_request('psnvalue:index', 0.1, 0.01, 3, None)
+            psn_metrics.record_view_request('psnvalue:index', 0.1, 0.01, 3, None)
+            # Redis is connected to with short timeouts, and isn't used again for a while after it fails.
+            self.assertEqual(from_url_mock.call_args[1], {'socket_timeout': METRICS_REDIS_TIMEOUT_SECONDS, 'socket_connect_timeout': METRICS_REDIS_TIMEOUT_SECONDS})
+            self.assertEqual(from_url_mock.return_value.pipeline.return_value.execute.call_count, 1)
+
+            with mock.patch('time.monotonic', return_value=time.monotonic() + METRICS_REDIS_BACKOFF_SECONDS):
+                psn_metrics.record_view_request('psnvalue:index', 0.1, 0.01, 3, None)
+            self.assertEqual(from_url_mock.return_value.pipeline.return_value.execute.call_count, 2)
+
+    def test_get_view_metrics(self):
+        psn_metrics = PSNMetrics()
+        pipe = mock.Mock()
+        pipe.execute.return_value = [
+            {b'psnvalue:index|50': b'3', b'psnvalue:index|250': b'1', b'psnvalue:gamelist|100': b'2'},
+            {b'psnvalue:index|25': b'4', b'psnvalue:gamelist|25': b'2'},
+            {b'psnvalue:gamelist|50': b'2'},
+            {b'psnvalue:index': b'4', b'psnvalue:gamelist': b'6'},
+        ]
+        with mock.patch.object(psn_metrics, 'get_redis_client') as get_redis_client_mock:
+            get_redis_client_mock.return_value.pipeline.return_value = pipe
+            view_metrics = psn_metrics.get_view_metrics()
+        self.assertEqual([metrics['view_name'] for metrics in view_metrics], ['psnvalue:gamelist', 'psnvalue:index'])
+        gamelist_metrics, index_metrics = view_metrics
+        self.assertEqual(gamelist_metrics['request_count'], 2)
+        self.assertEqual(gamelist_metrics['mean_query_count'], 3)
+        self.assertEqual(gamelist_metrics['template_percentiles'], [(50, '50'), (90, '50'), (99, '50')])
+        self.assertEqual(index_metrics['latency_percentiles'], [(50, '50'), (90, '250'), (99, '250')])
+        self.assertEqual(index_metrics['template_percentiles'], [(50, None), (90, None), (99, None)])
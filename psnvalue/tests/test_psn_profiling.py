@@ -0,0 +1,67 @@
+import io
+import marshal
+import zipfile
+from django.contrib import admin
+from django.test import TestCase
+from ..admin import TaskProfileAdmin
+from ..models import Library, TaskProfile
+from ..psn_profiling import PSNTaskProfiler
+from ..psn_sync_pipeline import bounded_stage
+
+def profiled_function(count):
+    return sum(range(count))
+
+def produced_items(count):
+    for item in range(count):
+        yield item
+
+def pipelined_function(count):
+    return sum(bounded_stage(produced_items(count), 2))
+
+def failing_function():
+    raise IOError("Store unavailable")
+
+class PSNTaskProfilerTestCase(TestCase):
+
+    def setUp(self):
+        self.library = Library.objects.create(library_name='test', library_url='')
+
+    def test_run_not_profiled(self):
+        self.assertEqual(PSNTaskProfiler().run(False, 'task_test', profiled_function, 10, library_id=self.library.pk), 45)
+        self.assertFalse(TaskProfile.objects.exists())
+
+    def test_run_profiled(self):
+        self.assertEqual(PSNTaskProfiler().run(True, 'task_test', profiled_function, 10, library_id=self.library.pk), 45)
+        task_profile = TaskProfile.objects.get()
+        self.assertEqual(task_profile.task_name, 'task_test')
+        self.assertEqual(task_profile.library_fk, self.library)
+        self.assertIn('profiled_function', task_profile.summary)
+        # The profile data is in the format loaded by pstats.
+        stats = marshal.loads(bytes(task_profile.profile_data))
+        self.assertTrue(any(function_name == 'profiled_function' for (_, _, function_name) in stats))
+
+    def test_run_profiled_exception(self):
+        with self.assertRaises(IOError):
+            PSNTaskProfiler().run(True, 'task_test', failing_function, library_id=self.library.pk)
+        # The profile of a failed task is still saved.
+        self.assertIn('failing_function', TaskProfile.objects.get().summary)
+
+    def test_run_profiled_pipeline(self):
+        self.assertEqual(PSNTaskProfiler().run(True, 'task_test', pipelined_function, 10, library_id=self.library.pk), 45)
+        # The stage run in the pipeline's thread is profiled with the task.
+        stats = marshal.loads(bytes(TaskProfile.objects.get().profile_data))
+        self.assertTrue(any(function_name == 'produced_items' for (_, _, function_name) in stats))
+
+    def test_download_profiles(self):
+        for count in [10, 20]:
+            PSNTaskProfiler().run(True, 'task_test', profiled_function, count, library_id=self.library.pk)
+        task_profiles = list(TaskProfile.objects.order_by('pk'))
+        task_profile_admin = TaskProfileAdmin(TaskProfile, admin.site)
+
+        response = task_profile_admin.download(None, TaskProfile.objects.filter(pk=task_profiles[0].pk))
+        self.assertEqual(response.content, bytes(task_profiles[0].profile_data))
+
+        # Several profiles are downloaded together.
+        response = task_profile_admin.download(None, TaskProfile.objects.all())
+        with zipfile.ZipFile(io.BytesIO(response.content)) as zip_file:
+            self.assertEqual(zip_file.namelist(), ['task_test_%d.prof' % task_profile.pk for task_profile in task_profiles])
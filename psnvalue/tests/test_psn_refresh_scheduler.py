@@ -0,0 +1,92 @@
+import datetime
+from unittest import mock
+from django.test import SimpleTestCase
+from django.utils import timezone
+from ..models import Library, GameList, GAMELIST_MIN_RATING_COUNT
+from ..psn_library import PSNLibrary
+from ..tasks import task_refresh_all_overdue_psn_games, task_refresh_overdue_psn_games, task_prime_refreshed_psn_caches, task_prime_psn_caches
+from ..psn_refresh_scheduler import PSNRefreshScheduler, REFRESH_INTERVAL_HOURLY, REFRESH_INTERVAL_DAILY, REFRESH_INTERVAL_WEEKLY, REFRESH_THRESHOLD_MAX_AGE
+
+class PSNRefreshSchedulerTestCase(SimpleTestCase):
+
+    TEST_TOP_VALUE_THRESHOLD = 300
+    TEST_NOW = timezone.now()
+
+    def setUp(self):
+        self.TEST_LIBRARY = Library(pk=1, library_name="test_lib", library_url="test_url")
+        self.psn_refresh_scheduler = PSNRefreshScheduler()
+
+    def get_game(self, **fields):
+        game_fields = dict(rating_count=GAMELIST_MIN_RATING_COUNT, price=999, base_discount=0, plus_discount=0, plus_value_score=self.TEST_TOP_VALUE_THRESHOLD - 1)
+        game_fields.update(fields)
+        return GameList(library_fk=self.TEST_LIBRARY, **game_fields)
+
+    def get_refresh_interval(self, game):
+        with mock.patch.object(self.psn_refresh_scheduler.psn_library_dao, 'get_top_value_threshold', return_value=self.TEST_TOP_VALUE_THRESHOLD):
+            return self.psn_refresh_scheduler.get_refresh_interval(self.TEST_LIBRARY, game)
+
+    def test_refresh_interval_daily(self):
+        self.assertEqual(self.get_refresh_interval(self.get_game()), REFRESH_INTERVAL_DAILY)
+
+    def test_refresh_interval_hourly(self):
+        # Discounted games, and games in the top value games of the library.
+        self.assertEqual(self.get_refresh_interval(self.get_game(base_discount=10)), REFRESH_INTERVAL_HOURLY)
+        self.assertEqual(self.get_refresh_interval(self.get_game(plus_discount=10)), REFRESH_INTERVAL_HOURLY)
+        self.assertEqual(self.get_refresh_interval(self.get_game(plus_value_score=self.TEST_TOP_VALUE_THRESHOLD)), REFRESH_INTERVAL_HOURLY)
+
+    def test_refresh_interval_weekly(self):
+        # Games which aren't displayed, even if they are discounted.
+        self.assertEqual(self.get_refresh_interval(self.get_game(rating_count=GAMELIST_MIN_RATING_COUNT - 1, plus_discount=10)), REFRESH_INTERVAL_WEEKLY)
+        self.assertEqual(self.get_refresh_interval(self.get_game(price=0, plus_value_score=self.TEST_TOP_VALUE_THRESHOLD)), REFRESH_INTERVAL_WEEKLY)
+
+    def test_refresh_interval_without_games(self):
+        with mock.patch.object(self.psn_refresh_scheduler.psn_library_dao, 'get_top_value_threshold', return_value=None):
+            self.assertEqual(self.psn_refresh_scheduler.get_refresh_interval(self.TEST_LIBRARY, self.get_game()), REFRESH_INTERVAL_DAILY)
+
+    def test_top_value_threshold_cached(self):
+        with mock.patch.object(self.psn_refresh_scheduler.psn_library_dao, 'get_top_value_threshold', return_value=self.TEST_TOP_VALUE_THRESHOLD) as get_top_value_threshold_mock:
+            with mock.patch('django.utils.timezone.now', return_value=self.TEST_NOW):
+                self.psn_refresh_scheduler.get_refresh_interval(self.TEST_LIBRARY, self.get_game())
+                self.psn_refresh_scheduler.get_refresh_interval(self.TEST_LIBRARY, self.get_game())
+            self.assertEqual(get_top_value_threshold_mock.call_count, 1)
+
+            # The threshold is fetched again once it is too old.
+            with mock.patch('django.utils.timezone.now', return_value=self.TEST_NOW + REFRESH_THRESHOLD_MAX_AGE + datetime.timedelta(seconds=1)):
+                self.psn_refresh_scheduler.get_refresh_interval(self.TEST_LIBRARY, self.get_game())
+            self.assertEqual(get_top_value_threshold_mock.call_count, 2)
+
+    def test_schedule_game(self):
+        game = self.get_game(plus_discount=10)
+        with mock.patch('django.utils.timezone.now', return_value=self.TEST_NOW):
+            self.psn_refresh_scheduler.schedule_game(self.TEST_LIBRARY, game)
+        self.assertEqual(game.next_refresh, self.TEST_NOW + REFRESH_INTERVAL_HOURLY)
+
+    def test_postpone_game(self):
+        game = self.get_game(plus_discount=10)
+        with mock.patch('django.utils.timezone.now', return_value=self.TEST_NOW):
+            self.psn_refresh_scheduler.postpone_game(game)
+        # Whatever its interval, a game that could not be refreshed is tried again the next day.
+        self.assertEqual(game.next_refresh, self.TEST_NOW + REFRESH_INTERVAL_DAILY)
+
+    def test_refresh_all_overdue_games(self):
+        with mock.patch.object(PSNLibrary, 'get_library_ids', return_value=[1, 2]), mock.patch('psnvalue.tasks.chord') as chord_mock:
+            task_refresh_all_overdue_psn_games(100)
+        # Each library is refreshed by a task of its own, which leaves the caches to be primed once all have finished.
+        self.assertEqual(chord_mock.call_args, mock.call([task_refresh_overdue_psn_games.si(1, 100, False), task_refresh_overdue_psn_games.si(2, 100, False)]))
+        self.assertEqual(chord_mock.return_value.call_args, mock.call(task_prime_refreshed_psn_caches.s([1, 2])))
+
+    def test_prime_refreshed_caches(self):
+        with mock.patch.object(task_prime_psn_caches, 'delay') as delay_mock:
+            task_prime_refreshed_psn_caches([0, 3, 0], [1, 2, 3])
+            task_prime_refreshed_psn_caches([0, 0], [1, 2])
+        # Only the libraries whose refresh changed games are primed, and none if no games changed.
+        self.assertEqual(delay_mock.call_args_list, [mock.call([2])])
+
+    def test_refresh_overdue_games_primes_changed_library(self):
+        with mock.patch.object(task_prime_psn_caches, 'delay') as delay_mock:
+            with mock.patch.object(PSNLibrary, 'refresh_overdue_games', return_value=0):
+                self.assertEqual(task_refresh_overdue_psn_games(1, 100), 0)
+            with mock.patch.object(PSNLibrary, 'refresh_overdue_games', return_value=3):
+                self.assertEqual(task_refresh_overdue_psn_games(2, 100), 3)
+                task_refresh_overdue_psn_games(3, 100, False)
+        self.assertEqual(delay_mock.call_args_list, [mock.call([2])])
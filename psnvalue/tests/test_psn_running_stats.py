@@ -0,0 +1,22 @@
+from statistics import mean, pstdev
+from django.test import SimpleTestCase
+from ..psn_running_stats import RunningStats
+
+class RunningStatsTestCase(SimpleTestCase):
+
+    TEST_RATINGS = [4.8, 4.57, 3.12, 1.0, 4.99, 2.5, 4.57]
+
+    def test_running_stats(self):
+        rating_stats = RunningStats()
+        for rating in self.TEST_RATINGS:
+            rating_stats.add(rating)
+
+        self.assertEqual(rating_stats.count, len(self.TEST_RATINGS))
+        self.assertAlmostEqual(rating_stats.mean, mean(self.TEST_RATINGS), places=12)
+        self.assertAlmostEqual(rating_stats.get_pstdev(), pstdev(self.TEST_RATINGS), places=12)
+
+    def test_running_stats_empty(self):
+        rating_stats = RunningStats()
+
+        self.assertEqual(rating_stats.count, 0)
+        self.assertEqual(rating_stats.get_pstdev(), 0.0)
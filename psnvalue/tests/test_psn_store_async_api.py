@@ -0,0 +1,83 @@
+import os
+import asyncio
+from unittest import mock
+from django.test import SimpleTestCase
+from ..psn_store_async_api import PSNStoreAsyncAPI
+
+class FakeResponse:
+
+    def __init__(self, session, url):
+        self.session = session
+        self.url = url
+        self.status = 200
+
+    async def __aenter__(self):
+        self.session.reserved_slots -= 1
+        self.session.in_flight += 1
+        self.session.max_in_flight = max(self.session.max_in_flight, self.session.in_flight)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.session.in_flight -= 1
+
+    async def read(self):
+        await asyncio.sleep(0.01)
+        if self.url not in self.session.responses:
+            raise IOError("Not found: " + self.url)
+        return self.session.responses[self.url]
+
+class FakeSession:
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.reserved_slots = 0
+        self.max_reserved_slots = 0
+
+    def reserve(self, library_id):
+        self.reserved_slots += 1
+        self.max_reserved_slots = max(self.max_reserved_slots, self.reserved_slots)
+        return 0
+
+    def get(self, url):
+        return FakeResponse(self, url)
+
+class PSNStoreAsyncAPITestCase(SimpleTestCase):
+
+    TEST_MAX_IN_FLIGHT = 5
+    TEST_GAME_COUNT = 40
+    DARK_SOULS_III_FILENAME = 'test_data/DarkSoulsIII_FullGame.json'
+    DARK_SOULS_III_ID = "EP0700-CUSA03365_00-DARKSOULS3000000"
+
+    def test_request_psn_game_jsons(self):
+        with open(os.path.join(os.path.dirname(__file__), self.DARK_SOULS_III_FILENAME), 'rb') as data_file:
+            game_json = data_file.read()
+        game_urls = ["game/" + str(game_index) for game_index in range(self.TEST_GAME_COUNT)]
+        session = FakeSession({game_url: game_json for game_url in game_urls})
+        psn_store_async_api = PSNStoreAsyncAPI(self.TEST_MAX_IN_FLIGHT)
+
+        async def request_psn_game_jsons():
+            psn_store_async_api.session = session
+            psn_store_async_api.semaphore = asyncio.Semaphore(self.TEST_MAX_IN_FLIGHT)
+            psn_store_async_api.budget_lock = asyncio.Lock()
+            return await psn_store_async_api.request_psn_game_jsons(game_urls + ["missing"], 1)
+
+        loop = asyncio.new_event_loop()
+        try:
+            with mock.patch.object(psn_store_async_api.psn_store_budget, 'reserve', side_effect=session.reserve) as reserve_mock, \
+                    mock.patch.object(psn_store_async_api.psn_metrics, 'record_store_request') as record_mock:
+                game_snapshots = loop.run_until_complete(request_psn_game_jsons())
+        finally:
+            loop.close()
+
+        # Every game is requested, with no more than the maximum in flight at once.
+        self.assertEqual([game_snapshot.game_id for game_snapshot in game_snapshots[:-1]], [self.DARK_SOULS_III_ID] * self.TEST_GAME_COUNT)
+        self.assertEqual(session.max_in_flight, self.TEST_MAX_IN_FLIGHT)
+        # Each request reserves its slot in the budget once in flight, and no slot is reserved ahead of another.
+        self.assertEqual(reserve_mock.call_count, self.TEST_GAME_COUNT + 1)
+        self.assertEqual(session.max_reserved_slots, 1)
+        # A failed request does not fail the others, and is counted as an error.
+        self.assertIsInstance(game_snapshots[-1], IOError)
+        self.assertEqual(record_mock.call_count, self.TEST_GAME_COUNT + 1)
+        self.assertEqual([call[0][1] for call in record_mock.call_args_list].count('OSError'), 1)
@@ -0,0 +1,53 @@
+import time
+import redis
+from unittest import mock
+from django.test import SimpleTestCase, override_settings
+from ..psn_store_budget import PSNStoreBudget, get_budget_slot, PSN_STORE_BUDGET_DEFAULT_INTERVAL, PSN_STORE_BUDGET_REDIS_TIMEOUT_SECONDS, PSN_STORE_BUDGET_REDIS_BACKOFF_SECONDS
+
+class PSNStoreBudgetTestCase(SimpleTestCase):
+
+    TEST_INTERVAL = 1.0
+
+    def test_get_budget_slot_single_library(self):
+        slot, next_slot, library_next_slot = get_budget_slot(100.0, 90.0, 90.0, 1, self.TEST_INTERVAL)
+
+        # An idle budget is reserved straight away, and the library may use the whole budget.
+        self.assertEqual(slot, 100.0)
+        self.assertEqual(next_slot, 101.0)
+        self.assertEqual(library_next_slot, 101.0)
+
+    def test_get_budget_slot_fair_share(self):
+        now = 100.0
+        next_slot = now
+        library_next_slots = {'eu': now, 'us': now, 'jp': now}
+        slots = []
+
+        # The EU library asks for requests twice as often as the others, but still only gets its share.
+        for library in ['eu', 'eu', 'us', 'eu', 'jp', 'eu', 'us', 'jp', 'eu']:
+            slot, next_slot, library_next_slots[library] = get_budget_slot(now, next_slot, library_next_slots[library], len(library_next_slots), self.TEST_INTERVAL)
+            slots.append((library, slot))
+
+        eu_slots = [slot for library, slot in slots if library == 'eu']
+        self.assertEqual(eu_slots, [100.0, 103.0, 106.0, 109.0, 112.0])
+        # No two requests share a slot of the budget.
+        self.assertEqual(len(set(slot for library, slot in slots)), len(slots))
+
+    @override_settings(REDIS_URL_VAL='redis://localhost:6379')
+    def test_local_spacing_without_redis(self):
+        psn_store_budget = PSNStoreBudget()
+        with mock.patch('redis.StrictRedis.from_url') as from_url_mock, mock.patch('time.time', return_value=100.0):
+            from_url_mock.return_value.pipeline.return_value.__enter__.return_value.watch.side_effect = redis.TimeoutError("Timeout reading from socket")
+            # Requests are spaced by the interval of the old per-game sleep, by this worker alone.
+            self.assertEqual(psn_store_budget.reserve(1), 0.0)
+            self.assertEqual(psn_store_budget.reserve(2), PSN_STORE_BUDGET_DEFAULT_INTERVAL)
+            # Redis is connected to with short timeouts, and isn't used again for a while after it fails.
+            self.assertEqual(from_url_mock.call_args[1], {'socket_timeout': PSN_STORE_BUDGET_REDIS_TIMEOUT_SECONDS, 'socket_connect_timeout': PSN_STORE_BUDGET_REDIS_TIMEOUT_SECONDS})
+            self.assertEqual(from_url_mock.return_value.pipeline.call_count, 1)
+
+            with mock.patch('time.monotonic', return_value=time.monotonic() + PSN_STORE_BUDGET_REDIS_BACKOFF_SECONDS):
+                psn_store_budget.reserve(1)
+            self.assertEqual(from_url_mock.return_value.pipeline.call_count, 2)
+
+    @override_settings(PSN_STORE_BUDGET_INTERVAL=0.5)
+    def test_interval_setting(self):
+        self.assertEqual(PSNStoreBudget().get_interval(), 0.5)
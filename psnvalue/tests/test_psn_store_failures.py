@@ -0,0 +1,22 @@
+import datetime
+from types import SimpleNamespace
+from django.test import SimpleTestCase
+from ..psn_store_failures import get_listing_fingerprint, get_retry_delay, is_quarantined, get_skipped_game_ids
+
+class PSNStoreFailuresTestCase(SimpleTestCase):
+
+    TEST_NOW = datetime.datetime(2017, 6, 1, 12, 0, 0)
+
+    def test_get_retry_delay(self):
+        self.assertEqual([get_retry_delay(attempt_count).days for attempt_count in range(1, 6)], [1, 2, 4, 7, 7])
+        self.assertEqual([is_quarantined(attempt_count) for attempt_count in range(3, 7)], [False, False, True, True])
+
+    def test_get_skipped_game_ids(self):
+        games_json = [{'id': "due"}, {'id': "backing_off"}, {'id': "quarantined"}, {'id': "relisted", 'name': "Changed"}, {'id': "ok"}]
+        store_entry_failures = {
+            "due": SimpleNamespace(game_id="due", quarantined=False, next_attempt_at=self.TEST_NOW, listing_fingerprint=''),
+            "backing_off": SimpleNamespace(game_id="backing_off", quarantined=False, next_attempt_at=self.TEST_NOW + datetime.timedelta(days=1), listing_fingerprint=''),
+            "quarantined": SimpleNamespace(game_id="quarantined", quarantined=True, next_attempt_at=self.TEST_NOW, listing_fingerprint=get_listing_fingerprint({'id': "quarantined"})),
+            "relisted": SimpleNamespace(game_id="relisted", quarantined=True, next_attempt_at=self.TEST_NOW, listing_fingerprint=get_listing_fingerprint({'id': "relisted"})),
+        }
+        self.assertEqual(get_skipped_game_ids(games_json, store_entry_failures, self.TEST_NOW), {"backing_off", "quarantined"})
@@ -0,0 +1,62 @@
+import time
+import threading
+from unittest import mock
+from django.test import SimpleTestCase
+from ..psn_sync_pipeline import bounded_stage, batched
+
+class PSNSyncPipelineTestCase(SimpleTestCase):
+
+    TEST_QUEUE_SIZE = 3
+
+    def test_bounded_stage_backpressure(self):
+        produced = []
+
+        def produce():
+            for item in range(20):
+                produced.append(item)
+                yield item
+
+        stage = bounded_stage(produce(), self.TEST_QUEUE_SIZE)
+        self.assertEqual(next(stage), 0)
+        time.sleep(0.1)
+        # The stage is blocked once the queue is full, holding at most one more item.
+        self.assertLessEqual(len(produced), 1 + self.TEST_QUEUE_SIZE + 1)
+        self.assertEqual(list(stage), list(range(1, 20)))
+
+    def test_bounded_stage_exception(self):
+        def produce():
+            yield 1
+            raise IOError("Store unavailable")
+
+        stage = bounded_stage(produce(), self.TEST_QUEUE_SIZE)
+        self.assertEqual(next(stage), 1)
+        with self.assertRaises(IOError):
+            next(stage)
+
+    def test_bounded_stage_closed_early(self):
+        stage = bounded_stage(iter(range(100)), self.TEST_QUEUE_SIZE)
+        self.assertEqual(next(stage), 0)
+        # Closing the pipeline stops the stage's thread.
+        stage.close()
+
+    def test_bounded_stage_closed_during_slow_item(self):
+        item_released = threading.Event()
+
+        def produce():
+            yield 1
+            # A chunk of items that takes far longer than the close timeout to arrive.
+            item_released.wait(10)
+            yield 2
+
+        stage = bounded_stage(produce(), self.TEST_QUEUE_SIZE)
+        self.assertEqual(next(stage), 1)
+        close_start = time.monotonic()
+        with mock.patch('psnvalue.psn_sync_pipeline.PIPELINE_CLOSE_TIMEOUT', 0.1):
+            stage.close()
+        # Closing doesn't wait for the slow item, which the stage drops once it arrives.
+        self.assertLess(time.monotonic() - close_start, 5)
+        item_released.set()
+
+    def test_batched(self):
+        self.assertEqual(list(batched(range(7), 3)), [[0, 1, 2], [3, 4, 5], [6]])
+        self.assertEqual(list(batched([], 3)), [])
@@ -0,0 +1,110 @@
+import os
+import json
+from unittest import mock
+from django.test import TestCase, override_settings
+from django.core.cache import cache
+from django.urls import reverse
+from ..models import Library, GameList
+from ..psn_library import PSNLibrary
+from ..psn_game_snapshot import GameSnapshot
+from .query_budget import QueryBudgetMixin, PAGE_CACHE_TEST_CACHES
+
+@override_settings(CACHES=PAGE_CACHE_TEST_CACHES)
+class QueryBudgetTestCase(QueryBudgetMixin, TestCase):
+    """
+    Query budgets of the sync and view operations. An operation going over its budget usually means a query
+    has been added to a per game path (N+1), which should be batched instead.
+    """
+
+    TEST_URL = "test_url"
+    TEST_GAME_COUNT = 100
+    DARK_SOULS_III_FILENAME = 'test_data/DarkSoulsIII_FullGame.json'
+
+    # Queries per game of a sync adding new games, including a new title with two content descriptors. The title
+    # is inserted in a savepoint, so a title added concurrently by another region's sync is fetched instead.
+    SYNC_NEW_GAME_QUERIES = 25
+    # Queries per game of a sync updating existing games.
+    SYNC_EXISTING_GAME_QUERIES = 3
+    # Queries per sync, whatever the number of games e.g. scoring and rolling up the price history, and per write batch.
+    SYNC_LIBRARY_QUERIES = 30
+
+    def setUp(self):
+        # Pages are rendered, not served from a page cache left by another test.
+        cache.clear()
+        self.TEST_LIBRARY = Library.objects.create(library_name="test_lib", library_url=self.TEST_URL, library_rating_stdev=0.8, library_rating_mean=4.0)
+        with open(os.path.join(os.path.dirname(__file__), self.DARK_SOULS_III_FILENAME)) as data_file:
+            game_snapshot = GameSnapshot.from_json(json.load(data_file))
+        self.GAME_SNAPSHOTS = {}
+        for game_index in range(self.TEST_GAME_COUNT):
+            game_id = "game-" + str(game_index)
+            self.GAME_SNAPSHOTS[game_id] = game_snapshot._replace(game_id=game_id, title_key=game_id, game_name="Game " + str(game_index), rating=4.0 + game_index / 100)
+        self.LIBRARY_JSON = {'links': [
+            {'id': game_id, 'name': game_snapshot.game_name, 'url': game_id, 'release_date': '2016-04-12T00:00:00Z', 'default_sku': {'price': game_snapshot.price}}
+            for game_id, game_snapshot in self.GAME_SNAPSHOTS.items()
+        ]}
+
+    def sync_library(self, psn_library):
+        with mock.patch.object(psn_library.psn_store_api, 'request_psn_game_json', side_effect=lambda url, library_id: self.GAME_SNAPSHOTS[url]), \
+                mock.patch.object(psn_library, 'upload_thumb_to_cloudinary', return_value=self.TEST_URL):
+            psn_library.update_psn_library(self.TEST_LIBRARY, self.LIBRARY_JSON)
+
+    def test_sync_new_games(self):
+        with self.assertMaxQueries(self.SYNC_NEW_GAME_QUERIES * self.TEST_GAME_COUNT + self.SYNC_LIBRARY_QUERIES):
+            self.sync_library(PSNLibrary())
+
+    def test_sync_existing_games(self):
+        psn_library = PSNLibrary()
+        self.sync_library(psn_library)
+        with self.assertMaxQueries(self.SYNC_EXISTING_GAME_QUERIES * self.TEST_GAME_COUNT + self.SYNC_LIBRARY_QUERIES):
+            self.sync_library(psn_library)
+
+    def test_add_and_update_game(self):
+        psn_library = PSNLibrary()
+        self.sync_library(psn_library)
+        game_snapshot = self.GAME_SNAPSHOTS["game-0"]
+        # A new offer of an existing title
+        us_library = Library.objects.create(library_name="us_lib", library_url=self.TEST_URL, library_rating_stdev=0.8, library_rating_mean=4.0)
+        with self.assertMaxQueries(9):
+            psn_library.add_game(us_library, game_snapshot, self.TEST_URL)
+        game = GameList.objects.get(game_id="game-0", library_fk=us_library)
+        with self.assertMaxQueries(4):
+            psn_library.update_game(us_library, game_snapshot._replace(plus_price=999), game)
+
+    def test_game_list_pages(self):
+        self.sync_library(PSNLibrary())
+        GameList.objects.update(rating_count=100, price=1999)
+        # The content descriptors, the count of games and the page of games
+        with self.assertMaxQueries(3):
+            self.client.get(reverse('psnvalue:gamelist', args=[self.TEST_LIBRARY.id]), {'with_content': "Online"})
+        with self.assertMaxQueries(3):
+            self.client.get(reverse('psnvalue:search', args=[self.TEST_LIBRARY.id]), {'q': "Game"})
+        with self.assertMaxQueries(1):
+            self.client.get(reverse('psnvalue:index'))
+
+
+class PageCacheQueryBudgetTestCase(QueryBudgetMixin, TestCase):
+    """
+    Query budgets of the cached pages, on the configured cache backend. The page cache is a DatabaseCache in
+    production, so reading and writing a cached page are queries too.
+    """
+
+    TEST_URL = "test_url"
+
+    # Queries to read a page from the page cache (on a DatabaseCache).
+    PAGE_CACHE_GET_QUERIES = 1
+    # Queries to write a page to the page cache (on a DatabaseCache), in a savepoint, culling expired pages.
+    PAGE_CACHE_SET_QUERIES = 5
+
+    def setUp(self):
+        cache.clear()
+        self.TEST_LIBRARY = Library.objects.create(library_name="test_lib", library_url=self.TEST_URL)
+        GameList.objects.create(game_id="valuable", game_name="Valuable Game", json_url=self.TEST_URL, library_fk=self.TEST_LIBRARY, price=1999, rating_count=100)
+
+    def test_cached_game_list_page(self):
+        gamelist_path = reverse('psnvalue:gamelist', args=[self.TEST_LIBRARY.id])
+        # The cache miss, the content descriptors, the count of games, the page of games and the cache write
+        with self.assertMaxQueries(self.PAGE_CACHE_GET_QUERIES + 3 + self.PAGE_CACHE_SET_QUERIES):
+            self.client.get(gamelist_path)
+        with self.assertMaxQueries(self.PAGE_CACHE_GET_QUERIES):
+            response = self.client.get(gamelist_path)
+        self.assertContains(response, "Valuable Game")
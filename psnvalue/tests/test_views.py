@@ -0,0 +1,220 @@
+from unittest import mock
+from unittest import skipUnless
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase, modify_settings, override_settings
+from django.core.cache import cache
+from django.contrib.auth.models import User
+from django.urls import reverse
+from ..models import Library, GameTitle, GameList, ContentDescriptors, TitleContent, GameScore, SyncRun, SyncRunLibrary, SYNC_STATUS_RUNNING
+from ..views import IndexView, MetricsView
+from ..search import search_games
+from ..middleware import ViewTimingMiddleware
+from ..db_router import ReplicaRouter, REPLICA_DATABASE, PRIMARY_DATABASE
+from .query_budget import PAGE_CACHE_TEST_CACHES
+from ..psn_scoring import SCORING_MODELS, ScoringModelV1
+
+# Create your tests here.
+@override_settings(CACHES=PAGE_CACHE_TEST_CACHES)
+class GameListViewTestCase(TestCase):
+    # The views read through the test replica, mirroring the default database.
+    multi_db = True
+
+    TEST_LIBRARY_NAME = "test_lib"
+    TEST_URL = "test_url"
+
+    def setUp(self):
+        # Pages are rendered, not served from a page cache left by another test.
+        cache.clear()
+        self.TEST_LIBRARY = Library.objects.create(library_name=self.TEST_LIBRARY_NAME, library_url=self.TEST_URL)
+        self.CHEAP_GAME = GameList.objects.create(game_id="cheap", game_name="Cheap Game", json_url=self.TEST_URL, age_rating=12, library_fk=self.TEST_LIBRARY, price=999, plus_price=499, plus_discount=50, rating_count=100, plus_value_score=200)
+        self.VALUABLE_GAME = GameList.objects.create(game_id="valuable", game_name="Valuable Game", json_url=self.TEST_URL, age_rating=18, library_fk=self.TEST_LIBRARY, price=6999, plus_price=6999, rating_count=100, plus_value_score=300)
+        self.ONLINE_CONTENT = ContentDescriptors.objects.create(content_name="Online", content_description="Online", content_bit=0)
+        self.VIOLENCE_CONTENT = ContentDescriptors.objects.create(content_name="Violence", content_description="Violence", content_bit=1)
+        GameList.objects.filter(pk=self.CHEAP_GAME.pk).update(content_mask=self.ONLINE_CONTENT.get_content_mask())
+        GameList.objects.filter(pk=self.VALUABLE_GAME.pk).update(content_mask=self.ONLINE_CONTENT.get_content_mask() | self.VIOLENCE_CONTENT.get_content_mask())
+        self.UNRATED_GAME = GameList.objects.create(game_id="unrated", game_name="Unrated Game", json_url=self.TEST_URL, age_rating=3, library_fk=self.TEST_LIBRARY, price=999, plus_price=999, rating_count=0, plus_value_score=900)
+
+    def get_game_list(self, **query):
+        response = self.client.get(reverse('psnvalue:gamelist', args=[self.TEST_LIBRARY.id]), query)
+        self.assertEqual(response.status_code, 200)
+        return list(response.context['game_list'])
+
+    def test_default_sort(self):
+        self.assertEqual(self.get_game_list(), [self.VALUABLE_GAME, self.CHEAP_GAME])
+
+    def test_sort_by_price(self):
+        self.assertEqual(self.get_game_list(sort='price'), [self.CHEAP_GAME, self.VALUABLE_GAME])
+
+    @skipUnless(REPLICA_DATABASE in settings.DATABASES, "Needs the test replica")
+    def test_reads_from_replica(self):
+        self.client.force_login(User.objects.create_user(username='visitor'))
+        read_databases = {}
+        db_for_read = ReplicaRouter.db_for_read
+
+        def record_db_for_read(router, model, **hints):
+            read_databases[model._meta.db_table] = db_for_read(router, model, **hints)
+            return read_databases[model._meta.db_table]
+
+        with mock.patch.object(ReplicaRouter, 'db_for_read', record_db_for_read):
+            self.assertEqual(self.get_game_list(), [self.VALUABLE_GAME, self.CHEAP_GAME])
+            # The index page checks whether the user is staff.
+            self.assertEqual(self.client.get(reverse('psnvalue:index')).status_code, 200)
+        self.assertEqual(read_databases['psnvalue_gamelist'], REPLICA_DATABASE)
+        # The session and user are read from the primary, not the replica.
+        self.assertEqual(read_databases['django_session'], PRIMARY_DATABASE)
+        self.assertEqual(read_databases['auth_user'], PRIMARY_DATABASE)
+
+    def test_sort_by_shadow_scoring_model(self):
+        GameScore.objects.create(game_id_fk=self.CHEAP_GAME, model_version='v1', plus_value_score=400)
+        GameScore.objects.create(game_id_fk=self.VALUABLE_GAME, model_version='v1', plus_value_score=100)
+
+        # The production version is served from GameList itself, whatever is in GameScore.
+        self.assertEqual(self.get_game_list(scoring='v1'), [self.VALUABLE_GAME, self.CHEAP_GAME])
+
+        GameScore.objects.filter(model_version='v1').update(model_version='shadow')
+        with mock.patch.dict(SCORING_MODELS, {'shadow': ScoringModelV1()}):
+            game_list = self.get_game_list(scoring='shadow')
+        self.assertEqual(game_list, [self.CHEAP_GAME, self.VALUABLE_GAME])
+        self.assertEqual(game_list[0].score_plus_value, 400)
+
+    def test_filter_by_age_rating(self):
+        self.assertEqual(self.get_game_list(max_age=16), [self.CHEAP_GAME])
+
+    def test_filter_by_min_ratings(self):
+        self.assertEqual(self.get_game_list(min_ratings=0), [self.UNRATED_GAME, self.VALUABLE_GAME, self.CHEAP_GAME])
+
+    def test_filter_with_content(self):
+        self.assertEqual(self.get_game_list(with_content=["Online", "Violence"]), [self.VALUABLE_GAME])
+
+    def test_filter_without_content(self):
+        self.assertEqual(self.get_game_list(without_content=["Violence"]), [self.CHEAP_GAME])
+
+    def test_filter_content_without_bit(self):
+        # Content descriptors past the last bit of the bitmask are filtered on the title's content.
+        blood_content = ContentDescriptors.objects.create(content_name="Blood", content_description="Blood", content_bit=None)
+        title = GameTitle.objects.create(title_key="valuable", title_name="Valuable Game")
+        TitleContent.objects.create(title_fk=title, content_descriptor_fk=blood_content)
+        GameList.objects.filter(pk=self.VALUABLE_GAME.pk).update(title_fk=title)
+
+        self.assertEqual(self.get_game_list(with_content=["Blood"]), [self.VALUABLE_GAME])
+        self.assertEqual(self.get_game_list(without_content=["Blood"]), [self.CHEAP_GAME])
+
+    def test_invalid_filter_uses_default(self):
+        # Only the invalid option falls back to its default.
+        self.assertEqual(self.get_game_list(sort='unknown', max_age=16), [self.CHEAP_GAME])
+        self.assertEqual(self.get_game_list(sort='price', max_age='old'), [self.CHEAP_GAME, self.VALUABLE_GAME])
+
+    def test_search(self):
+        GameList.objects.filter(pk=self.VALUABLE_GAME.pk).update(game_name="VALUABLE GAME™", game_name_normalized="valuable game")
+        GameList.objects.filter(pk=self.CHEAP_GAME.pk).update(game_name="Valuable®", game_name_normalized="valuable")
+
+        response = self.client.get(reverse('psnvalue:search', args=[self.TEST_LIBRARY.id]), {'q': 'Valuable™'})
+        self.assertEqual(list(response.context['game_list']), [self.CHEAP_GAME, self.VALUABLE_GAME])
+
+        response = self.client.get(reverse('psnvalue:search', args=[self.TEST_LIBRARY.id]), {'q': 'valuable  G'})
+        self.assertEqual(list(response.context['game_list']), [self.VALUABLE_GAME])
+
+    def test_search_by_shadow_scoring_model(self):
+        GameScore.objects.create(game_id_fk=self.CHEAP_GAME, model_version='shadow', plus_value_score=400)
+        GameScore.objects.create(game_id_fk=self.VALUABLE_GAME, model_version='shadow', plus_value_score=100)
+        GameList.objects.filter(pk__in=[self.CHEAP_GAME.pk, self.VALUABLE_GAME.pk]).update(game_name_normalized="valuable game")
+
+        # Games that match equally well are ranked by the selected scoring model's value scores.
+        with mock.patch.dict(SCORING_MODELS, {'shadow': ScoringModelV1()}):
+            response = self.client.get(reverse('psnvalue:search', args=[self.TEST_LIBRARY.id]), {'q': 'valuable', 'scoring': 'shadow'})
+        self.assertEqual(list(response.context['game_list']), [self.CHEAP_GAME, self.VALUABLE_GAME])
+
+    @skipUnless(connection.vendor != 'postgresql', "PostgreSQL searches by trigram")
+    def test_search_by_prefix_range(self):
+        GameList.objects.filter(pk=self.VALUABLE_GAME.pk).update(game_name_normalized="valuable \U0001f3ae")
+        GameList.objects.filter(pk=self.CHEAP_GAME.pk).update(game_name_normalized="valuabl")
+        games = search_games(GameList.objects.all(), "Valuable")
+
+        # A range on the normalized name index, rather than a LIKE which can't use it on SQLite.
+        self.assertNotIn('LIKE', str(games.query))
+        self.assertEqual(list(games), [self.VALUABLE_GAME])
+
+@override_settings(CACHES=PAGE_CACHE_TEST_CACHES)
+class IndexViewTestCase(TestCase):
+    # The views read through the test replica.
+    multi_db = True
+
+    TEST_URL = "test_url"
+
+    def setUp(self):
+        cache.clear()
+        self.TEST_LIBRARY = Library.objects.create(library_name="test_lib", library_url=self.TEST_URL, game_count=200, stale_game_count=50)
+        sync_run = SyncRun.objects.create()
+        SyncRunLibrary.objects.create(sync_run_fk=sync_run, library_fk=self.TEST_LIBRARY, status=SYNC_STATUS_RUNNING, games_total=200, games_processed=50)
+        self.STORE_METRICS = {'request_count': 100, 'latency_percentiles': [(50, '250'), (90, '500'), (99, '2500')], 'error_counts': [('HTTP 503', 3)]}
+
+    def test_dashboard(self):
+        User.objects.create_user("admin", password="password", is_staff=True)
+        self.client.login(username="admin", password="password")
+        # The dashboard reads the pre-aggregated metrics, without scanning the games.
+        with mock.patch.object(IndexView.psn_metrics, 'get_store_metrics', return_value=self.STORE_METRICS), self.assertNumQueries(5):
+            response = self.client.get(reverse('psnvalue:index'))
+        self.assertContains(response, "50 / 200 (25%)")
+        self.assertContains(response, "p99 2500")
+        self.assertContains(response, "HTTP 503: 3")
+        self.assertContains(response, "50 (25%)")
+
+    def test_no_dashboard_for_users(self):
+        with mock.patch.object(IndexView.psn_metrics, 'get_store_metrics') as get_store_metrics_mock:
+            response = self.client.get(reverse('psnvalue:index'))
+        self.assertNotContains(response, "Latest sync")
+        self.assertFalse(get_store_metrics_mock.called)
+
+@override_settings(CACHES=PAGE_CACHE_TEST_CACHES)
+@modify_settings(MIDDLEWARE={'prepend': 'psnvalue.middleware.ViewTimingMiddleware'})
+class ViewTimingMiddlewareTestCase(TestCase):
+    # The views read through the test replica.
+    multi_db = True
+
+    def setUp(self):
+        cache.clear()
+        Library.objects.create(library_name="test_lib", library_url="test_url")
+
+    def test_record_view_request(self):
+        with mock.patch.object(ViewTimingMiddleware.psn_metrics, 'record_view_request') as record_view_request_mock:
+            response = self.client.get(reverse('psnvalue:index'))
+        view_name, latency_seconds, db_seconds, query_count, template_seconds = record_view_request_mock.call_args[0]
+        self.assertEqual(view_name, 'psnvalue:index')
+        self.assertEqual(query_count, 1)
+        self.assertGreaterEqual(latency_seconds, template_seconds)
+        self.assertNotIn('Server-Timing', response)
+
+    @override_settings(DEBUG=True)
+    def test_server_timing(self):
+        with mock.patch.object(ViewTimingMiddleware.psn_metrics, 'record_view_request'):
+            response = self.client.get(reverse('psnvalue:index'))
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('desc="1 queries"', response['Server-Timing'])
+        self.assertIn('template;dur=', response['Server-Timing'])
+
+    def test_query_count_nested_in_capture(self):
+        # The middleware's query logging doesn't disturb tests counting queries.
+        with mock.patch.object(ViewTimingMiddleware.psn_metrics, 'record_view_request'), self.assertNumQueries(1):
+            self.client.get(reverse('psnvalue:index'))
+
+    def test_metrics_view(self):
+        User.objects.create_user("admin", password="password", is_staff=True)
+        self.client.login(username="admin", password="password")
+        view_metrics = [{'view_name': 'psnvalue:index', 'request_count': 1}]
+        with mock.patch.object(ViewTimingMiddleware.psn_metrics, 'record_view_request'), \
+                mock.patch.object(MetricsView.psn_metrics, 'get_view_metrics', return_value=view_metrics), \
+                mock.patch.object(MetricsView.psn_metrics, 'get_store_metrics', return_value=None):
+            response = self.client.get(reverse('psnvalue:metrics'))
+        self.assertEqual(response.json(), {'views': view_metrics, 'store': None})
+
+    @override_settings(PSN_METRICS_TOKEN="secret")
+    def test_metrics_view_token(self):
+        metrics_path = reverse('psnvalue:metrics')
+        with mock.patch.object(ViewTimingMiddleware.psn_metrics, 'record_view_request'), \
+                mock.patch.object(MetricsView.psn_metrics, 'get_view_metrics', return_value=[]), \
+                mock.patch.object(MetricsView.psn_metrics, 'get_store_metrics', return_value=None):
+            # A scraper is authorized by the token, without an admin session.
+            self.assertEqual(self.client.get(metrics_path, HTTP_AUTHORIZATION="Bearer secret").status_code, 200)
+            self.assertEqual(self.client.get(metrics_path, HTTP_AUTHORIZATION="Bearer wrong").status_code, 404)
+            self.assertEqual(self.client.get(metrics_path).status_code, 404)
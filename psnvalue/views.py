@@ -1,9 +1,19 @@
+import hmac
+from collections import OrderedDict
+from django.conf import settings
 from django.views import generic
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import redirect
 from django.http import Http404
+from django.db.models import F
+from django.core.cache import cache
 
-from .models import Library, GameList
-from .tasks import task_sync_psn_library_with_psn_store, task_update_psn_weighted_ratings, task_update_psn_game_thumbnails
+from .models import Library, GameList, SyncRun, GAMELIST_MIN_RATING_COUNT, GAMELIST_MIN_PRICE
+from .forms import GameListFilterForm, GAMELIST_SORT_OPTIONS, GAMELIST_DEFAULT_SORT
+from .search import search_games, GAME_SEARCH_ORDER_BY
+from .psn_scoring import SCORING_PRODUCTION_VERSION
+from .psn_metrics import PSNMetrics, METRICS_STALE_GAME_AGE
+from .psn_cache_priming import get_page_cache_key, get_page_cache_timeout, cache_rendered_page, PAGE_CACHE_PRIME_ATTR
 
 # Library homepage for admin user.
 INDEX_TEMPLATE_ADMIN = 'psnvalue/index_admin.html'
@@ -11,6 +21,11 @@ INDEX_TEMPLATE_ADMIN = 'psnvalue/index_admin.html'
 INDEX_TEMPLATE_USER = 'psnvalue/index.html'
 # Context object name for library list - used in the HTML.
 INDEX_CON = 'library_list'
+# Context object names for the admin dashboard - used in the HTML.
+INDEX_SYNC_RUN_CON = 'sync_run'
+INDEX_SYNC_RUN_LIBRARIES_CON = 'sync_run_libraries'
+INDEX_STORE_METRICS_CON = 'store_metrics'
+INDEX_STALE_GAME_DAYS_CON = 'stale_game_days'
 
 # Game list template page
 GAMELIST_TEMPLATE = 'psnvalue/gamelist.html'
@@ -18,23 +33,80 @@ GAMELIST_TEMPLATE = 'psnvalue/gamelist.html'
 GAMELIST_CON = 'game_list'
 # The number of games to display on each page of results.
 GAMELIST_GAMES_PER_PAGE = 40
-# The minimum number of ratings needed by a game to be displayed.
-GAMELIST_MIN_RATING_COUNT = 50
-# The minimum price of a game to be displayed (used to exclude free to play).
-GAMELIST_MIN_PRICE = 1
 # The parameter name for the library id to display games for.
 GAMELIST_LIBRARY_ID_PARAM = 'library_id'
-# The ordering of results for the game list.
-GAMELIST_ORDER_BY = '-plus_value_score'
+# The query string parameter for the page number of the game list.
+GAMELIST_PAGE_PARAM = 'page'
+# Context object name for the game list sort and filter form - used in the HTML.
+GAMELIST_FILTER_FORM_CON = 'filter_form'
+# Game fields that are scored by the scoring model, and their annotation names for the selected scoring model - used in the HTML.
+GAMELIST_SCORE_FIELDS = OrderedDict([
+    ('weighted_rating', 'score_weighted_rating'),
+    ('base_value_score', 'score_base_value'),
+    ('plus_value_score', 'score_plus_value'),
+])
+# Prefix of the score fields of shadow scoring models (see GameScore).
+GAMELIST_SHADOW_SCORE_PREFIX = 'gamescore__'
+# The query string parameter an admin user sets to 1 to profile the task started by a view (see psn_profiling).
+VIEW_PROFILE_PARAM = 'profile'
+# Prefix of the Authorization header sent by a monitoring scraper, before the metrics token (settings.PSN_METRICS_TOKEN).
+METRICS_TOKEN_PREFIX = 'Bearer '
 
-class IndexView(generic.ListView):
+class PageCacheMixin:
+    """
+    Serve the default view of a page from the page cache, which is primed after each sync and rescore (see psn_cache_priming).
+
+    Only GET requests with no query string other than the page number are cached, so sorted, filtered and
+    searched pages are always rendered.
+    """
+    # The URL name of the view, used in its cache keys, or None if the view isn't cached.
+    page_cache_url_name = None
+
+    def get(self, request, *args, **kwargs):
+        cache_key = self.get_page_cache_key()
+        if cache_key == None:
+            return super().get(request, *args, **kwargs)
+        if not getattr(request, PAGE_CACHE_PRIME_ATTR, False):
+            cached_content = cache.get(cache_key)
+            if cached_content != None:
+                return HttpResponse(cached_content)
+        response = super().get(request, *args, **kwargs)
+        response.add_post_render_callback(cache_rendered_page(cache_key, get_page_cache_timeout(request)))
+        return response
+
+    def is_page_cacheable(self):
+        """
+        Check if the request is for the default view of the page.
+        """
+        return set(self.request.GET) <= {GAMELIST_PAGE_PARAM} and self.request.GET.get(GAMELIST_PAGE_PARAM, '1').isdigit()
+
+    def get_page_cache_key(self):
+        """
+        Get the cache key of the page, or None if the request isn't cacheable.
+        """
+        if self.page_cache_url_name == None or not self.is_page_cacheable():
+            return None
+        return get_page_cache_key(self.page_cache_url_name, self.kwargs.get(GAMELIST_LIBRARY_ID_PARAM), self.request.GET.get(GAMELIST_PAGE_PARAM, '1'))
+
+class IndexView(PageCacheMixin, generic.ListView):
     """
     Game library homepage view.
 
     Displays the list of game libraries and the date of last update for each library. If the admin
-    user is logged in, a link will be displayed to allow for a manual update of a library.
+    user is logged in, a link will be displayed to allow for a manual update of a library, along with
+    a dashboard of the latest sync and the health of each library.
     """
     context_object_name = INDEX_CON
+    # Served from the read replica (see ReadReplicaMiddleware)
+    read_from_replica = True
+    page_cache_url_name = 'index'
+    psn_metrics = PSNMetrics()
+
+    def is_page_cacheable(self):
+        """
+        Only cache the page of regular users, as admin users see the dashboard.
+        """
+        return super().is_page_cacheable() and not self.request.user.is_staff
 
     def get_template_names(self):
         """
@@ -51,23 +123,250 @@ class IndexView(generic.ListView):
         """
         return Library.objects.all()
 
-class GameListView(generic.ListView):
+    def get_context_data(self, **kwargs):
+        """
+        Add the dashboard to the context for admin users.
+
+        The dashboard only reads pre-aggregated metrics, so stays cheap however big the libraries are: the
+        progress of the latest sync run, today's PSN store metrics and the freshness stored on each library.
+        """
+        context = super().get_context_data(**kwargs)
+        if self.request.user.is_staff:
+            sync_run = SyncRun.objects.order_by('-started_at').first()
+            context[INDEX_SYNC_RUN_CON] = sync_run
+            context[INDEX_SYNC_RUN_LIBRARIES_CON] = sync_run.syncrunlibrary_set.select_related('library_fk') if sync_run != None else []
+            context[INDEX_STORE_METRICS_CON] = self.psn_metrics.get_store_metrics()
+            context[INDEX_STALE_GAME_DAYS_CON] = METRICS_STALE_GAME_AGE.days
+        return context
+
+class GameListView(PageCacheMixin, generic.ListView):
     """
     Game list view.
 
     View used for displaying the list of games, and their details, from the library. Results are paginated.
+    The sort order and filters can be selected with query string parameters (see GameListFilterForm).
     """
     template_name = GAMELIST_TEMPLATE
     context_object_name = GAMELIST_CON
     paginate_by = GAMELIST_GAMES_PER_PAGE
+    # Served from the read replica (see ReadReplicaMiddleware)
+    read_from_replica = True
+    page_cache_url_name = 'gamelist'
+
+    def get_filter_form(self):
+        """
+        Get the sort and filter form, bound to the query string.
+        """
+        if not hasattr(self, 'filter_form'):
+            self.filter_form = GameListFilterForm(self.request.GET)
+        return self.filter_form
+
+    def get_filters(self):
+        """
+        Get the valid sort and filter options from the query string.
+
+        An invalid option falls back to its default, keeping the other valid options.
+        """
+        filter_form = self.get_filter_form()
+        # Cleaning drops the invalid options from cleaned_data, leaving the valid ones
+        filter_form.is_valid()
+        return filter_form.cleaned_data
 
     def get_queryset(self):
         """
         Get ordered and filtered list of Games.
 
-        Filter games based on library id, count of ratings and price. Order by PS Plus value score.
+        Filter games based on library id, count of ratings, price, age rating and content descriptors.
+        Order by the selected sort option, PS Plus value score by default.
+        """
+        filters = self.get_filters()
+        return self.get_filtered_games(filters).order_by(self.get_ordering_field(filters))
+
+    def get_ordering_field(self, filters):
+        """
+        Get the field to order the game list by, for the selected sort option and scoring model.
+        """
+        return get_scoring_ordering(GAMELIST_SORT_OPTIONS[filters.get('sort') or GAMELIST_DEFAULT_SORT][1], filters)
+
+    def get_filtered_games(self, filters):
+        """
+        Get the unordered list of Games matching the filters.
+        """
+        min_rating_count = filters.get('min_ratings')
+        # The title is selected with the game, for its shared thumbnail.
+        games = GameList.objects.select_related('title_fk').filter(library_fk=self.kwargs[GAMELIST_LIBRARY_ID_PARAM], rating_count__gte=GAMELIST_MIN_RATING_COUNT if min_rating_count == None else min_rating_count, price__gte=GAMELIST_MIN_PRICE)
+
+        if filters.get('max_age') != None:
+            games = games.filter(age_rating__lte=filters['max_age'])
+        if filters.get('min_price') != None:
+            games = games.filter(plus_price__gte=filters['min_price'])
+        if filters.get('max_price') != None:
+            games = games.filter(plus_price__lte=filters['max_price'])
+        # Content descriptor filters are a single predicate on the content descriptor bitmask, with no joins.
+        with_content = filters.get('with_content', [])
+        with_content_mask = get_content_mask(with_content)
+        if with_content_mask:
+            games = games.annotate(with_content=F('content_mask').bitand(with_content_mask)).filter(with_content=with_content_mask)
+        without_content = filters.get('without_content', [])
+        without_content_mask = get_content_mask(without_content)
+        if without_content_mask:
+            games = games.annotate(without_content=F('content_mask').bitand(without_content_mask)).filter(without_content=0)
+        # Content descriptors past the last bit of the bitmask have no bit, so are filtered on the title's content.
+        for content_descriptor in get_unmasked_content(with_content):
+            games = games.filter(title_fk__titlecontent__content_descriptor_fk=content_descriptor)
+        unmasked_without_content = get_unmasked_content(without_content)
+        if unmasked_without_content:
+            games = games.exclude(title_fk__titlecontent__content_descriptor_fk__in=unmasked_without_content)
+
+        # Scores are served from the selected scoring model, GameList itself holding the production scores.
+        score_prefix = ''
+        scoring_version = get_scoring_version(filters)
+        if scoring_version != SCORING_PRODUCTION_VERSION:
+            games = games.filter(gamescore__model_version=scoring_version)
+            score_prefix = GAMELIST_SHADOW_SCORE_PREFIX
+        return games.annotate(**{score_name: F(score_prefix + field_name) for field_name, score_name in GAMELIST_SCORE_FIELDS.items()})
+
+    def get_context_data(self, **kwargs):
+        """
+        Add the sort and filter form, and the links for each sort option, to the context.
+
+        The query string of each link keeps the current filters, so that sorting and paging don't reset them.
+        """
+        context = super().get_context_data(**kwargs)
+        query = self.request.GET.copy()
+        query.pop(GAMELIST_PAGE_PARAM, None)
+        context[GAMELIST_FILTER_FORM_CON] = self.get_filter_form()
+        context['filter_query'] = query.urlencode()
+        context['current_sort'] = self.get_filters().get('sort') or GAMELIST_DEFAULT_SORT
+
+        sort_links = []
+        for sort, sort_option in GAMELIST_SORT_OPTIONS.items():
+            query['sort'] = sort
+            sort_links.append((sort_option[0], query.urlencode(), sort == context['current_sort']))
+        context['sort_links'] = sort_links
+        return context
+
+class GameSearchView(GameListView):
+    """
+    Game search view.
+
+    View used for searching the games in the library by name. Results are filtered in the same way as the
+    game list, but are ranked by how well they match the search text and then by PS Plus value score, from
+    the selected scoring model.
+    """
+    page_cache_url_name = None
+
+    def get_queryset(self):
+        """
+        Get the filtered list of Games matching the search text, best match first.
         """
-        return GameList.objects.filter(library_fk=self.kwargs[GAMELIST_LIBRARY_ID_PARAM], rating_count__gte=GAMELIST_MIN_RATING_COUNT, price__gte=GAMELIST_MIN_PRICE).order_by(GAMELIST_ORDER_BY)
+        filters = self.get_filters()
+        return search_games(self.get_filtered_games(filters), filters.get('q') or '', get_scoring_ordering(GAME_SEARCH_ORDER_BY, filters))
+
+class MetricsView(generic.View):
+    """
+    Metrics view, for scraping by monitoring or reading directly.
+
+    Returns today's metrics of requests to each view (recorded by ViewTimingMiddleware) and to the PSN store,
+    as JSON. Latencies are the upper bounds of the histogram buckets, in milliseconds. Only available to an
+    admin user, or to a scraper sending the metrics token as "Authorization: Bearer <token>".
+    """
+    psn_metrics = PSNMetrics()
+
+    def get(self, request, *args, **kwargs):
+        if not has_metrics_token(request) and not request.user.is_staff:
+            raise Http404("You do not have access to this resource.")
+        return JsonResponse({
+            'views': self.psn_metrics.get_view_metrics(),
+            'store': self.psn_metrics.get_store_metrics(),
+        })
+
+def has_metrics_token(request):
+    """
+    Check if a request is authorized by the metrics token. No request is, if no token is configured.
+    """
+    metrics_token = getattr(settings, 'PSN_METRICS_TOKEN', None)
+    authorization = request.META.get('HTTP_AUTHORIZATION', '')
+    if not metrics_token or not authorization.startswith(METRICS_TOKEN_PREFIX):
+        return False
+    return hmac.compare_digest(authorization[len(METRICS_TOKEN_PREFIX):].encode(), metrics_token.encode())
+
+def get_scoring_version(filters):
+    """
+    Get the version of the scoring model selected by the game list filters.
+    """
+    return filters.get('scoring') or SCORING_PRODUCTION_VERSION
+
+def get_scoring_ordering(ordering, filters):
+    """
+    Get an ordering of the game list for the scoring model selected by the game list filters.
+
+    The score fields of a shadow scoring model are ordered by its scores in GameScore, rather than the production scores.
+
+    Args:
+        ordering: The ordering by a GameList field, descending if prefixed with '-'.
+        filters: The game list filters.
+    Returns:
+        string: The ordering for the selected scoring model.
+    """
+    field_name = ordering.lstrip('-')
+    if get_scoring_version(filters) != SCORING_PRODUCTION_VERSION and field_name in GAMELIST_SCORE_FIELDS:
+        ordering = ordering.replace(field_name, GAMELIST_SHADOW_SCORE_PREFIX + field_name)
+    return ordering
+
+def get_content_mask(content_descriptors):
+    """
+    Get the combined content descriptor bitmask of a list of content descriptors.
+
+    Args:
+        content_descriptors: The content descriptors.
+    Returns:
+        number: The bitmask with the bit of each content descriptor set.
+    """
+    content_mask = 0
+    for content_descriptor in content_descriptors:
+        content_mask |= content_descriptor.get_content_mask()
+    return content_mask
+
+def get_unmasked_content(content_descriptors):
+    """
+    Get the content descriptors that have no bit in the content descriptor bitmask.
+    """
+    return [content_descriptor for content_descriptor in content_descriptors if content_descriptor.content_bit == None]
+
+def get_tasks():
+    """
+    Get the tasks module, importing it on first use.
+
+    The tasks import the sync dependencies (e.g. cloudinary, requests), which the web workers only load
+    when an admin user starts a task, rather than at boot.
+    """
+    from . import tasks
+    return tasks
+
+def is_profile_requested(request):
+    """
+    Check if an admin user asked for a task to be profiled, with the profile query parameter.
+    """
+    return request.GET.get(VIEW_PROFILE_PARAM) == '1'
+
+def view_sync_all_psn_libraries_with_psn_store(request):
+    """
+    View used for syncing every local PSN library with the PSN store.
+
+    The libraries are synced concurrently by celery tasks, sharing the PSN store request budget.
+    Update can only be triggered through this view by an admin user.
+
+    Args:
+        request: The HTTP request
+    Returns:
+        The HTTP response.
+    """
+    if not request.user.is_staff:
+        raise Http404("You do not have access to this resource.")
+    get_tasks().task_sync_all_psn_libraries_with_psn_store.delay(p_profile=is_profile_requested(request))
+    # Follow the progress of the sync on the dashboard
+    return redirect('psnvalue:index')
 
 def view_sync_psn_library_with_psn_store(request, library_id):
     """
@@ -84,8 +383,9 @@ def view_sync_psn_library_with_psn_store(request, library_id):
     """
     if not request.user.is_staff:
         raise Http404("You do not have access to this resource.")
-    task_sync_psn_library_with_psn_store.delay(library_id)
-    return HttpResponse("You're at the psnvalue updatelib.")
+    get_tasks().task_sync_psn_library_with_psn_store.delay(library_id, p_profile=is_profile_requested(request))
+    # Follow the progress of the sync on the dashboard
+    return redirect('psnvalue:index')
 
 def view_update_psn_weighted_ratings(request, library_id):
     """
@@ -102,7 +402,7 @@ def view_update_psn_weighted_ratings(request, library_id):
     """
     if not request.user.is_staff:
         raise Http404("You do not have access to this resource.")
-    task_update_psn_weighted_ratings.delay(library_id)
+    get_tasks().task_update_psn_weighted_ratings.delay(library_id, p_profile=is_profile_requested(request))
     return HttpResponse("You're at the psnvalue update weighted rating.")
 
 def view_update_psn_game_thumbnails(request, library_id):
@@ -122,5 +422,5 @@ def view_update_psn_game_thumbnails(request, library_id):
     """
     if not request.user.is_staff:
         raise Http404("You do not have access to this resource.")
-    task_update_psn_game_thumbnails.delay(library_id)
+    get_tasks().task_update_psn_game_thumbnails.delay(library_id, p_profile=is_profile_requested(request))
     return HttpResponse("You're at the psnvalue update game thumbs.")